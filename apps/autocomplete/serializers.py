@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+
+class RecipeSuggestionSerializer(serializers.Serializer):
+    """ Serializer For A Recipe Title Suggestion """
+    id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(read_only=True)
+
+
+class NameSuggestionSerializer(serializers.Serializer):
+    """ Serializer For A Tag Or Ingredient Name Suggestion """
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    """ Serializer For The Typeahead Suggestions, Documenting The Response Shape """
+    recipes = RecipeSuggestionSerializer(many=True, read_only=True)
+    tags = NameSuggestionSerializer(many=True, read_only=True)
+    ingredients = NameSuggestionSerializer(many=True, read_only=True)
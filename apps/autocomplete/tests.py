@@ -0,0 +1,109 @@
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.ingredients.models import Ingredient
+from apps.recipes.models import Recipe
+from apps.recipes.tests import create_recipe
+from apps.tags.models import Tag
+from apps.users.tests import create_user
+from apps.utils import db_queries
+
+AUTOCOMPLETE_URL = reverse('autocomplete:autocomplete')
+
+
+class PublicAutocompleteApiTests(TestCase):
+    """ Test Unauthenticated API Requests """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'chi'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAutocompleteApiTests(TestCase):
+    """ Test Autocomplete For Authenticated Users """
+
+    def setUp(self):
+        self.user = create_user(email='test@example.com', username='user', password='TestPass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_prefix_matches_come_first(self):
+        """ Test Titles Starting With The Term Rank Above Titles Containing It """
+        infix = create_recipe(user=self.user, title='Spicy chicken wings')
+        prefix = create_recipe(user=self.user, title='Chicken soup')
+        create_recipe(user=self.user, title='Beef stew')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'chick'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['recipes']], [prefix.id, infix.id])
+
+    def test_short_terms_match_prefixes_only(self):
+        """ Test Terms Shorter Than A Trigram Only Match From The Start """
+        Tag.objects.create(creator=self.user, name='Vegan')
+        Tag.objects.create(creator=self.user, name='Devilled')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 've'})
+
+        self.assertEqual([tag['name'] for tag in res.data['tags']], ['Vegan'])
+
+    def test_ingredients_limited_to_user(self):
+        """ Test Only The User's Own Ingredients Are Suggested """
+        other_user = create_user(email='other@example.com', username='other', password='TestPass123')
+        Ingredient.objects.create(user=other_user, name='Salt flakes')
+        own = Ingredient.objects.create(user=self.user, name='Sea salt')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'salt'})
+
+        self.assertEqual(res.data['ingredients'], [{'id': own.id, 'name': own.name}])
+
+    def test_limit_is_respected(self):
+        """ Test The Number Of Suggestions Per Type Is Capped By limit """
+        for index in range(5):
+            Tag.objects.create(creator=self.user, name=f'Dinner {index}')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'dinner', 'limit': 2})
+
+        self.assertEqual(len(res.data['tags']), 2)
+
+    def test_blank_term_returns_nothing(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': '  '})
+
+        self.assertEqual(res.data, {'recipes': [], 'tags': [], 'ingredients': []})
+
+    def test_wildcards_in_term_match_literally(self):
+        """ Test % And _ In The Term Are Not LIKE Wildcards """
+        Tag.objects.create(creator=self.user, name='100% Rye')
+        Tag.objects.create(creator=self.user, name='100 Rye')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': '100%'})
+
+        self.assertEqual([tag['name'] for tag in res.data['tags']], ['100% Rye'])
+
+
+class SuggestionIndexTests(TestCase):
+    """ Test The Suggestion Filters Can Use The pg_trgm GIN Indexes """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # The test tables are tiny; rolled back with the test's transaction
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_suggestions_use_trigram_indexes(self):
+        querysets = {
+            'recipe_title_trgm_idx': (Recipe.objects.all(), 'title'),
+            'tag_name_trgm_idx': (Tag.objects.all(), 'name'),
+            # Not filtered by user, which the planner would rather serve from the user index
+            'ingredient_name_trgm_idx': (Ingredient.objects.all(), 'name'),
+        }
+        for index, (queryset, field) in querysets.items():
+            with self.subTest(index=index):
+                plan = db_queries._filter_suggestions(queryset, field, 'chick').explain()
+                self.assertIn(f'Index Scan on {index}', plan)
@@ -0,0 +1,36 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.autocomplete.serializers import AutocompleteSerializer
+from apps.utils import db_queries
+from apps.utils.pagination import LimitMixin
+
+
+@extend_schema(tags=["Autocomplete"], parameters=[
+    OpenApiParameter('q', OpenApiTypes.STR, required=True),
+    OpenApiParameter('limit', OpenApiTypes.INT),
+])
+class AutocompleteView(LimitMixin, APIView):
+    """ Typeahead Suggestions Across Recipe Titles, Tags And The User's Ingredients """
+
+    serializer_class = AutocompleteSerializer
+    permission_classes = (IsAuthenticated,)
+    default_limit = 10
+    max_limit = 25
+
+    def get(self, request, *args, **kwargs):
+        term = request.query_params.get('q', '').strip()
+        if not term:
+            return Response({'recipes': [], 'tags': [], 'ingredients': []}, status=status.HTTP_200_OK)
+
+        limit = self.get_limit(request)
+        suggestions = {
+            'recipes': db_queries.get_recipe_suggestions(term=term, limit=limit),
+            'tags': db_queries.get_tag_suggestions(term=term, limit=limit),
+            'ingredients': db_queries.get_ingredient_suggestions(user=request.user, term=term, limit=limit),
+        }
+        return Response(suggestions, status=status.HTTP_200_OK)
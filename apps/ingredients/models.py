@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 from core import settings
@@ -12,5 +13,11 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', '-id'], name='ingredient_user_name_id_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='ingredient_name_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.name
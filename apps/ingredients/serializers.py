@@ -2,9 +2,10 @@ from django.db import IntegrityError
 from rest_framework import serializers
 
 from apps.ingredients.models import Ingredient
+from apps.utils.eager_loading import EagerLoadingMixin
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """ Serializer For Ingredients """
 
     id = serializers.IntegerField(read_only=True)
@@ -21,3 +22,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         except IntegrityError:
             existing_ingredient = Ingredient.objects.get(user=user, name=ingredient_name)
             return existing_ingredient
+
+
+class IngredientBulkDeleteSerializer(serializers.Serializer):
+    """ Serializer For Deleting Ingredients By Id """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
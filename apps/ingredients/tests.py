@@ -5,10 +5,12 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.ingredients.models import Ingredient
+from apps.recipes.models import Recipe
 from apps.users.tests import create_user
 from apps.ingredients.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse('ingredients:ingredient-list')
+INGREDIENTS_BULK_URL = reverse('ingredients:ingredient-bulk')
 
 
 def detail_url(ingredient_id):
@@ -60,7 +62,16 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve_ingredients_sparse_fieldset(self):
+        Ingredient.objects.create(user=self.user, name='Kale')
+
+        res = self.client.get(INGREDIENTS_URL, {'fields': 'name'})
+        bad = self.client.get(INGREDIENTS_URL, {'fields': 'user'})
+
+        self.assertEqual(res.data['results'], [{'name': 'Kale'}])
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_ingredients_limited_to_user(self):
         """ Test List Of Ingredients Is Limited To Authenticated User """
@@ -72,9 +83,21 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
+
+    def test_ingredients_paginated_by_name(self):
+        """ Test Ingredient Pages Follow (name, id) Order Without Overlap """
+        for name in ['Basil', 'Apple', 'Carrot', 'Apple']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 3})
+        next_res = self.client.get(res.data['next'])
+
+        names = [item['name'] for item in res.data['results'] + next_res.data['results']]
+        self.assertEqual(names, ['Carrot', 'Basil', 'Apple', 'Apple'])
+        self.assertIsNone(next_res.data['next'])
 
     def test_update_ingredient(self):
         """Test updating an ingredient."""
@@ -98,3 +121,33 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         ingredients = Ingredient.objects.filter(user=self.user)
         self.assertFalse(ingredients.exists())
+
+    def test_bulk_create_ingredients_without_duplicates(self):
+        """ Test Repeated And Existing Names Resolve To One Ingredient Each """
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        payload = [{'name': 'Salt'}, {'name': 'Pepper'}, {'name': 'Pepper'}]
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        pepper = Ingredient.objects.get(user=self.user, name='Pepper')
+        self.assertEqual(res.data, [{'id': salt.id, 'name': 'Salt'}, {'id': pepper.id, 'name': 'Pepper'}])
+
+    def test_bulk_delete_only_own_ingredients(self):
+        """ Test Bulk Delete Skips Other Users' Ingredients And Unlinks Recipes """
+        other_user = create_user(email='other@user.com', username='Otherusername', password='GoodPass123')
+        own = Ingredient.objects.create(user=self.user, name='Kale')
+        kept = Ingredient.objects.create(user=self.user, name='Rice')
+        foreign = Ingredient.objects.create(user=other_user, name='Kale')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Kale salad', preparation_time_minutes=5, price='2.00', description='Salad',
+        )
+        recipe.ingredients.add(own, kept)
+
+        res = self.client.delete(INGREDIENTS_BULK_URL, {'ids': [own.id, foreign.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': [own.id]})
+        self.assertFalse(Ingredient.objects.filter(pk=own.pk).exists())
+        self.assertTrue(Ingredient.objects.filter(pk=foreign.pk).exists())
+        self.assertEqual(list(recipe.ingredients.all()), [kept])
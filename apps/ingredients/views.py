@@ -1,8 +1,14 @@
-from rest_framework import mixins, viewsets
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from apps.ingredients.models import Ingredient
-from apps.ingredients.serializers import IngredientSerializer
+from apps.ingredients.serializers import IngredientSerializer, IngredientBulkDeleteSerializer
+from apps.utils import db_queries, sparse_fields
+from apps.utils.pagination import KeysetPagination
 
 
 class IngredientViewSet(
@@ -16,7 +22,48 @@ class IngredientViewSet(
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('-name', '-id')
+    max_bulk_size = 1000
+    # The sparse fieldset of a list request; None renders every field
+    requested_fields = None
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user).order_by(*self.ordering)
+        if self.action == 'list':
+            # only() is safe on reads; writes must keep updated_at loaded so save() bumps it
+            queryset = self.get_serializer_class().setup_eager_loading(queryset, fields=self.requested_fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault('fields', self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    @extend_schema(parameters=[
+        OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+        OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
+    ])
+    def list(self, request, *args, **kwargs):
+        self.requested_fields = sparse_fields.get_requested_fields(request, self.get_serializer_class())
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(request=IngredientSerializer(many=True), responses=IngredientSerializer(many=True))
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk')
+    def bulk_create(self, request):
+        """ The User's Ingredients For Every Name, Created When Missing, Without Duplicates """
+        serializer = IngredientSerializer(data=request.data, many=True, allow_empty=False, max_length=self.max_bulk_size)
+        serializer.is_valid(raise_exception=True)
+        names = list(dict.fromkeys(ingredient['name'] for ingredient in serializer.validated_data))
+        ingredient_ids = db_queries.resolve_ingredient_ids(names, user=request.user)
+        return Response([{'id': ingredient_ids[name], 'name': name} for name in names], status=status.HTTP_201_CREATED)
+
+    @extend_schema(request=IngredientBulkDeleteSerializer)
+    @bulk_create.mapping.delete
+    def bulk_delete(self, request):
+        """ Delete The User's Ingredients Among `ids`; Ids Of Other Users' Ingredients Are Left Alone """
+        serializer = IngredientBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted_ids = db_queries.bulk_delete_ingredients(serializer.validated_data['ids'], user=request.user)
+        return Response({'deleted': deleted_ids}, status=status.HTTP_200_OK)
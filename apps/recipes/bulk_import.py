@@ -0,0 +1,232 @@
+import csv
+import gzip
+import io
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.recipes.export import CSV, LIST_COLUMNS, NDJSON
+from apps.recipes.filters import SEARCH_CONFIG
+from apps.recipes.models import Recipe
+from apps.recipes.pantry import sync_pantry_index
+from apps.recipes.similar import sync_similar_index
+from apps.recipes.serializers import RecipeImportSerializer
+from apps.utils import db_queries, response_cache
+
+IMPORT_FORMATS = (NDJSON, CSV)
+# Recipe columns loaded through the staging table
+RECIPE_COPY_COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'preparation_time_minutes',
+    'price',
+    'difficulty_level',
+    'link',
+    'image',
+    'user_id',
+    'created_at',
+    'updated_at',
+)
+STAGING_TABLE = 'recipe_import_staging'
+# The weights of db_queries.build_recipe_search_vector, computed from the staged names
+STAGED_SEARCH_VECTOR = (
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(title, '')), 'A') || "
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(tag_text, '')), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(ingredient_text, '')), 'C') || "
+    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(description, '')), 'D')"
+)
+IMPORT_CHUNK_SIZE = 1000
+# Keep the report bounded when a whole file is malformed
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_ndjson_rows(stream):
+    """ (line number, row) Pairs; A Line That Is Not A JSON Object Yields Its Error Instead """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as ex:
+            yield line_number, {'non_field_errors': [f'Invalid JSON: {ex}']}, False
+            continue
+        if not isinstance(row, dict):
+            yield line_number, {'non_field_errors': ['Expected A JSON Object']}, False
+            continue
+        yield line_number, row, True
+
+
+def iter_csv_rows(stream):
+    """ Rows Of A CSV With A Header; List Columns Hold JSON Arrays Like The Export Writes """
+    # The header is line 1
+    for line_number, row in enumerate(csv.DictReader(stream), start=2):
+        try:
+            for column in LIST_COLUMNS:
+                row[column] = json.loads(row[column]) if row.get(column) else []
+        except ValueError:
+            yield line_number, {column: ['Expected A JSON Array']}, False
+            continue
+        yield line_number, row, True
+
+
+class RecipeImport:
+    """ Loads A Partner Catalog In Chunks With A Fixed Number Of Statements Per Chunk
+
+    Per chunk: validate every row, resolve all tag and ingredient names with one lookup and
+    one insert each, reserve the recipe ids from their sequence, then COPY the recipes (with
+    their search vectors) and their through-table rows. Each chunk commits on its own, so a
+    bad chunk only loses its own rows. Model signals do not fire for bulk inserts, so the caches they
+    normally maintain are updated here; read-model documents are built on first read.
+    """
+
+    def __init__(self, user, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, stream, import_format: str = NDJSON) -> dict:
+        rows = iter_csv_rows(stream) if import_format == CSV else iter_ndjson_rows(stream)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.get_report()
+
+    def get_report(self) -> dict:
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def add_error(self, line_number: int, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def import_chunk(self, chunk):
+        valid = []
+        # One serializer for the whole chunk: its fields are built once instead of per row
+        serializer = RecipeImportSerializer()
+        for line_number, row, parsed in chunk:
+            if not parsed:
+                self.add_error(line_number, row)
+                continue
+            try:
+                valid.append((line_number, serializer.run_validation(row)))
+            except serializers.ValidationError as ex:
+                self.add_error(line_number, serializers.as_serializer_error(ex))
+        if not valid:
+            return
+
+        try:
+            with transaction.atomic():
+                recipe_ids, links = self.save_chunk([data for _, data in valid])
+        except Exception as ex:
+            for line_number, _ in valid:
+                self.add_error(line_number, {'non_field_errors': [f'Error: {str(ex)}']})
+            return
+
+        self.created += len(valid)
+        transaction.on_commit(lambda: sync_pantry_index('add_recipes', links))
+        transaction.on_commit(lambda: sync_similar_index(recipe_ids))
+
+    def save_chunk(self, rows) -> tuple:
+        """ Insert One Validated Chunk; Returns Its Recipe Ids And (recipe_id, ingredient_id) Links """
+        tag_ids = db_queries.resolve_tag_ids(
+            (name for row in rows for name in row['tag_names']), creator=self.user,
+        )
+        ingredient_ids = db_queries.resolve_ingredient_ids(
+            (name for row in rows for name in row['ingredient_names']), user=self.user,
+        )
+
+        recipe_ids = reserve_ids(Recipe, len(rows))
+        now = timezone.now()
+        load_recipes((
+            [
+                recipe_id, row['title'], row['description'], row['preparation_time_minutes'], row['price'],
+                row['difficulty_level'], row['link'], '', self.user.pk, now, now,
+                ' '.join(row['tag_names']), ' '.join(row['ingredient_names']),
+            ]
+            for recipe_id, row in zip(recipe_ids, rows)
+        ))
+
+        tag_links = {
+            (recipe_id, tag_ids[name])
+            for recipe_id, row in zip(recipe_ids, rows)
+            for name in row['tag_names']
+        }
+        ingredient_links = {
+            (recipe_id, ingredient_ids[name])
+            for recipe_id, row in zip(recipe_ids, rows)
+            for name in row['ingredient_names']
+        }
+        copy_rows(Recipe.tags.through._meta.db_table, ('recipe_id', 'tag_id'), tag_links)
+        copy_rows(Recipe.ingredients.through._meta.db_table, ('recipe_id', 'ingredient_id'), ingredient_links)
+
+        response_cache.invalidate(response_cache.RECIPES)
+        return recipe_ids, sorted(ingredient_links)
+
+
+def load_recipes(rows):
+    """ COPY Recipe Rows Plus Their Tag/Ingredient Text Into A Temporary Table, Then Move Them
+    Into The Recipe Table With search_vector Computed On The Way, So No Row Is Written Twice
+    """
+    recipe_table = connection.ops.quote_name(Recipe._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in RECIPE_COPY_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} '
+            f'(LIKE {recipe_table}, tag_text text, ingredient_text text) ON COMMIT DELETE ROWS'
+        )
+        cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+    copy_rows(STAGING_TABLE, RECIPE_COPY_COLUMNS + ('tag_text', 'ingredient_text'), rows)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {recipe_table} ({columns}, search_vector) '
+            f'SELECT {columns}, {STAGED_SEARCH_VECTOR} FROM {STAGING_TABLE}',
+            {'config': SEARCH_CONFIG},
+        )
+
+
+def reserve_ids(model, count: int) -> list:
+    """ Take count Values From The Table's Id Sequence, So Rows Can Be COPYed With Known Ids """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def copy_rows(table: str, columns, rows):
+    """ Load Rows With COPY ... FROM STDIN (CSV), The Fastest Way Into A Postgres Table """
+    buffer = io.StringIO()
+    # Quoting every value keeps empty strings apart from NULL
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    quoted_columns = ', '.join(connection.ops.quote_name(column) for column in columns)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(table)} ({quoted_columns}) FROM STDIN WITH (FORMAT csv)', buffer,
+        )
+
+
+def guess_format(file_name: str) -> str:
+    """ `csv` For .csv / .csv.gz Files, NDJSON For Everything Else """
+    return CSV if file_name.lower().removesuffix('.gz').endswith('.csv') else NDJSON
+
+
+def open_text(binary_file, file_name: str = ''):
+    """ Text View Of A Binary Upload Or File, Gunzipped When Named .gz, Decoded As It Is Read """
+    if file_name.lower().endswith('.gz'):
+        binary_file = gzip.GzipFile(fileobj=binary_file)
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
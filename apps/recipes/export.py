@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+import brotli
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.utils import db_queries
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+EXPORT_FORMATS = (NDJSON, CSV)
+GZIP = 'gzip'
+BROTLI = 'br'
+COMPRESSIONS = (GZIP, BROTLI)
+
+EXPORT_COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'preparation_time_minutes',
+    'price',
+    'difficulty_level',
+    'link',
+    'user_id',
+    'created_at',
+    'updated_at',
+    'tag_names',
+    'ingredient_names',
+)
+# Columns holding lists; CSV cells carry them as JSON arrays
+LIST_COLUMNS = ('tag_names', 'ingredient_names')
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {NDJSON: 'application/x-ndjson', CSV: 'text/csv', GZIP: 'application/gzip', BROTLI: 'application/x-brotli'}
+FILE_EXTENSIONS = {GZIP: '.gz', BROTLI: '.br'}
+
+
+def iter_row_chunks(chunk_size: int = EXPORT_CHUNK_SIZE):
+    """ Export Rows As Dicts, chunk_size At A Time, Read Through A Server-Side Cursor """
+    rows = db_queries.get_recipe_export_rows(EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield [
+            dict(zip(EXPORT_COLUMNS, row), tag_names=row[-2] or [], ingredient_names=row[-1] or [])
+            for row in chunk
+        ]
+
+
+def encode_ndjson(chunks):
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for row in chunk
+        ).encode('utf-8')
+
+
+def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for chunk in chunks:
+        for row in chunk:
+            writer.writerow({
+                **row,
+                **{column: json.dumps(row[column], ensure_ascii=False) for column in LIST_COLUMNS},
+            })
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def compress(pieces, compression: str = None):
+    """ Compress A Byte Stream Incrementally; Without A Compression It Passes Through """
+    if compression is None:
+        yield from pieces
+        return
+
+    if compression == GZIP:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 writes a gzip container
+        process, finish = compressor.compress, compressor.flush
+    else:
+        compressor = brotli.Compressor(quality=5)
+        process, finish = compressor.process, compressor.finish
+
+    for piece in pieces:
+        compressed = process(piece)
+        if compressed:
+            yield compressed
+    yield finish()
+
+
+def export_recipes(export_format: str = NDJSON, compression: str = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """ The Whole Catalog As An Iterator Of Encoded (And Optionally Compressed) Byte Chunks """
+    encode = encode_csv if export_format == CSV else encode_ndjson
+    return compress(encode(iter_row_chunks(chunk_size)), compression)
+
+
+def get_content_type(export_format: str, compression: str = None) -> str:
+    return CONTENT_TYPES[compression or export_format]
+
+
+def get_file_name(export_format: str, compression: str = None) -> str:
+    return f'recipes.{export_format}{FILE_EXTENSIONS.get(compression, "")}'
@@ -0,0 +1,155 @@
+from decimal import Decimal
+
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from apps.ingredients.models import Ingredient
+from apps.recipes.filters import RecipeFilter
+from apps.recipes.models import Recipe
+from apps.tags.models import Tag
+from apps.utils import response_cache
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+DIFFICULTY = 'difficulty_level'
+PRICE = 'price'
+PREPARATION_TIME = 'preparation_time_minutes'
+FACETS = (TAGS, INGREDIENTS, DIFFICULTY, PRICE, PREPARATION_TIME)
+ALL_FACETS = 'all'
+
+# Lower bounds of the histogram buckets; the last bucket is open ended
+PRICE_BUCKETS = (Decimal('0'), Decimal('5'), Decimal('10'), Decimal('20'), Decimal('50'))
+PREPARATION_TIME_BUCKETS = (0, 15, 30, 60, 120)
+# Tags and ingredients are long-tailed: only the most frequent values are counted
+TOP_VALUES = 50
+FACETS_TIMEOUT = 600
+
+
+def parse_facets(value: str) -> list:
+    """ Turn `tags,price` (Or `all`) Into The Requested Facet Names, In FACETS Order """
+    if not value:
+        return []
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    if ALL_FACETS in names:
+        return list(FACETS)
+    unknown = names - set(FACETS)
+    if unknown:
+        raise ValidationError({'facets': f'Expected Any Of {", ".join(FACETS)} Or {ALL_FACETS}'})
+    return [name for name in FACETS if name in names]
+
+
+def build_related_branch(facet: str, model, through, column: str) -> str:
+    """ The TOP_VALUES Most Linked Tags Or Ingredients Among The Filtered Recipes """
+    quote_name = connection.ops.quote_name
+    return (
+        f"(SELECT '{facet}', related.id, related.name, COUNT(*) "
+        f"FROM filtered JOIN {quote_name(through._meta.db_table)} link ON link.recipe_id = filtered.id "
+        f"JOIN {quote_name(model._meta.db_table)} related ON related.id = link.{quote_name(column)} "
+        f"GROUP BY related.id, related.name ORDER BY COUNT(*) DESC, related.id LIMIT {TOP_VALUES})"
+    )
+
+
+def build_value_branch(facet: str) -> str:
+    """ Recipes Per Distinct Column Value """
+    return f"(SELECT '{facet}', {facet}, NULL::text, COUNT(*) FROM filtered GROUP BY 2)"
+
+
+def build_bucket_branch(facet: str) -> str:
+    """ Recipes Per Histogram Bucket; width_bucket() Numbers The Buckets From 1 """
+    return (
+        f"(SELECT '{facet}', width_bucket({facet}, %s), NULL::text, COUNT(*) "
+        f"FROM filtered GROUP BY 2)"
+    )
+
+
+def build_top_values(counts: dict, labels: dict) -> list:
+    """ Most Frequent First, Ties By Id, As The Branch Ordered Them """
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{'id': key, 'name': labels[key], 'count': count} for key, count in ranked]
+
+
+def build_difficulty_levels(counts: dict, labels: dict) -> list:
+    """ Every Level, Unused Ones Included """
+    return [
+        {'value': level, 'label': str(label), 'count': counts.get(level, 0)}
+        for level, label in Recipe.DIFFICULTY_CHOICES
+    ]
+
+
+def build_histogram(bounds, counts: dict) -> list:
+    """ One Entry Per Bucket, Empty Ones Included, So Histograms Always Have The Same Shape """
+    return [
+        {
+            'min': lower,
+            'max': bounds[index + 1] if index + 1 < len(bounds) else None,
+            'count': counts.get(index + 1, 0),
+        }
+        for index, lower in enumerate(bounds)
+    ]
+
+
+# Per facet: its UNION ALL branch, the branch's params, and what turns its (key -> count, key -> label) into the facet
+FACET_QUERIES = {
+    TAGS: (
+        lambda: build_related_branch(TAGS, Tag, Recipe.tags.through, 'tag_id'),
+        [],
+        build_top_values,
+    ),
+    INGREDIENTS: (
+        lambda: build_related_branch(INGREDIENTS, Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+        [],
+        build_top_values,
+    ),
+    DIFFICULTY: (
+        lambda: build_value_branch(DIFFICULTY),
+        [],
+        build_difficulty_levels,
+    ),
+    PRICE: (
+        lambda: build_bucket_branch(PRICE),
+        [list(PRICE_BUCKETS)],
+        lambda counts, labels: build_histogram(PRICE_BUCKETS, counts),
+    ),
+    PREPARATION_TIME: (
+        lambda: build_bucket_branch(PREPARATION_TIME),
+        [list(PREPARATION_TIME_BUCKETS)],
+        lambda counts, labels: build_histogram(PREPARATION_TIME_BUCKETS, counts),
+    ),
+}
+
+
+def count_facets(recipe_filter: RecipeFilter, names) -> dict:
+    """ Every Requested Facet Over The Filtered Recipes In One Grouped Query
+
+    The filtered recipes are a CTE, so the filter runs once; each facet is a GROUP BY branch
+    of a UNION ALL over it.
+    """
+    recipes = recipe_filter.filter_queryset(Recipe.objects.all()).order_by()
+    filtered_sql, params = recipes.values('id', DIFFICULTY, PRICE, PREPARATION_TIME).query.sql_with_params()
+    params = list(params)
+    branches = []
+    for name in names:
+        build_branch, branch_params, _ = FACET_QUERIES[name]
+        branches.append(build_branch())
+        params.extend(branch_params)
+
+    counts = {name: {} for name in names}
+    labels = {name: {} for name in names}
+    with connection.cursor() as cursor:
+        cursor.execute(f'WITH filtered AS ({filtered_sql}) ' + ' UNION ALL '.join(branches), params)
+        for facet, key, label, count in cursor.fetchall():
+            counts[facet][key] = count
+            labels[facet][key] = label
+
+    return {name: FACET_QUERIES[name][2](counts[name], labels[name]) for name in names}
+
+
+def get_facets(recipe_filter: RecipeFilter, names) -> dict:
+    """ Facet Counts Cached Per Filter Signature, Whatever The Page Or Ordering Of The List """
+    return response_cache.get_or_build(
+        'recipe-facets',
+        (response_cache.RECIPES, response_cache.TAGS, response_cache.INGREDIENTS),
+        (recipe_filter.get_signature(), tuple(names)),
+        lambda: count_facets(recipe_filter, names),
+        timeout=FACETS_TIMEOUT,
+    )
@@ -0,0 +1,141 @@
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Count, Exists, OuterRef, Q
+from rest_framework.exceptions import ValidationError
+
+from apps.recipes.models import Recipe
+
+SEARCH_CONFIG = 'english'
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+# `ordering` values and the full orderings they stand for; each has a (<field>, id) index
+# that Postgres scans forwards or backwards, so cursor pages never need a sort step
+ORDERINGS = {
+    f'{prefix}{field}': (f'{prefix}{field}', f'{prefix}id')
+    for field in ('created_at', 'price', 'preparation_time_minutes', 'difficulty_level')
+    for prefix in ('', '-')
+}
+
+
+def parse_id_list(value: str, param: str) -> list:
+    """ Turn `1,2,3` Into A Sorted List Of Unique Ids """
+    if not value:
+        return []
+    try:
+        return sorted({int(str_id) for str_id in value.split(',') if str_id.strip()})
+    except ValueError:
+        raise ValidationError({param: 'Expected A Comma Separated List Of Ids'})
+
+
+def parse_decimal(value: str, param: str):
+    if not value:
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValidationError({param: 'Expected A Number'})
+    return number
+
+
+def parse_int(value: str, param: str):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({param: 'Expected A Whole Number'})
+
+
+def parse_ordering(value: str):
+    """ The Full Ordering For An `ordering` Value, None When Not Given """
+    if not value:
+        return None
+    if value not in ORDERINGS:
+        raise ValidationError({'ordering': f'Expected One Of {", ".join(ORDERINGS)}'})
+    return ORDERINGS[value]
+
+
+def parse_match_mode(value: str, param: str) -> str:
+    mode = (value or MATCH_ANY).lower()
+    if mode not in (MATCH_ANY, MATCH_ALL):
+        raise ValidationError({param: f'Expected "{MATCH_ANY}" Or "{MATCH_ALL}"'})
+    return mode
+
+
+def related_exists(through, column: str, ids: list, match: str = MATCH_ANY) -> Exists:
+    """ Correlated EXISTS Over A Through Table; `all` Adds GROUP BY ... HAVING COUNT(*) = len(ids)
+
+    Unlike a join + DISTINCT this never multiplies recipe rows, and each probe is a lookup
+    on the through table's (recipe_id, <column>) unique index.
+    """
+    rows = through.objects.filter(recipe_id=OuterRef('pk'), **{f'{column}__in': ids})
+    if match == MATCH_ALL:
+        rows = rows.values('recipe_id').annotate(matched=Count('*')).filter(matched=len(ids))
+    return Exists(rows)
+
+
+class RecipeFilter:
+    """ Combines The Recipe List Query Params Into A Single Query
+
+    tags / tags_match             recipes with any (default) or all of the tag ids
+    ingredients / ingredients_match   recipes with any (default) or all of the ingredient ids
+    exclude_ingredients           recipes with none of the ingredient ids (allergens)
+    recipe                        full text search, see get_search_query and db_queries.annotate_search_rank
+    min_price / max_price         price range, both ends inclusive
+    max_minutes                   preparation time of at most this many minutes
+    difficulty                    recipes with any of the difficulty levels
+    ordering                      one of ORDERINGS; not a filter, kept here so it is parsed once
+    """
+
+    def __init__(self, query_params):
+        self.tags = parse_id_list(query_params.get('tags'), 'tags')
+        self.tags_match = parse_match_mode(query_params.get('tags_match'), 'tags_match')
+        self.ingredients = parse_id_list(query_params.get('ingredients'), 'ingredients')
+        self.ingredients_match = parse_match_mode(query_params.get('ingredients_match'), 'ingredients_match')
+        self.exclude_ingredients = parse_id_list(query_params.get('exclude_ingredients'), 'exclude_ingredients')
+        self.search = (query_params.get('recipe') or '').strip()
+        self.min_price = parse_decimal(query_params.get('min_price'), 'min_price')
+        self.max_price = parse_decimal(query_params.get('max_price'), 'max_price')
+        self.max_minutes = parse_int(query_params.get('max_minutes'), 'max_minutes')
+        self.difficulty = parse_id_list(query_params.get('difficulty'), 'difficulty')
+        self.ordering = parse_ordering(query_params.get('ordering'))
+
+    def get_conditions(self) -> Q:
+        conditions = Q()
+        if self.tags:
+            conditions &= Q(related_exists(Recipe.tags.through, 'tag_id', self.tags, self.tags_match))
+        if self.ingredients:
+            conditions &= Q(related_exists(
+                Recipe.ingredients.through, 'ingredient_id', self.ingredients, self.ingredients_match,
+            ))
+        if self.exclude_ingredients:
+            conditions &= ~Q(related_exists(Recipe.ingredients.through, 'ingredient_id', self.exclude_ingredients))
+        if self.search:
+            conditions &= Q(search_vector=self.get_search_query())
+        if self.min_price is not None:
+            conditions &= Q(price__gte=self.min_price)
+        if self.max_price is not None:
+            conditions &= Q(price__lte=self.max_price)
+        if self.max_minutes is not None:
+            conditions &= Q(preparation_time_minutes__lte=self.max_minutes)
+        if self.difficulty:
+            conditions &= Q(difficulty_level__in=self.difficulty)
+        return conditions
+
+    def get_signature(self) -> tuple:
+        """ The Normalized Criteria: Equal For Every Query String Selecting The Same Recipes """
+        return (
+            tuple(self.tags), self.tags_match,
+            tuple(self.ingredients), self.ingredients_match,
+            tuple(self.exclude_ingredients), self.search,
+            self.min_price, self.max_price, self.max_minutes, tuple(self.difficulty),
+        )
+
+    def get_search_query(self) -> SearchQuery:
+        return SearchQuery(self.search, search_type='websearch', config=SEARCH_CONFIG)
+
+    def filter_queryset(self, queryset):
+        return queryset.filter(self.get_conditions())
@@ -0,0 +1,61 @@
+import io
+import json
+import time
+
+import msgpack
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.recipes.models import Recipe
+from apps.recipes.serializers import RecipeSerializer
+from apps.utils.parsers import MessagePackParser, ORJSONParser
+from apps.utils.renderers import MessagePackRenderer, ORJSONRenderer
+
+# (name, renderer, parser, decode) per wire format; decode reads the bytes back for the equality check
+FORMATS = (
+    ('json', JSONRenderer(), JSONParser(), json.loads),
+    ('orjson', ORJSONRenderer(), ORJSONParser(), json.loads),
+    ('msgpack', MessagePackRenderer(), MessagePackParser(), lambda content: msgpack.unpackb(content, raw=False)),
+)
+
+
+def best_of(repeat: int, run) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Time rendering and parsing a RecipeSerializer list payload with each renderer and parser'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Recipes in the payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per format; the fastest one is reported')
+
+    def handle(self, *args, **options):
+        recipes = RecipeSerializer.setup_eager_loading(Recipe.objects.order_by('-created_at', '-id'))[:options['rows']]
+        # The list endpoint's envelope around the serialized page
+        payload = {'next': None, 'previous': None, 'results': RecipeSerializer(recipes, many=True).data}
+        count = len(payload['results'])
+        if not count:
+            raise CommandError('No recipes to render')
+        expected = json.loads(JSONRenderer().render(payload))
+
+        baseline = None
+        for name, renderer, parser, decode in FORMATS:
+            content = renderer.render(payload)
+            if decode(content) != expected:
+                raise CommandError(f'{name} output does not decode to the JSON payload')
+            render_time = best_of(options['repeat'], lambda: renderer.render(payload))
+            parse_time = best_of(options['repeat'], lambda: parser.parse(io.BytesIO(content), parser.media_type, {}))
+            baseline = baseline or (render_time, parse_time, len(content))
+            self.stdout.write(
+                f'{name:<8} render {render_time * 10000 / count * 1000:8.1f} ms'
+                f' (x{baseline[0] / render_time:.1f})  parse {parse_time * 10000 / count * 1000:8.1f} ms'
+                f' (x{baseline[1] / parse_time:.1f}) per 10k recipes  {len(content) / count:6.1f} bytes per recipe'
+                f' ({len(content) / baseline[2]:.0%})'
+            )
@@ -0,0 +1,78 @@
+import json
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apps.recipes.serializers import RecipeDetailSerializer, RecipeSerializer
+from apps.tags.serializers import TagSerializer
+from apps.utils.database_json import DatabaseJSONSerializer
+from apps.utils.fast_serialization import RowSerializer
+
+# (name, serializer, list ordering) of the lists rendered on the hot endpoints
+LISTS = (
+    ('recipes', RecipeSerializer, ('-created_at', '-id')),
+    ('recipe details', RecipeDetailSerializer, ('id',)),
+    ('tags', TagSerializer, ('-created_at', '-id')),
+)
+
+
+def render_with_serializer(serializer_class, queryset) -> bytes:
+    instances = serializer_class.setup_eager_loading(queryset)
+    return JSONRenderer().render(serializer_class(instances, many=True).data)
+
+
+def render_rows(serializer_class, queryset) -> bytes:
+    row_serializer = RowSerializer(serializer_class)
+    return JSONRenderer().render(row_serializer.render(row_serializer.values(queryset)))
+
+
+def render_in_database(serializer_class, queryset) -> bytes:
+    json_serializer = DatabaseJSONSerializer(serializer_class)
+    return json_serializer.render(json_serializer.values(queryset)).encode('utf-8')
+
+
+# (name, render, whether the bytes match the serializer's rather than just the parsed JSON)
+STRATEGIES = (
+    ('serializer', render_with_serializer, True),
+    ('rows', render_rows, True),
+    ('database', render_in_database, False),
+)
+
+
+class Command(BaseCommand):
+    help = 'Time each way of rendering the recipe and tag lists (queries included) and check they agree'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per list rendered in each run')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per strategy; the fastest one is reported')
+
+    def handle(self, *args, **options):
+        for name, serializer_class, ordering in LISTS:
+            queryset = serializer_class.Meta.model.objects.order_by(*ordering)[:options['rows']]
+            count = queryset.count()
+            if not count:
+                self.stdout.write(f'{name}: nothing to render')
+                continue
+
+            baseline = None
+            for strategy, render, byte_equal in STRATEGIES:
+                timings = []
+                try:
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        output = render(serializer_class, queryset)
+                        timings.append(time.perf_counter() - started)
+                except ImproperlyConfigured as ex:
+                    self.stdout.write(f'{name} ({count} rows) {strategy:<12} not supported: {ex}')
+                    continue
+                if baseline is None:
+                    baseline = output, min(timings)
+                elif output != baseline[0] if byte_equal else json.loads(output) != json.loads(baseline[0]):
+                    raise CommandError(f'{name}: {strategy} output differs from the serializer output')
+                per_10k = min(timings) * 10000 / count
+                self.stdout.write(
+                    f'{name} ({count} rows) {strategy:<12} {per_10k * 1000:9.1f} ms per 10k rows'
+                    f'  x{baseline[1] / min(timings):.1f}'
+                )
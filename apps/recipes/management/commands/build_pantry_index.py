@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.recipes.pantry import PantryIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis ingredient -> recipe bitsets used by /recipes/pantry/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        containers = PantryIndex().rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Pantry index rebuilt with {containers} bitset containers'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.recipes.similar import SimilarRecipesIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis MinHash signatures and LSH buckets used by /recipes/item/<pk>/similar/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        indexed = SimilarRecipesIndex().rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Similar recipes index rebuilt with {indexed} recipes'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recipes import read_model
+
+
+class Command(BaseCommand):
+    help = 'Compare the stored recipe documents with a fresh serialization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--fix', action='store_true', help='Rebuild the missing and stale documents')
+
+    def handle(self, *args, **options):
+        report = read_model.check_consistency(chunk_size=options['chunk_size'])
+        broken = report['missing'] + report['stale']
+        self.stdout.write(
+            f"Checked {report['checked']} recipes: {len(report['missing'])} missing, {len(report['stale'])} stale"
+        )
+        if not broken:
+            return
+        if options['fix']:
+            read_model.refresh(broken)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(broken)} documents'))
+            return
+        raise CommandError(f'Inconsistent recipes: {broken}')
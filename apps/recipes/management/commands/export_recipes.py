@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.recipes import export
+
+
+class Command(BaseCommand):
+    help = 'Export every recipe with its tag and ingredient names as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=export.EXPORT_FORMATS, default=export.NDJSON)
+        parser.add_argument('--compression', choices=export.COMPRESSIONS, default=None)
+        parser.add_argument('--output', help='File to write, standard output when omitted')
+        parser.add_argument('--chunk-size', type=int, default=export.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        pieces = export.export_recipes(
+            export_format=options['format'],
+            compression=options['compression'],
+            chunk_size=options['chunk_size'],
+        )
+        if not options['output']:
+            for piece in pieces:
+                sys.stdout.buffer.write(piece)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(options['output'], 'wb') as output:
+            for piece in pieces:
+                output.write(piece)
+        self.stderr.write(self.style.SUCCESS(f"Recipes exported to {options['output']}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.recipes.trending import RecipeViews
+
+
+class Command(BaseCommand):
+    help = 'Move the recipe view counts recorded in Redis into RecipeStats; run it periodically, e.g. every minute'
+
+    def handle(self, *args, **options):
+        flushed = RecipeViews().flush()
+        self.stdout.write(self.style.SUCCESS(f'View counts of {flushed} recipes flushed'))
@@ -0,0 +1,30 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recipes import bulk_import
+
+
+class Command(BaseCommand):
+    help = 'Bulk import recipes from an NDJSON or CSV file (optionally .gz) for one user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Email of the user who will own the recipes')
+        parser.add_argument('--format', choices=bulk_import.IMPORT_FORMATS, default=None)
+        parser.add_argument('--chunk-size', type=int, default=bulk_import.IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        import_format = options['format'] or bulk_import.guess_format(options['path'])
+        with open(options['path'], 'rb') as binary_file:
+            stream = bulk_import.open_text(binary_file, options['path'])
+            report = bulk_import.RecipeImport(user, chunk_size=options['chunk_size']).run(stream, import_format)
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {report['created']} recipes, {report['failed']} rows failed"))
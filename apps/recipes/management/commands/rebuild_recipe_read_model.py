@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.recipes import read_model
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-serialized recipe card and detail documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = read_model.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the read model of {total} recipes'))
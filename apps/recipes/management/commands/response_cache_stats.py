@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.utils import response_cache
+
+
+class Command(BaseCommand):
+    help = 'Report hits, misses and hit rate of the cached list responses'
+
+    def handle(self, *args, **options):
+        stats = response_cache.get_stats()
+        if not stats:
+            self.stdout.write('No cached responses served yet')
+        for name, counters in sorted(stats.items()):
+            self.stdout.write(
+                f"{name}: {counters['hits']} hits, {counters['misses']} misses, "
+                f"{counters['hit_rate']:.1%} hit rate"
+            )
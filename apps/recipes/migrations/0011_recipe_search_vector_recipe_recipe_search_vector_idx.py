@@ -0,0 +1,43 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+BACKFILL_SEARCH_VECTOR = """
+UPDATE recipes_recipe AS recipe SET search_vector =
+    setweight(to_tsvector('english', coalesce(recipe.title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(tag.name, ' ')
+        FROM recipes_recipe_tags AS recipe_tag
+        JOIN tags_tag AS tag ON tag.id = recipe_tag.tag_id
+        WHERE recipe_tag.recipe_id = recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipe_ingredients AS recipe_ingredient
+        JOIN ingredients_ingredient AS ingredient ON ingredient.id = recipe_ingredient.ingredient_id
+        WHERE recipe_ingredient.recipe_id = recipe.id
+    ), '')), 'C')
+    || setweight(to_tsvector('english', coalesce(recipe.description, '')), 'D');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_recipe_created_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, reverse_sql=migrations.RunSQL.noop),
+    ]
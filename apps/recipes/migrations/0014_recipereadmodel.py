@@ -0,0 +1,25 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:36
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_recipe_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeReadModel',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='read_model', serialize=False, to='recipes.recipe')),
+                ('card', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('detail', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('source_updated_at', models.DateTimeField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
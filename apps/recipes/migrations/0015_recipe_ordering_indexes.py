@@ -0,0 +1,25 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipereadmodel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['price', 'id'], name='recipe_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['preparation_time_minutes', 'id'], name='recipe_prep_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['difficulty_level', 'id'], name='recipe_difficulty_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_recipe_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='recipes.recipe')),
+                ('view_count', models.PositiveBigIntegerField(default=0)),
+                ('weekly_view_count', models.PositiveIntegerField(default=0)),
+                ('weekly_unique_viewers', models.PositiveIntegerField(default=0)),
+                ('last_viewed_at', models.DateTimeField(null=True)),
+                ('flushed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
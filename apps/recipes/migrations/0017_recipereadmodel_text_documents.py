@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-18 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipestats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipereadmodel',
+            name='card',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='recipereadmodel',
+            name='detail',
+            field=models.TextField(),
+        ),
+    ]
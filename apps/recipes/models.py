@@ -1,6 +1,8 @@
 import uuid
 import os
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -37,6 +39,8 @@ class Recipe(models.Model):
     tags = models.ManyToManyField(Tag)
     ingredients = models.ManyToManyField(Ingredient)
     image = models.ImageField(upload_to=recipe_image_file_path)
+    # Weighted title > tags > ingredients > description, maintained by apps.recipes.signals
+    search_vector = SearchVectorField(null=True, editable=False)
 
     difficulty_level = models.PositiveSmallIntegerField(
         choices=DIFFICULTY_CHOICES,
@@ -48,6 +52,21 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination orders by (created_at, id); see apps.utils.pagination
+            models.Index(fields=['-created_at', '-id'], name='recipe_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='recipe_user_created_id_idx'),
+            # The other `ordering` choices; scanned backwards for descending orders
+            models.Index(fields=['price', 'id'], name='recipe_price_id_idx'),
+            models.Index(fields=['preparation_time_minutes', 'id'], name='recipe_prep_time_id_idx'),
+            models.Index(fields=['difficulty_level', 'id'], name='recipe_difficulty_id_idx'),
+            # MAX(updated_at) for conditional GETs; see apps.utils.conditional
+            models.Index(fields=['updated_at'], name='recipe_updated_at_idx'),
+            GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='recipe_title_trgm_idx'),
+        ]
+
     def convert_minutes_to_hours_and_minutes(self):
         if self.preparation_time_minutes < 0:
             raise ValueError("Minutes must be a non-negative integer.")
@@ -75,3 +94,44 @@ class Recipe(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class RecipeReadModel(models.Model):
+    """ Pre-Serialized Recipe Card And Detail Documents, Maintained By apps.recipes.read_model
+
+    The documents are the serializers' JSON text: jsonb would reorder the fields.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='read_model',
+    )
+    card = models.TextField()
+    detail = models.TextField()
+    source_updated_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Read model of recipe {self.recipe_id}'
+
+
+class RecipeStats(models.Model):
+    """ View Counters Of A Recipe, Flushed From Redis By apps.recipes.trending """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    view_count = models.PositiveBigIntegerField(default=0)
+    # Views and unique viewers over the 7 days up to the recipe's last flushed view
+    weekly_view_count = models.PositiveIntegerField(default=0)
+    weekly_unique_viewers = models.PositiveIntegerField(default=0)
+    last_viewed_at = models.DateTimeField(null=True)
+    flushed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Stats of recipe {self.recipe_id}'
@@ -0,0 +1,225 @@
+import logging
+
+import numpy as np
+from django.db.models import Count, Max
+
+from apps.recipes.models import Recipe
+from apps.utils.redis_index import GenerationalIndex
+
+# Formatted with the index generation first
+BLOCKS_KEY = 'pantry:{}:ingredient:{}:blocks'
+BLOCK_KEY = 'pantry:{}:ingredient:{}:{}'
+SIZES_KEY = 'pantry:{}:recipe-sizes'
+# Recipes per bitmap container: 4096 bits = 512 bytes, so an ingredient used by a handful of
+# recipes costs one small container instead of a bitset as long as the whole recipe table
+BLOCK_BITS = 4096
+# Redis BITFIELD type/NumPy dtype of the per-recipe ingredient counts (big-endian like BITFIELD)
+SIZE_FIELD = 'u16'
+SIZE_DTYPE = '>u2'
+SIZE_BYTES = 2
+# Containers per MSET while rebuilding (512 bytes each)
+WRITE_BATCH_SIZE = 1000
+
+
+class PantryIndex(GenerationalIndex):
+    """ Inverted Index Of Ingredient -> Recipe Bitsets Shared Through Redis
+
+    Each ingredient's recipe set is split Roaring-style into fixed containers:
+    `pantry:<generation>:ingredient:<id>:<block>` is a bitmap where bit n stands for recipe
+    `block * BLOCK_BITS + n` (Redis SETBIT order, i.e. NumPy's big-endian `packbits` order),
+    and `pantry:<generation>:ingredient:<id>:blocks` lists the containers that exist.
+    `pantry:<generation>:recipe-sizes` holds every recipe's ingredient count as a u16 at offset
+    recipe id. Scoring a pantry is two pipelined round trips plus an unpack-and-sum over the
+    containers, instead of a GROUP BY over the through table per request.
+    """
+
+    prefix = 'pantry'
+
+    def rebuild(self, chunk_size: int = 10000) -> int:
+        """ Rebuild Every Container From The Through Table Into A New Generation; Returns The Container Count
+
+        The rows arrive ordered by ingredient then recipe, so only one container is being filled
+        at a time and finished ones are written WRITE_BATCH_SIZE at a time. Changes committed
+        while the snapshot is being read are only picked up by the next incremental update of the
+        same recipe or by the next rebuild.
+        """
+        generation = self.start_generation()
+        through = Recipe.ingredients.through
+        max_recipe_id = Recipe.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        sizes = np.zeros(max_recipe_id + 1, dtype=SIZE_DTYPE)
+        containers = {}
+        written = 0
+        current, bits = None, None
+
+        rows = through.objects.order_by('ingredient_id', 'recipe_id').values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator(chunk_size=chunk_size):
+            block, offset = divmod(recipe_id, BLOCK_BITS)
+            if (ingredient_id, block) != current:
+                if current is not None:
+                    containers[current] = np.packbits(bits).tobytes()
+                if len(containers) >= WRITE_BATCH_SIZE:
+                    written += self._write_containers(generation, containers)
+                    containers = {}
+                current, bits = (ingredient_id, block), np.zeros(BLOCK_BITS, dtype=bool)
+            bits[offset] = True
+            sizes[recipe_id] += 1
+        if current is not None:
+            containers[current] = np.packbits(bits).tobytes()
+        written += self._write_containers(generation, containers)
+
+        self.redis.set(SIZES_KEY.format(generation), sizes.tobytes())
+        self.publish_generation(generation)
+        return written
+
+    def _write_containers(self, generation: str, containers: dict) -> int:
+        """ Store {(ingredient_id, block): packed bits} And Register The Blocks """
+        if not containers:
+            return 0
+        blocks = {}
+        for ingredient_id, block in containers:
+            blocks.setdefault(ingredient_id, []).append(block)
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.mset({BLOCK_KEY.format(generation, *key): raw for key, raw in containers.items()})
+        for ingredient_id, block_numbers in blocks.items():
+            pipeline.sadd(BLOCKS_KEY.format(generation, ingredient_id), *block_numbers)
+        pipeline.execute()
+        return len(containers)
+
+    def refresh(self, recipe_ids, ingredient_ids):
+        """ Re-Sync The Given (recipe, ingredient) Pairs And Recipe Sizes From The Database
+
+        Idempotent: every bit in `recipe_ids x ingredient_ids` is set from the through table,
+        so it is safe for adds, removes, clears and deletes from either side of the relation.
+        """
+        recipe_ids, ingredient_ids = set(recipe_ids), set(ingredient_ids)
+        generation = self.get_generation()
+        if not recipe_ids or generation is None:
+            return
+
+        through = Recipe.ingredients.through
+        linked = set(through.objects.filter(
+            recipe_id__in=recipe_ids, ingredient_id__in=ingredient_ids,
+        ).values_list('recipe_id', 'ingredient_id'))
+        sizes = dict(through.objects.filter(recipe_id__in=recipe_ids).values('recipe_id').annotate(
+            size=Count('*'),
+        ).values_list('recipe_id', 'size'))
+
+        pipeline = self.redis.pipeline(transaction=True)
+        for ingredient_id in ingredient_ids:
+            for recipe_id in recipe_ids:
+                block, offset = divmod(recipe_id, BLOCK_BITS)
+                if (recipe_id, ingredient_id) in linked:
+                    pipeline.sadd(BLOCKS_KEY.format(generation, ingredient_id), block)
+                    pipeline.setbit(BLOCK_KEY.format(generation, ingredient_id, block), offset, 1)
+                else:
+                    pipeline.setbit(BLOCK_KEY.format(generation, ingredient_id, block), offset, 0)
+        for recipe_id in recipe_ids:
+            pipeline.execute_command(
+                'BITFIELD', SIZES_KEY.format(generation), 'SET', SIZE_FIELD, f'#{recipe_id}', sizes.get(recipe_id, 0),
+            )
+        pipeline.execute()
+
+    def add_recipes(self, links):
+        """ Index New Recipes From Their (recipe_id, ingredient_id) Links Without Re-Reading The Database """
+        generation = self.get_generation()
+        if generation is None:
+            return
+        sizes = {}
+        pipeline = self.redis.pipeline(transaction=True)
+        for recipe_id, ingredient_id in links:
+            block, offset = divmod(recipe_id, BLOCK_BITS)
+            pipeline.sadd(BLOCKS_KEY.format(generation, ingredient_id), block)
+            pipeline.setbit(BLOCK_KEY.format(generation, ingredient_id, block), offset, 1)
+            sizes[recipe_id] = sizes.get(recipe_id, 0) + 1
+        for recipe_id, size in sizes.items():
+            pipeline.execute_command('BITFIELD', SIZES_KEY.format(generation), 'SET', SIZE_FIELD, f'#{recipe_id}', size)
+        pipeline.execute()
+
+    def forget_ingredients(self, ingredient_ids, recipe_ids):
+        """ Drop Deleted Ingredients' Containers And Re-Count The Recipes That Used Them """
+        generation = self.get_generation()
+        if generation is None:
+            return
+        for ingredient_id in ingredient_ids:
+            blocks_key = BLOCKS_KEY.format(generation, ingredient_id)
+            block_keys = [
+                BLOCK_KEY.format(generation, ingredient_id, block.decode()) for block in self.redis.smembers(blocks_key)
+            ]
+            self.redis.delete(blocks_key, *block_keys)
+        self.refresh(recipe_ids, [])
+
+    def _get_block_keys(self, generation: str, ingredient_ids) -> dict:
+        """ Container Keys Of The Given Ingredients, Grouped By Block """
+        pipeline = self.redis.pipeline(transaction=False)
+        for ingredient_id in ingredient_ids:
+            pipeline.smembers(BLOCKS_KEY.format(generation, ingredient_id))
+        block_keys = {}
+        for ingredient_id, ingredient_blocks in zip(ingredient_ids, pipeline.execute()):
+            for block in ingredient_blocks:
+                block_keys.setdefault(int(block), []).append(BLOCK_KEY.format(generation, ingredient_id, int(block)))
+        return block_keys
+
+    def score(self, ingredient_ids, limit: int):
+        """ Top Recipes For A Pantry As (recipe_id, matched, missing, coverage), Best Coverage First
+
+        None while the index is not built.
+        """
+        generation = self.get_generation()
+        if generation is None:
+            return None
+        ingredient_ids = sorted(set(ingredient_ids))
+        if not ingredient_ids:
+            return []
+
+        block_keys = self._get_block_keys(generation, ingredient_ids)
+        if not block_keys:
+            return []
+
+        blocks = sorted(block_keys)
+        pipeline = self.redis.pipeline(transaction=False)
+        for block in blocks:
+            pipeline.mget(block_keys[block])
+            start = block * BLOCK_BITS * SIZE_BYTES
+            pipeline.getrange(SIZES_KEY.format(generation), start, start + BLOCK_BITS * SIZE_BYTES - 1)
+        replies = pipeline.execute()
+
+        recipe_ids, matched, sizes = [], [], []
+        for index, block in enumerate(blocks):
+            raw_containers, raw_sizes = replies[2 * index], replies[2 * index + 1]
+            block_matched = np.zeros(BLOCK_BITS, dtype=np.int32)
+            for raw in raw_containers:
+                if raw:
+                    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8))[:BLOCK_BITS]
+                    block_matched[:len(bits)] += bits
+            block_sizes = np.zeros(BLOCK_BITS, dtype=np.int32)
+            stored_sizes = np.frombuffer(raw_sizes[:len(raw_sizes) - len(raw_sizes) % SIZE_BYTES], dtype=SIZE_DTYPE)
+            block_sizes[:len(stored_sizes)] = stored_sizes
+
+            offsets = np.flatnonzero(block_matched)
+            recipe_ids.append(offsets + block * BLOCK_BITS)
+            matched.append(block_matched[offsets])
+            sizes.append(block_sizes[offsets])
+
+        recipe_ids, matched = np.concatenate(recipe_ids), np.concatenate(matched)
+        sizes = np.maximum(np.concatenate(sizes), matched)
+        missing = sizes - matched
+        coverage = matched / sizes
+        # lexsort keys run least significant first: coverage desc, then missing asc, then newest
+        order = np.lexsort((-recipe_ids, missing, -coverage))[:limit]
+
+        return [
+            (int(recipe_ids[i]), int(matched[i]), int(missing[i]), float(coverage[i]))
+            for i in order
+        ]
+
+
+def sync_pantry_index(operation, *args):
+    """ on_commit Callback: Apply An Incremental Update, Or Mark The Index Stale If That Fails """
+    try:
+        getattr(PantryIndex(), operation)(*args)
+    except Exception as ex:
+        logging.error(f"Pantry index update failed, run build_pantry_index to rebuild it. \n{ex}")
+        try:
+            PantryIndex().invalidate()
+        except Exception as invalidate_ex:
+            logging.error(f"Could not invalidate the pantry index. \n{invalidate_ex}")
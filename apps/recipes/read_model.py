@@ -0,0 +1,139 @@
+import contextlib
+import contextvars
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from apps.recipes import serializers
+from apps.recipes.models import Recipe, RecipeReadModel
+
+CARD = 'card'
+DETAIL = 'detail'
+REFRESHED_FIELDS = ['card', 'detail', 'source_updated_at', 'refreshed_at']
+
+# Recipe ids collected inside deferred_refresh(); None when refreshes run immediately
+_pending = contextvars.ContextVar('read_model_pending', default=None)
+
+
+def build_documents(recipe: Recipe) -> dict:
+    """ Card And Detail Exactly As RecipeSerializer / RecipeDetailSerializer Render Them """
+    return {
+        CARD: to_json(serializers.RecipeSerializer(recipe).data),
+        DETAIL: to_json(serializers.RecipeDetailSerializer(recipe).data),
+    }
+
+
+def to_json(data) -> str:
+    """ JSON Text In The Serializer's Field Order, So Stored And Freshly Built Documents Compare Equal """
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+def load_recipes(recipe_ids):
+    # Card and detail come from the same instances: the detail prefetches cover both
+    return serializers.RecipeDetailSerializer.setup_eager_loading(Recipe.objects.filter(pk__in=recipe_ids), only=False)
+
+
+def refresh(recipe_ids):
+    """ Rebuild The Documents Of The Given Recipes, Or Queue Them Inside deferred_refresh() """
+    recipe_ids = set(recipe_ids)
+    pending = _pending.get()
+    if pending is not None:
+        pending.update(recipe_ids)
+        return []
+    if not recipe_ids:
+        return []
+
+    rows = [
+        RecipeReadModel(recipe_id=recipe.pk, source_updated_at=recipe.updated_at, **build_documents(recipe))
+        for recipe in load_recipes(recipe_ids)
+    ]
+    return RecipeReadModel.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['recipe'], update_fields=REFRESHED_FIELDS,
+    )
+
+
+@contextlib.contextmanager
+def deferred_refresh():
+    """ Collect Refreshes From Signals And Run Them Once On Exit, In The Same Transaction
+
+    Creating a recipe with N tags fires a signal per tag; inside this block they cost one
+    rebuild of the recipe instead of N.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+
+    token = _pending.set(set())
+    try:
+        with transaction.atomic():
+            yield
+            recipe_ids = _pending.get()
+            _pending.set(None)
+            refresh(recipe_ids)
+    finally:
+        _pending.reset(token)
+
+
+def get_documents(recipes, document: str = CARD, extra_fields=(), fields=None) -> list:
+    """ Stored Documents For A Page Of Recipes Loaded With select_related('read_model')
+
+    `fields` trims each document to a sparse fieldset.
+
+    Recipes without a row yet (written by bulk paths that skip signals, or before the first
+    rebuild) are built on the spot, so the read model never hides a recipe.
+    """
+    recipes = list(recipes)
+    documents = {}
+    for recipe in recipes:
+        try:
+            documents[recipe.pk] = json.loads(getattr(recipe.read_model, document))
+        except RecipeReadModel.DoesNotExist:
+            pass
+    missing = [recipe.pk for recipe in recipes if recipe.pk not in documents]
+    for row in refresh(missing):
+        documents[row.recipe_id] = json.loads(getattr(row, document))
+
+    rendered = [
+        dict(documents[recipe.pk], **{field: getattr(recipe, field) for field in extra_fields})
+        for recipe in recipes
+        if recipe.pk in documents
+    ]
+    if fields is not None:
+        rendered = [{name: item[name] for name in fields} for item in rendered]
+    return rendered
+
+
+def get_detail(pk: int):
+    """ Stored Detail Document Of One Recipe, Or None When The Recipe Does Not Exist """
+    detail = RecipeReadModel.objects.filter(recipe_id=pk).values_list('detail', flat=True).first()
+    if detail is None:
+        rows = refresh([pk])
+        detail = rows[0].detail if rows else None
+    return json.loads(detail) if detail is not None else None
+
+
+def rebuild(chunk_size: int = 500) -> int:
+    """ Rebuild Every Document; Returns The Number Of Recipes Written """
+    recipe_ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), chunk_size):
+        with transaction.atomic():
+            refresh(recipe_ids[start:start + chunk_size])
+    return len(recipe_ids)
+
+
+def check_consistency(chunk_size: int = 500) -> dict:
+    """ Compare Every Stored Document With A Fresh Build: Ids Of Missing And Stale Rows """
+    report = {'checked': 0, 'missing': [], 'stale': []}
+    recipe_ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), chunk_size):
+        chunk = recipe_ids[start:start + chunk_size]
+        stored = {row.recipe_id: row for row in RecipeReadModel.objects.filter(recipe_id__in=chunk)}
+        for recipe in load_recipes(chunk):
+            report['checked'] += 1
+            row = stored.get(recipe.pk)
+            if row is None:
+                report['missing'].append(recipe.pk)
+            elif {CARD: row.card, DETAIL: row.detail} != build_documents(recipe):
+                report['stale'].append(recipe.pk)
+    return report
@@ -1,15 +1,74 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
 from apps.ingredients.models import Ingredient
 from apps.ingredients.serializers import IngredientSerializer
+from apps.recipes import read_model
 from apps.recipes.models import Recipe
+from apps.recipes.pantry import sync_pantry_index
+from apps.recipes.similar import sync_similar_index
 from apps.tags.models import Tag
 from apps.tags.serializers import TagSerializer
+from apps.utils.eager_loading import EagerLoadingMixin
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """ Creates A Batch Of Recipes With Shared Tag/Ingredient Resolution And Bulk Inserts """
+
+    def create(self, validated_data):
+        # db_queries imports this module, so it is only imported once both are loaded
+        from apps.utils import db_queries, response_cache
+
+        if not validated_data:
+            return []
+        relations = [(item.pop('tags', []), item.pop('ingredients', [])) for item in validated_data]
+        # A batch belongs to one user: save(user=...) sets it on every item
+        user = validated_data[0]['user']
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([Recipe(**item) for item in validated_data])
+
+            tag_ids = db_queries.resolve_tag_ids(
+                (tag['name'] for tags, _ in relations for tag in tags), creator=user,
+            )
+            ingredient_ids = db_queries.resolve_ingredient_ids(
+                (ingredient['name'] for _, ingredients in relations for ingredient in ingredients), user=user,
+            )
+            tag_links = {
+                (recipe.pk, tag_ids[tag['name']])
+                for recipe, (tags, _) in zip(recipes, relations)
+                for tag in tags
+            }
+            ingredient_links = {
+                (recipe.pk, ingredient_ids[ingredient['name']])
+                for recipe, (_, ingredients) in zip(recipes, relations)
+                for ingredient in ingredients
+            }
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id) for recipe_id, tag_id in tag_links
+            ])
+            Recipe.ingredients.through.objects.bulk_create([
+                Recipe.ingredients.through(recipe_id=recipe_id, ingredient_id=ingredient_id)
+                for recipe_id, ingredient_id in ingredient_links
+            ])
+
+            # bulk_create skips the model signals: maintain what they would, once for the batch
+            db_queries.update_recipe_search_vectors([recipe.pk for recipe in recipes])
+            response_cache.invalidate(response_cache.RECIPES)
+            links = sorted(ingredient_links)
+            transaction.on_commit(lambda: sync_pantry_index('add_recipes', links))
+            recipe_ids = [recipe.pk for recipe in recipes]
+            transaction.on_commit(lambda: sync_similar_index(recipe_ids))
+
+        prefetch_related_objects(recipes, 'tags')
+        return recipes
+
+
+class RecipeSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """ Serializer For Recipes """
 
+    prefetch_related_fields = ('tags',)
+
     title = serializers.CharField(required=True)
     preparation_time_minutes = serializers.IntegerField(required=True)
     price = serializers.DecimalField(required=True, decimal_places=2, max_digits=5)
@@ -45,62 +104,73 @@ class RecipeSerializer(serializers.ModelSerializer):
             'link',
             'ingredients',
         ]
-
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
-        auth_user = recipe.user
-
-        for tag in tags:
-            # Check if the tag already exists
-            tag_obj = Tag.objects.filter(name=tag['name']).first()
-
-            # If the tag belongs to a different user, create a new tag with the same name
-            if tag_obj is None:
-                tag_obj = Tag.objects.create(creator=auth_user, name=tag['name'])
-
-            # Add the tag to the recipe if it's not already present
-            if tag_obj not in recipe.tags.all():
-                recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """ Handle Getting Or Creating Ingredients As Needed """
-        auth_user = recipe.user
-        for ingredient in ingredients:
-            ingredient_obj, create = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        list_serializer_class = RecipeListSerializer
+
+    def _resolve_tag_ids(self, tags, recipe) -> set:
+        """ Ids Of Tags By Name, Creating Missing Ones, In A Fixed Number Of Statements """
+        # db_queries imports this module, so it is only imported once both are loaded
+        from apps.utils import db_queries
+
+        return set(db_queries.resolve_tag_ids((tag['name'] for tag in tags), creator=recipe.user).values())
+
+    def _resolve_ingredient_ids(self, ingredients, recipe) -> set:
+        """ Ids Of The User's Ingredients By Name, Creating Missing Ones, In A Fixed Number Of Statements """
+        from apps.utils import db_queries
+
+        ingredient_ids = db_queries.resolve_ingredient_ids(
+            (ingredient['name'] for ingredient in ingredients), user=recipe.user,
+        )
+        return set(ingredient_ids.values())
+
+    @staticmethod
+    def _sync_related(manager, related_ids: set):
+        """ Remove And Add Only The Through Rows That Differ, One Bulk Statement Each """
+        current_ids = set(manager.values_list('pk', flat=True))
+        removed_ids, added_ids = current_ids - related_ids, related_ids - current_ids
+        if removed_ids:
+            manager.remove(*removed_ids)
+        if added_ids:
+            manager.add(*added_ids)
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
         ingredients_data = validated_data.pop('ingredients', [])
 
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags=tags_data, recipe=recipe)
-        self._get_or_create_ingredients(ingredients=ingredients_data, recipe=recipe)
+        with read_model.deferred_refresh():
+            recipe = Recipe.objects.create(**validated_data)
+            tag_ids = self._resolve_tag_ids(tags_data, recipe)
+            if tag_ids:
+                recipe.tags.add(*tag_ids)
+            ingredient_ids = self._resolve_ingredient_ids(ingredients_data, recipe)
+            if ingredient_ids:
+                recipe.ingredients.add(*ingredient_ids)
 
         return recipe
 
     def update(self, instance, validated_data):
-        """Update recipe."""
+        """ Update Recipe, Writing Only What Differs: A No-Op Update Issues No Writes """
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        instance.save()
+        with read_model.deferred_refresh():
+            if tags is not None:
+                self._sync_related(instance.tags, self._resolve_tag_ids(tags, instance))
+            if ingredients is not None:
+                self._sync_related(instance.ingredients, self._resolve_ingredient_ids(ingredients, instance))
+
+            changed_fields = [attr for attr, value in validated_data.items() if getattr(instance, attr) != value]
+            for attr in changed_fields:
+                setattr(instance, attr, validated_data[attr])
+            # When only the relations changed, the m2m signal has already moved updated_at
+            if changed_fields:
+                instance.save(update_fields=changed_fields + ['updated_at'])
         return instance
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """ Serializer For Recipe Details """
+
+    prefetch_related_fields = ('tags', 'ingredients')
+
     image = serializers.ImageField(required=False)
     description = serializers.CharField(required=False, write_only=False)
     link = serializers.CharField(required=False, write_only=False)
@@ -116,6 +186,68 @@ class RecipeDetailSerializer(RecipeSerializer):
         read_only_fields = RecipeSerializer.Meta.read_only_fields + ['updated_at']
 
 
+class RecipeSearchSerializer(RecipeSerializer):
+    """ Serializer For Full Text Search Results """
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['rank', 'headline']
+
+
+class PantryMatchSerializer(RecipeSerializer):
+    """ Serializer For Recipes Ranked By Pantry Coverage """
+    coverage = serializers.FloatField(read_only=True)
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['coverage', 'matched_count', 'missing_count']
+
+
+class SimilarRecipeSerializer(RecipeSerializer):
+    """ Serializer For Recipes Ranked By Tag And Ingredient Overlap """
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['similarity']
+
+
+class TrendingRecipeSerializer(RecipeSerializer):
+    """ Serializer For Recipes Ranked By Recent Views """
+    trending_score = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['trending_score']
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    """ Serializer For One Imported Row: The Export Columns, Tags And Ingredients By Name """
+
+    title = serializers.CharField(max_length=Recipe._meta.get_field('title').max_length)
+    description = serializers.CharField(allow_blank=True, required=False, default='')
+    preparation_time_minutes = serializers.IntegerField(min_value=0)
+    price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    difficulty_level = serializers.ChoiceField(choices=Recipe.DIFFICULTY_CHOICES, required=False, default=0)
+    link = serializers.CharField(allow_blank=True, required=False, default='')
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=Tag._meta.get_field('name').max_length),
+        required=False,
+        default=list,
+    )
+    ingredient_names = serializers.ListField(
+        child=serializers.CharField(max_length=Ingredient._meta.get_field('name').max_length),
+        required=False,
+        default=list,
+    )
+
+
+class RecipeImportUploadSerializer(serializers.Serializer):
+    """ Serializer For A Bulk Import Upload """
+    file = serializers.FileField()
+    import_format = serializers.ChoiceField(choices=['ndjson', 'csv'], required=False)
+
+
 class RecipeDownloadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
@@ -0,0 +1,190 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.ingredients.models import Ingredient
+from apps.recipes.models import Recipe
+from apps.recipes import read_model
+from apps.recipes.pantry import sync_pantry_index
+from apps.recipes.similar import sync_similar_index
+from apps.recipes.trending import forget_recipes
+from apps.tags.models import Tag
+from apps.utils import db_queries, response_cache
+
+# Recipes re-derived per transaction when a tag or ingredient they render changes
+FAN_OUT_BATCH_SIZE = 500
+
+
+def refresh_recipes(recipe_ids):
+    """ Re-Derive What Is Stored Per Recipe: search_vector And The Read Model Documents """
+    recipe_ids = list(recipe_ids)
+    db_queries.update_recipe_search_vectors(recipe_ids)
+    read_model.refresh(recipe_ids)
+
+
+def refresh_linked_recipes(recipe_ids, namespace: str):
+    """ Refresh The Recipes Rendering A Changed Tag Or Ingredient Once The Change Commits
+
+    A popular tag is linked to a large share of the catalog, so instead of one burst of writes
+    inside the request's transaction the recipes are refreshed FAN_OUT_BATCH_SIZE per
+    transaction afterwards. The namespace is bumped again at the end, so nothing cached from
+    the old documents meanwhile is served on.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if recipe_ids:
+        transaction.on_commit(lambda: refresh_in_batches(recipe_ids, namespace))
+
+
+def refresh_in_batches(recipe_ids, namespace: str):
+    try:
+        for start in range(0, len(recipe_ids), FAN_OUT_BATCH_SIZE):
+            with transaction.atomic():
+                refresh_recipes(recipe_ids[start:start + FAN_OUT_BATCH_SIZE])
+    except Exception as ex:
+        logging.error(f"Refreshing linked recipes failed, run check_recipe_read_model --fix. \n{ex}")
+    response_cache.invalidate(namespace)
+
+
+def refresh_similar_recipes(recipe_ids):
+    """ Re-Sign Recipes In The Similar Recipes Index Once Their Relations Are Committed """
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: sync_similar_index(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_search_vector(sender, instance, **kwargs):
+    """ Keep search_vector And The Read Model In Sync With The Recipe Columns """
+    refresh_recipes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_search_vector_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Re-Index Recipes Whose Tag Or Ingredient Set Changed, From Either Side Of The Relation """
+    if action == 'pre_clear' and reverse:
+        # After a reverse clear the affected recipes can no longer be looked up
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = getattr(instance, '_cleared_recipe_ids', [])
+    else:
+        recipe_ids = pk_set or []
+
+    if recipe_ids:
+        # The detail validators are built from updated_at, which add()/remove() leave alone
+        Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+        refresh_recipes(recipe_ids)
+        refresh_similar_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+def refresh_search_vector_on_tag_rename(sender, instance, created, **kwargs):
+    if not created:
+        refresh_linked_recipes(instance.recipe_set.values_list('pk', flat=True), response_cache.TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_search_vector_on_ingredient_rename(sender, instance, created, **kwargs):
+    if not created:
+        # Ingredients are compared by name in the similar recipes index
+        recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+        refresh_linked_recipes(recipe_ids, response_cache.INGREDIENTS)
+        refresh_similar_recipes(recipe_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_before_delete(sender, instance, **kwargs):
+    """ The Through Rows Are Gone By post_delete, So Collect The Affected Recipes First """
+    instance._affected_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_search_vector_on_delete(sender, instance, **kwargs):
+    recipe_ids = getattr(instance, '_affected_recipe_ids', [])
+    namespace = response_cache.TAGS if sender is Tag else response_cache.INGREDIENTS
+    refresh_linked_recipes(recipe_ids, namespace)
+    refresh_similar_recipes(recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_pantry_index_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Re-Sync The Changed (recipe, ingredient) Pairs Once The Transaction Commits """
+    if action == 'pre_clear':
+        related = instance.recipe_set if reverse else instance.ingredients
+        instance._pantry_cleared_ids = list(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    related_ids = getattr(instance, '_pantry_cleared_ids', []) if action == 'post_clear' else list(pk_set or [])
+    if not related_ids:
+        return
+    if reverse:
+        recipe_ids, ingredient_ids = related_ids, [instance.pk]
+    else:
+        recipe_ids, ingredient_ids = [instance.pk], related_ids
+    transaction.on_commit(lambda: sync_pantry_index('refresh', recipe_ids, ingredient_ids))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_ingredients_before_recipe_delete(sender, instance, **kwargs):
+    instance._pantry_ingredient_ids = list(instance.ingredients.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def refresh_pantry_index_on_recipe_delete(sender, instance, **kwargs):
+    recipe_ids, ingredient_ids = [instance.pk], getattr(instance, '_pantry_ingredient_ids', [])
+    transaction.on_commit(lambda: sync_pantry_index('refresh', recipe_ids, ingredient_ids))
+
+
+@receiver(post_delete, sender=Recipe)
+def refresh_similar_index_on_recipe_delete(sender, instance, **kwargs):
+    refresh_similar_recipes([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_deleted_recipe_from_trending(sender, instance, **kwargs):
+    recipe_ids = [instance.pk]
+    transaction.on_commit(lambda: forget_recipes(recipe_ids))
+
+
+@receiver(post_delete, sender=Ingredient)
+def refresh_pantry_index_on_ingredient_delete(sender, instance, **kwargs):
+    ingredient_id, recipe_ids = instance.pk, getattr(instance, '_affected_recipe_ids', [])
+    transaction.on_commit(lambda: sync_pantry_index('forget_ingredients', [ingredient_id], recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_responses(sender, **kwargs):
+    response_cache.invalidate(response_cache.RECIPES)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_responses_on_m2m_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        response_cache.invalidate(response_cache.RECIPES)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_responses(sender, **kwargs):
+    response_cache.invalidate(response_cache.TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_responses(sender, **kwargs):
+    response_cache.invalidate(response_cache.INGREDIENTS)
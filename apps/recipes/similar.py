@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+
+import numpy as np
+
+from apps.recipes.models import Recipe
+from apps.utils.redis_index import GenerationalIndex
+
+# Formatted with the index generation first
+SIGNATURE_KEY = 'similar:{}:signature:{}'
+BAND_KEY = 'similar:{}:band:{}:{}'
+NEIGHBORS_KEY = 'similar:{}:neighbors:{}'
+
+# 64 permutations split into 16 bands of 4 rows: two recipes share a band bucket with
+# probability 1 - (1 - J^4)^16, i.e. the candidate threshold sits around Jaccard 0.5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Universal hashing h(x) = (a * x + b) mod p over 32-bit token hashes; a * x stays below 2^63
+PRIME = (1 << 31) - 1
+_coefficients = np.random.RandomState(20231113)
+HASH_A = _coefficients.randint(1, PRIME, NUM_PERM).astype(np.uint64)
+HASH_B = _coefficients.randint(0, PRIME, NUM_PERM).astype(np.uint64)
+SIGNATURE_DTYPE = '<u4'
+
+# Neighbor lists are cached this long, so a missed invalidation heals on its own
+NEIGHBORS_TIMEOUT = 24 * 60 * 60
+MAX_NEIGHBORS = 50
+# A bucket of near-identical recipes can grow huge; sample it instead of reading it whole
+MAX_BUCKET_CANDIDATES = 500
+
+
+def hash_token(token: str) -> int:
+    """ Stable 32-bit Hash (Python's hash() Is Salted Per Process) """
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def load_features(recipe_ids) -> dict:
+    """ Each Recipe's Feature Set: Its Tag Ids And Its Ingredient Names
+
+    Ingredients are per user, so they are compared by (lowercased) name: two users' "Salt"
+    count as the same ingredient. Tags are shared and compared by id.
+    """
+    features = {recipe_id: set() for recipe_id in recipe_ids}
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).values_list('recipe_id', 'tag_id'):
+        features[recipe_id].add(f't:{tag_id}')
+    for recipe_id, name in Recipe.ingredients.through.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).values_list('recipe_id', 'ingredient__name'):
+        features[recipe_id].add(f'i:{name.strip().lower()}')
+    return features
+
+
+def compute_signatures(features: dict) -> dict:
+    """ MinHash Signatures Of Every Non-Empty Feature Set, Computed In One Vectorized Pass
+
+    All tokens are hashed under every permutation as one (tokens x NUM_PERM) matrix, and
+    np.minimum.reduceat takes the column minimums over each recipe's run of rows.
+    """
+    recipe_ids = [recipe_id for recipe_id, tokens in features.items() if tokens]
+    if not recipe_ids:
+        return {}
+    token_hashes = np.array(
+        [hash_token(token) for recipe_id in recipe_ids for token in features[recipe_id]], dtype=np.uint64,
+    )
+    starts = np.cumsum([0] + [len(features[recipe_id]) for recipe_id in recipe_ids[:-1]])
+    hashed = (np.outer(token_hashes, HASH_A) + HASH_B) % PRIME
+    signatures = np.minimum.reduceat(hashed, starts, axis=0).astype(SIGNATURE_DTYPE)
+    return dict(zip(recipe_ids, signatures))
+
+
+def get_band_keys(generation: str, signature: np.ndarray) -> list:
+    return [
+        BAND_KEY.format(generation, band, signature[band * ROWS:(band + 1) * ROWS].tobytes().hex())
+        for band in range(BANDS)
+    ]
+
+
+class SimilarRecipesIndex(GenerationalIndex):
+    """ MinHash + LSH Index Of Recipes By Tag And Ingredient Overlap, Shared Through Redis
+
+    `similar:<generation>:signature:<id>` holds a recipe's MinHash signature and every band of
+    it is a bucket `similar:<generation>:band:<band>:<values>` listing the recipes with that
+    exact band, so the candidates for a recipe are the members of its BANDS buckets instead of
+    every recipe. Candidates are ranked by estimated Jaccard similarity (the share of equal
+    signature positions) and the top MAX_NEIGHBORS are cached in
+    `similar:<generation>:neighbors:<id>`, which is what a lookup reads. Changing a recipe's
+    tags or ingredients re-buckets it and drops the cached lists of every recipe in its old and
+    new buckets.
+    """
+
+    prefix = 'similar'
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """ Re-Sign And Re-Bucket Every Recipe Into A New Generation; Returns The Number Of Recipes Indexed
+
+        Lookups keep reading the current generation until the new one is complete. Changes
+        committed meanwhile are only picked up by the next refresh of the same recipe or by the
+        next rebuild.
+        """
+        generation = self.start_generation()
+        indexed = 0
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(recipe_ids), chunk_size):
+            signatures = compute_signatures(load_features(recipe_ids[start:start + chunk_size]))
+            if not signatures:
+                continue
+            buckets = {}
+            for recipe_id, signature in signatures.items():
+                for band_key in get_band_keys(generation, signature):
+                    buckets.setdefault(band_key, []).append(recipe_id)
+            # One command per bucket rather than per (recipe, band): command packing dominates otherwise
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.mset({
+                SIGNATURE_KEY.format(generation, recipe_id): signature.tobytes()
+                for recipe_id, signature in signatures.items()
+            })
+            for band_key, members in buckets.items():
+                pipeline.sadd(band_key, *members)
+            pipeline.execute()
+            indexed += len(signatures)
+        self.publish_generation(generation)
+        return indexed
+
+    def refresh(self, recipe_ids):
+        """ Re-Sign Recipes Whose Tags Or Ingredients Changed, Or That Were Deleted """
+        recipe_ids = sorted(set(recipe_ids))
+        generation = self.get_generation()
+        if not recipe_ids or generation is None:
+            return
+
+        signatures = compute_signatures(load_features(recipe_ids))
+        old_signatures = self.redis.mget([SIGNATURE_KEY.format(generation, recipe_id) for recipe_id in recipe_ids])
+        moves = []
+        for recipe_id, raw in zip(recipe_ids, old_signatures):
+            old_keys = set(get_band_keys(generation, np.frombuffer(raw, dtype=SIGNATURE_DTYPE))) if raw else set()
+            new_keys = set(get_band_keys(generation, signatures[recipe_id])) if recipe_id in signatures else set()
+            moves.append((recipe_id, old_keys, new_keys))
+
+        # Everyone sharing an old or new bucket may gain or lose this recipe as a neighbor
+        touched_keys = sorted({key for _, old_keys, new_keys in moves for key in old_keys | new_keys})
+        pipeline = self.redis.pipeline(transaction=False)
+        for key in touched_keys:
+            pipeline.srandmember(key, MAX_BUCKET_CANDIDATES)
+        stale_neighbors = {int(member) for members in pipeline.execute() for member in members}
+        stale_neighbors.update(recipe_ids)
+
+        pipeline = self.redis.pipeline(transaction=True)
+        for recipe_id, old_keys, new_keys in moves:
+            for key in old_keys - new_keys:
+                pipeline.srem(key, recipe_id)
+            for key in new_keys - old_keys:
+                pipeline.sadd(key, recipe_id)
+            if recipe_id in signatures:
+                pipeline.set(SIGNATURE_KEY.format(generation, recipe_id), signatures[recipe_id].tobytes())
+            else:
+                pipeline.delete(SIGNATURE_KEY.format(generation, recipe_id))
+        pipeline.delete(*[NEIGHBORS_KEY.format(generation, recipe_id) for recipe_id in stale_neighbors])
+        pipeline.execute()
+
+    def find_neighbors(self, generation: str, recipe_id: int) -> list:
+        """ (recipe_id, similarity) Of The Closest Bucket-Mates, Most Similar (Then Newest) First """
+        raw = self.redis.get(SIGNATURE_KEY.format(generation, recipe_id))
+        if raw is None:
+            return []
+        signature = np.frombuffer(raw, dtype=SIGNATURE_DTYPE)
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for band_key in get_band_keys(generation, signature):
+            pipeline.srandmember(band_key, MAX_BUCKET_CANDIDATES)
+        candidates = sorted({int(member) for members in pipeline.execute() for member in members} - {recipe_id})
+        if not candidates:
+            return []
+
+        raw_signatures = self.redis.mget([SIGNATURE_KEY.format(generation, candidate) for candidate in candidates])
+        found = [(candidate, raw) for candidate, raw in zip(candidates, raw_signatures) if raw]
+        if not found:
+            return []
+        candidate_ids = np.array([candidate for candidate, _ in found])
+        matrix = np.frombuffer(b''.join(raw for _, raw in found), dtype=SIGNATURE_DTYPE).reshape(len(found), NUM_PERM)
+        similarity = (matrix == signature).mean(axis=1)
+        order = np.lexsort((-candidate_ids, -similarity))[:MAX_NEIGHBORS]
+        return [(int(candidate_ids[i]), float(similarity[i])) for i in order]
+
+    def neighbors(self, recipe_id: int, limit: int):
+        """ Cached Neighbor List Of A Recipe, Computed From Its Buckets On A Miss; None While Not Built """
+        generation = self.get_generation()
+        if generation is None:
+            return None
+        key = NEIGHBORS_KEY.format(generation, recipe_id)
+        cached = self.redis.get(key)
+        if cached is None:
+            found = self.find_neighbors(generation, recipe_id)
+            self.redis.set(key, json.dumps(found), ex=NEIGHBORS_TIMEOUT)
+        else:
+            found = [tuple(neighbor) for neighbor in json.loads(cached)]
+        return found[:limit]
+
+
+def sync_similar_index(recipe_ids):
+    """ on_commit Callback: Re-Sign The Recipes, Or Mark The Index Stale If That Fails """
+    try:
+        SimilarRecipesIndex().refresh(recipe_ids)
+    except Exception as ex:
+        logging.error(f"Similar recipes index update failed, run build_similar_recipes_index to rebuild it. \n{ex}")
+        try:
+            SimilarRecipesIndex().invalidate()
+        except Exception as invalidate_ex:
+            logging.error(f"Could not invalidate the similar recipes index. \n{invalidate_ex}")
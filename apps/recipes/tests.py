@@ -1,23 +1,56 @@
+import csv
+import gzip
+import zlib
+import io
+import json
+import tempfile
+import time
+from datetime import datetime, timezone
 from decimal import Decimal
 from unittest.mock import patch
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from django.contrib.postgres.search import SearchQuery
+import brotli
+import msgpack
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from apps.recipes.models import recipe_image_file_path
 from apps.ingredients.models import Ingredient
-from apps.recipes.models import Recipe
+from apps.recipes import bulk_import, read_model, signals
+from apps.recipes.models import Recipe, RecipeReadModel, RecipeStats
+from apps.recipes.pantry import PantryIndex
+from apps.recipes.similar import SimilarRecipesIndex
+from apps.recipes.trending import DAY, HALF_LIFE, PERIOD, RecipeViews, get_period
 from apps.users.tests import create_user
 from apps.recipes.serializers import (
     RecipeSerializer,
-    RecipeDetailSerializer
+    RecipeDetailSerializer,
+    RecipeSearchSerializer
 )
 from apps.tags.models import Tag
+from apps.utils import db_queries
+from apps.utils import compression
+from apps.utils.fast_serialization import RowSerializer
+from apps.utils.renderers import ORJSONRenderer
 
 RECIPES_URL = reverse('recipes:recipe-list')
 RECIPE_CREATE_URL = reverse('recipes:recipe-create')
+PANTRY_URL = reverse('recipes:recipe-pantry')
+EXPORT_URL = reverse('recipes:recipe-export')
+IMPORT_URL = reverse('recipes:recipe-import')
+BATCH_URL = reverse('recipes:recipe-batch')
+TRENDING_URL = reverse('recipes:recipe-trending')
 
 
 def detail_url(recipe_id):
@@ -25,6 +58,10 @@ def detail_url(recipe_id):
     return reverse('recipes:recipe-detail', args=[recipe_id])
 
 
+def similar_url(recipe_id):
+    return reverse('recipes:recipe-similar', args=[recipe_id])
+
+
 def image_upload_url(recipe_id):
     """ Create And Return An Image Upload URL """
     return reverse('recipes:recipe-upload-image', args=[recipe_id])
@@ -67,6 +104,7 @@ class PrivateApiRecipeTests(TestCase):
         )
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
+        cache.clear()
 
     def test_create_recipe_is_successful(self):
         """ Test Creating A recipe Is Successful """
@@ -92,7 +130,7 @@ class PrivateApiRecipeTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """ Test Get Recipe Detail """
@@ -272,6 +310,29 @@ class PrivateApiRecipeTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_query_count_does_not_grow_with_tags(self):
+        """ Test Tags And Ingredients Are Resolved And Linked In A Fixed Number Of Statements """
+        Tag.objects.create(creator=self.user, name='Existing')
+
+        def count_queries(size):
+            payload = {
+                'title': 'Sample recipe name',
+                'description': 'Sample recipe Description',
+                'preparation_time_minutes': 5,
+                'price': Decimal('5.50'),
+                'tags': [{'name': 'Existing'}] + [{'name': f'Tag {size} {index}'} for index in range(size)],
+                'ingredients': [{'name': f'Item {size} {index}'} for index in range(size)],
+            }
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(RECIPE_CREATE_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(1), count_queries(10))
+        recipe = Recipe.objects.get(tags__name='Tag 10 9')
+        self.assertEqual(recipe.tags.count(), 11)
+        self.assertEqual(recipe.ingredients.count(), 10)
+
     def test_create_tag_on_update(self):
         """Test create tag when updating a recipe."""
         recipe = create_recipe(user=self.user)
@@ -284,6 +345,62 @@ class PrivateApiRecipeTests(TestCase):
         new_tag = Tag.objects.get(creator=self.user, name='Lunch')
         self.assertIn(new_tag, recipe.tags.all())
 
+    def test_update_recipe_keeps_unchanged_through_rows(self):
+        """ Test An Update Only Deletes And Inserts The Relations That Changed """
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(
+            Tag.objects.create(creator=self.user, name='Lunch'),
+            Tag.objects.create(creator=self.user, name='Quick'),
+        )
+        kept_row = Recipe.tags.through.objects.get(recipe=recipe, tag__name='Quick')
+
+        payload = {'tags': [{'name': 'Quick'}, {'name': 'Dinner'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['Dinner', 'Quick'])
+        self.assertTrue(Recipe.tags.through.objects.filter(pk=kept_row.pk).exists())
+
+    def test_no_op_update_writes_nothing(self):
+        """ Test Re-Sending The Current Values Issues No Writes And Keeps updated_at """
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(creator=self.user, name='Lunch'))
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='Salt'))
+        recipe.refresh_from_db()
+
+        payload = {
+            'title': recipe.title,
+            'price': recipe.price,
+            'tags': [{'name': 'Lunch'}],
+            'ingredients': [{'name': 'Salt'}],
+        }
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].split(' ', 1)[0] in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).updated_at, recipe.updated_at)
+
+    def test_relation_only_update_writes_updated_at_once(self):
+        """ Test Changing Only The Tags Leaves updated_at To The M2M Signal Instead Of Saving The Recipe Too """
+        recipe = create_recipe(user=self.user)
+        recipe.refresh_from_db()
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.patch(detail_url(recipe.id), {'tags': [{'name': 'Lunch'}]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        updated_at_writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "recipes_recipe"') and '"updated_at" =' in query['sql']
+        ]
+        self.assertEqual(len(updated_at_writes), 1)
+        self.assertGreater(Recipe.objects.get(pk=recipe.pk).updated_at, recipe.updated_at)
+
     def test_update_recipe_assign_tag(self):
         """ Test Assigning An Existing Tag When Updating Recipe """
 
@@ -455,9 +572,9 @@ class PrivateApiRecipeTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -491,6 +608,1272 @@ class PrivateApiRecipeTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_recipes_list_is_paginated_by_cursor(self):
+        """ Test Walking All Pages Returns Every Recipe Once In Order """
+        for index in range(5):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['previous'])
+
+        seen = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [recipe['id'] for recipe in res.data['results']]
+
+        expected = list(Recipe.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_recipes_previous_cursor_returns_previous_page(self):
+        """ Test Following The Previous Link Returns The Earlier Page """
+        for index in range(4):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+
+        first_page = self.client.get(RECIPES_URL, {'page_size': 2})
+        second_page = self.client.get(first_page.data['next'])
+        res = self.client.get(second_page.data['previous'])
+
+        self.assertEqual(res.data['results'], first_page.data['results'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_recipes_invalid_cursor(self):
+        """ Test A Tampered Cursor Is Rejected As Not Found """
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res.data, {'detail': 'Invalid Cursor'})
+
+    def test_recipes_list_query_count_is_constant(self):
+        """ Test Listing Recipes Does Not Run A Tag Query Per Recipe """
+        for index in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {index}')
+            recipe.tags.add(Tag.objects.create(creator=self.user, name=f'Tag {index}'))
+
+        # page joined to the stored cards
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertEqual(len(res.data['results'][0]['tags']), 1)
+
+    def test_recipe_detail_query_count_is_constant(self):
+        """ Test Recipe Detail Loads Tags And Ingredients In One Query Each """
+        recipe = create_recipe(user=self.user)
+        for index in range(3):
+            recipe.tags.add(Tag.objects.create(creator=self.user, name=f'Tag {index}'))
+            recipe.ingredients.add(Ingredient.objects.create(user=self.user, name=f'Ingredient {index}'))
+
+        # validators, stored detail document
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(len(res.data['ingredients']), 3)
+
+    def test_search_ranks_title_above_description(self):
+        """ Test Full Text Search Orders A Title Match Before A Description Match """
+        in_description = create_recipe(user=self.user, title='Weeknight pasta', description='Spicy curry sauce')
+        in_title = create_recipe(user=self.user, title='Chicken curry', description='Simple dinner')
+        create_recipe(user=self.user, title='Fish and chips', description='Fried')
+
+        res = self.client.get(RECIPES_URL, {'recipe': 'curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [in_title.id, in_description.id])
+        self.assertIn('<mark>curry</mark>', res.data['results'][0]['headline'].lower())
+
+    def test_search_matches_tags_and_ingredients(self):
+        """ Test Search Finds Recipes Through Their Tag And Ingredient Names """
+        tagged = create_recipe(user=self.user, title='Morning bowl', description='Oats')
+        tagged.tags.add(Tag.objects.create(creator=self.user, name='Breakfast'))
+        with_ingredient = create_recipe(user=self.user, title='Green salad', description='Leaves')
+        with_ingredient.ingredients.add(Ingredient.objects.create(user=self.user, name='Avocado'))
+
+        tag_res = self.client.get(RECIPES_URL, {'recipe': 'breakfast'})
+        ingredient_res = self.client.get(RECIPES_URL, {'recipe': 'avocado'})
+
+        self.assertEqual([r['id'] for r in tag_res.data['results']], [tagged.id])
+        self.assertEqual([r['id'] for r in ingredient_res.data['results']], [with_ingredient.id])
+
+    def test_search_vector_follows_tag_rename(self):
+        """ Test Renaming A Tag Re-Indexes The Recipes That Use It """
+        recipe = create_recipe(user=self.user, title='Morning bowl', description='Oats')
+        tag = Tag.objects.create(creator=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'Brunch'
+            tag.save()
+
+        res = self.client.get(RECIPES_URL, {'recipe': 'brunch'})
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_recipes_list_served_from_cache(self):
+        """ Test A Repeated List Request Is Validated And Served Without Touching The Database """
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL, {'page_size': 5})['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, {'page_size': 5})
+            not_modified = self.client.get(RECIPES_URL, {'page_size': 5}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipes_list_cache_invalidated_by_tag_rename(self):
+        """ Test Editing A Rendered Tag Drops The Cached Recipe Lists """
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(creator=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+        self.client.get(RECIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'Brunch'
+            tag.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Brunch')
+
+    def test_recipe_detail_not_modified(self):
+        """ Test A Matching If-None-Match Gets 304 Without Loading The Recipe """
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_recipe_detail_modified_after_update(self):
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        recipe.title = 'New title'
+        recipe.save()
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'New title')
+
+    def test_recipe_detail_modified_after_tag_added(self):
+        """ Test Linking A Tag Outside The Serializer Still Changes The Detail Validators """
+        recipe = create_recipe(user=self.user)
+        # Created first: a new tag alone bumps the tags namespace
+        tag = Tag.objects.create(creator=self.user, name='Brunch')
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        recipe.tags.add(tag)
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual([tag['name'] for tag in res.data['tags']], ['Brunch'])
+
+    def test_recipes_list_not_modified_until_delete(self):
+        """ Test A Delete Changes The List Validators """
+        create_recipe(user=self.user)
+        older = create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.assertEqual(self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        older.delete()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_recipes_list_etag_per_media_type(self):
+        """ Test JSON And MessagePack Representations Get Their Own ETags """
+        create_recipe(user=self.user)
+
+        as_json = self.client.get(RECIPES_URL)
+        as_msgpack = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertNotEqual(as_json['ETag'], as_msgpack['ETag'])
+        self.assertIn('Accept', as_json['Vary'])
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=as_json['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_read_model_follows_ingredient_rename(self):
+        """ Test The Stored Detail Document Is Rebuilt When A Rendered Ingredient Changes """
+        recipe = create_recipe(user=self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.name = 'Sea salt'
+            ingredient.save()
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['ingredients'][0]['name'], 'Sea salt')
+        self.assertEqual(read_model.check_consistency()['stale'], [])
+
+    def test_tag_rename_refreshes_linked_recipes_in_batches_after_commit(self):
+        """ Test A Rename Writes Nothing To The Linked Recipes' Documents Until It Commits, Then Batch By Batch """
+        tag = Tag.objects.create(creator=self.user, name='Breakfast')
+        for index in range(5):
+            create_recipe(user=self.user, title=f'Recipe {index}').tags.add(tag)
+
+        with patch.object(signals, 'FAN_OUT_BATCH_SIZE', 2), \
+                patch.object(read_model, 'refresh', wraps=read_model.refresh) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                tag.name = 'Brunch'
+                tag.save()
+                self.assertEqual(refresh.call_count, 0)
+
+        self.assertEqual([len(call.args[0]) for call in refresh.call_args_list], [2, 2, 1])
+        self.assertEqual(read_model.check_consistency()['stale'], [])
+
+    def test_read_model_keeps_serializer_field_order(self):
+        """ Test Stored Documents Render Their Fields In The Serializers' Order """
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(creator=self.user, name='Brunch'))
+
+        card = self.client.get(RECIPES_URL).json()['results'][0]
+        detail = self.client.get(detail_url(recipe.id)).json()
+
+        self.assertEqual(list(card), list(RecipeSerializer(recipe).data))
+        self.assertEqual(list(detail), list(RecipeDetailSerializer(recipe).data))
+
+    def test_read_model_built_for_recipe_without_row(self):
+        """ Test A Recipe Written Without Signals Is Still Listed And Gets Its Row """
+        recipe = create_recipe(user=self.user)
+        RecipeReadModel.objects.filter(recipe=recipe).delete()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+        self.assertTrue(RecipeReadModel.objects.filter(recipe=recipe).exists())
+
+    def test_read_model_consistency_check_finds_stale_rows(self):
+        recipe = create_recipe(user=self.user, title='Fresh')
+        RecipeReadModel.objects.filter(recipe=recipe).update(card='{"title": "Stale"}')
+
+        self.assertEqual(read_model.check_consistency()['stale'], [recipe.id])
+
+    def test_retrieve_recipes_without_read_model(self):
+        """ Test The Serializer Path Still Renders The Same List """
+        create_recipe(user=self.user)
+        expected = self.client.get(RECIPES_URL).data['results']
+        cache.clear()
+
+        with patch('apps.recipes.views.api_settings.SERVE_RECIPES_FROM_READ_MODEL', False):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], expected)
+
+    def test_recipes_sparse_fieldset_selects_only_its_columns(self):
+        """ Test fields= Renders Only Those Fields From One Narrow Query, Without The Tag Prefetch """
+        for index in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {index}')
+            recipe.tags.add(Tag.objects.create(creator=self.user, name=f'Tag {index}'))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title,price', 'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data['results'][0]), {'id', 'title', 'price'})
+        self.assertEqual(len(queries), 1)
+        page_query = queries[0]['sql']
+        self.assertNotIn('description', page_query)
+        self.assertNotIn('read_model', page_query)
+
+        next_page = self.client.get(res.data['next'])
+        self.assertEqual(len(next_page.data['results']), 1)
+
+    def test_recipes_sparse_fieldset_same_with_or_without_read_model(self):
+        """ Test A Fieldset With Tags (Trimmed Stored Cards) Matches The Serializer Path """
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(creator=self.user, name='Vegan'))
+        params = {'fields': 'title,tags', 'omit': 'title'}
+        expected = self.client.get(RECIPES_URL, params).data['results']
+        cache.clear()
+
+        with patch('apps.recipes.views.api_settings.SERVE_RECIPES_FROM_READ_MODEL', False):
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(expected, [{'tags': [{'id': recipe.tags.get().id, 'name': 'Vegan'}]}])
+        self.assertEqual(res.data['results'], expected)
+
+    def test_recipes_unknown_sparse_field_rejected(self):
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_detail_sparse_fieldset(self):
+        """ Test fields= On A Recipe Detail, With Its Own ETag """
+        recipe = create_recipe(user=self.user)
+        full = self.client.get(detail_url(recipe.id))
+
+        res = self.client.get(detail_url(recipe.id), {'fields': 'id,description'})
+
+        self.assertEqual(res.data, {'id': recipe.id, 'description': recipe.description})
+        self.assertNotEqual(res['ETag'], full['ETag'])
+        with patch('apps.recipes.views.api_settings.SERVE_RECIPES_FROM_READ_MODEL', False):
+            self.assertEqual(self.client.get(detail_url(recipe.id), {'fields': 'id,description'}).data, res.data)
+
+    def test_recipes_streamed_as_one_array(self):
+        """ Test stream=true Returns Every Matching Recipe Unpaginated, In List Order """
+        for index in range(3):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+        expected = self.client.get(RECIPES_URL).data['results']
+
+        res = self.client.get(RECIPES_URL, {'stream': 'true', 'page_size': 1})
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), expected)
+
+    def test_recipes_stream_sends_first_byte_before_querying(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL, {'stream': 'true'})
+        content = iter(res.streaming_content)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(next(content), b'[')
+
+    def test_search_results_paginate_by_rank(self):
+        """ Test Search Pages Follow (rank, id) Without Repeating Recipes """
+        for index in range(3):
+            create_recipe(user=self.user, title=f'Curry number {index}', description='Curry ' * index)
+
+        res = self.client.get(RECIPES_URL, {'recipe': 'curry', 'page_size': 1})
+        seen = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(len(set(seen)), 3)
+
+    def test_filters_are_combined(self):
+        """ Test Tags, Ingredients And Text Search Narrow The Same Result Set """
+        vegan = Tag.objects.create(creator=self.user, name='Vegan')
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        match = create_recipe(user=self.user, title='Tofu curry')
+        match.tags.add(vegan)
+        match.ingredients.add(tofu)
+        wrong_text = create_recipe(user=self.user, title='Tofu scramble')
+        wrong_text.tags.add(vegan)
+        wrong_text.ingredients.add(tofu)
+        no_tag = create_recipe(user=self.user, title='Tofu curry bowl')
+        no_tag.ingredients.add(tofu)
+
+        params = {'tags': f'{vegan.id}', 'ingredients': f'{tofu.id}', 'recipe': 'curry'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data['results']], [match.id])
+
+    def test_filter_tags_match_any_has_no_duplicates(self):
+        """ Test A Recipe With Several Matching Tags Is Returned Once """
+        vegan = Tag.objects.create(creator=self.user, name='Vegan')
+        quick = Tag.objects.create(creator=self.user, name='Quick')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(vegan, quick)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{vegan.id},{quick.id}'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_filter_tags_match_all(self):
+        """ Test tags_match=all Only Returns Recipes Carrying Every Tag """
+        vegan = Tag.objects.create(creator=self.user, name='Vegan')
+        quick = Tag.objects.create(creator=self.user, name='Quick')
+        both = create_recipe(user=self.user)
+        both.tags.add(vegan, quick)
+        one = create_recipe(user=self.user)
+        one.tags.add(vegan)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{vegan.id},{quick.id}', 'tags_match': 'all'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [both.id])
+
+    def test_filter_exclude_ingredients(self):
+        """ Test Recipes Containing An Excluded Ingredient Are Left Out """
+        peanut = Ingredient.objects.create(user=self.user, name='Peanut')
+        safe = create_recipe(user=self.user)
+        unsafe = create_recipe(user=self.user)
+        unsafe.ingredients.add(peanut)
+
+        res = self.client.get(RECIPES_URL, {'exclude_ingredients': f'{peanut.id}'})
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertIn(safe.id, ids)
+        self.assertNotIn(unsafe.id, ids)
+
+    def test_filter_invalid_ids(self):
+        """ Test Non Numeric Ids Are Rejected """
+        res = self.client.get(RECIPES_URL, {'tags': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_price_time_and_difficulty(self):
+        """ Test Range And Difficulty Filters Are Applied Together """
+        match = create_recipe(user=self.user, price=Decimal('8.00'), preparation_time_minutes=20, difficulty_level=2)
+        create_recipe(user=self.user, price=Decimal('3.00'), preparation_time_minutes=20, difficulty_level=2)
+        create_recipe(user=self.user, price=Decimal('8.00'), preparation_time_minutes=90, difficulty_level=2)
+        create_recipe(user=self.user, price=Decimal('8.00'), preparation_time_minutes=20, difficulty_level=3)
+
+        res = self.client.get(RECIPES_URL, {
+            'min_price': '5', 'max_price': '10', 'max_minutes': 30, 'difficulty': '1,2',
+        })
+
+        self.assertEqual([r['id'] for r in res.data['results']], [match.id])
+
+    def test_ordering_by_price_pages_with_cursor(self):
+        """ Test Each Page Continues The Price Order, Ties Broken By Id """
+        recipes = [
+            create_recipe(user=self.user, price=Decimal(price))
+            for price in ('9.00', '2.50', '9.00', '4.00', '12.00')
+        ]
+        expected = [recipe.id for recipe in sorted(recipes, key=lambda recipe: (-recipe.price, -recipe.id))]
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'ordering': '-price', 'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, expected)
+
+    def test_invalid_ordering_and_range(self):
+        self.assertEqual(self.client.get(RECIPES_URL, {'ordering': 'title'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(RECIPES_URL, {'min_price': 'cheap'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_params_return_field_errors(self):
+        """ Test Invalid Params Are Reported Per Field By DRF, Not As A Stringified Exception """
+        res = self.client.get(RECIPES_URL, {'min_price': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.json(), {'min_price': 'Expected A Number'})
+
+        res = self.client.get(RECIPES_URL, {'facets': 'colour'})
+        self.assertIn('facets', res.data)
+        res = self.client.get(RECIPES_URL, {'fields': 'colour'})
+        self.assertIn('fields', res.data)
+
+    def test_facets_count_the_filtered_recipes(self):
+        """ Test Facet Counts Cover Every Filtered Recipe, Not Just The Page """
+        vegan = Tag.objects.create(creator=self.user, name='Vegan')
+        quick = Tag.objects.create(creator=self.user, name='Quick')
+        rice = Ingredient.objects.create(user=self.user, name='Rice')
+        for price, minutes in (('3.00', 10), ('7.50', 20), ('60.00', 200)):
+            recipe = create_recipe(user=self.user, price=Decimal(price), preparation_time_minutes=minutes,
+                                   difficulty_level=1)
+            recipe.tags.add(vegan)
+            recipe.ingredients.add(rice)
+        create_recipe(user=self.user).tags.add(quick)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{vegan.id}', 'facets': 'all', 'page_size': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        facets = res.data['facets']
+        self.assertEqual(facets['tags'], [{'id': vegan.id, 'name': 'Vegan', 'count': 3}])
+        self.assertEqual(facets['ingredients'], [{'id': rice.id, 'name': 'Rice', 'count': 3}])
+        self.assertEqual([level['count'] for level in facets['difficulty_level']], [0, 3, 0, 0])
+        self.assertEqual([bucket['count'] for bucket in facets['price']], [1, 1, 0, 0, 1])
+        self.assertEqual([bucket['count'] for bucket in facets['preparation_time_minutes']], [1, 1, 0, 0, 1])
+
+    def test_facets_are_cached_per_filter(self):
+        """ Test Another Page Of The Same Filter Reuses The Cached Facets """
+        create_recipe(user=self.user, title='First')
+        create_recipe(user=self.user, title='Second')
+        first_page = self.client.get(RECIPES_URL, {'facets': 'difficulty_level', 'page_size': 1})
+
+        with CaptureQueriesContext(connection) as context:
+            second_page = self.client.get(first_page.data['next'])
+
+        self.assertEqual(second_page.data['facets'], first_page.data['facets'])
+        self.assertFalse(any('UNION ALL' in query['sql'] for query in context.captured_queries))
+
+    def test_facets_invalid_name(self):
+        res = self.client.get(RECIPES_URL, {'facets': 'colour'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PantryRecipeTests(TestCase):
+    """ Test Ranking Recipes By The Ingredients A User Has """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.index = PantryIndex()
+        self.index.redis.delete(*self.index.redis.keys('pantry:*') or ['pantry:generation'])
+
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.egg = Ingredient.objects.create(user=self.user, name='Egg')
+        self.pea = Ingredient.objects.create(user=self.user, name='Pea')
+        self.fried_rice = create_recipe(user=self.user, title='Fried rice')
+        self.fried_rice.ingredients.add(self.rice, self.egg, self.pea)
+        self.omelette = create_recipe(user=self.user, title='Omelette')
+        self.omelette.ingredients.add(self.egg)
+        self.risotto = create_recipe(user=self.user, title='Risotto')
+        self.risotto.ingredients.add(self.rice, self.pea)
+
+    def test_pantry_ranked_by_coverage(self):
+        """ Test Fully Covered Recipes Come First, Then Fewest Missing Ingredients """
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.egg.id},{self.rice.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [self.omelette.id, self.fried_rice.id, self.risotto.id])
+        self.assertEqual(res.data[0]['coverage'], 1.0)
+        self.assertEqual((res.data[1]['matched_count'], res.data[1]['missing_count']), (2, 1))
+
+    def test_pantry_limit(self):
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.egg.id},{self.rice.id}', 'limit': 1})
+
+        self.assertEqual([r['id'] for r in res.data], [self.omelette.id])
+
+    def test_pantry_requires_ingredients(self):
+        res = self.client.get(PANTRY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pantry_falls_back_to_database_until_built(self):
+        """ Test A Request Never Builds The Index, And Both Scorings Agree """
+        params = {'ingredients': f'{self.egg.id},{self.rice.id},{self.pea.id}'}
+        from_database = self.client.get(PANTRY_URL, params).data
+
+        self.assertFalse(self.index.is_ready())
+        self.index.rebuild()
+        self.assertEqual(self.client.get(PANTRY_URL, params).data, from_database)
+
+    def test_pantry_rebuild_swaps_generation(self):
+        """ Test A Rebuild Replaces The Served Generation And Drops The Old One's Keys """
+        self.index.rebuild()
+        old_generation = self.index.get_generation()
+        self.index.rebuild()
+
+        self.assertNotEqual(self.index.get_generation(), old_generation)
+        self.assertEqual(self.index.redis.keys(f'pantry:{old_generation}:*'), [])
+        self.assertEqual(self.index.score([self.egg.id], limit=10)[0], (self.omelette.id, 1, 0, 1.0))
+
+    def test_pantry_index_updated_on_ingredient_change(self):
+        """ Test M2M Changes From Either Side Reach A Built Index After Commit """
+        self.index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.omelette.ingredients.add(self.pea)
+            self.rice.recipe_set.remove(self.risotto)
+
+        self.assertEqual(self.index.score([self.pea.id], limit=10), [
+            (self.risotto.id, 1, 0, 1.0),
+            (self.omelette.id, 1, 1, 0.5),
+            (self.fried_rice.id, 1, 2, 1 / 3),
+        ])
+
+    def test_pantry_index_forgets_deleted_ingredient(self):
+        self.index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pea.delete()
+
+        self.assertEqual(self.index.score([self.rice.id], limit=10), [
+            (self.risotto.id, 1, 0, 1.0),
+            (self.fried_rice.id, 1, 1, 0.5),
+        ])
+
+
+class ExportRecipeTests(TestCase):
+    """ Test The Catalog Export Endpoint And Command """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = create_recipe(user=self.user, title='Pancakes')
+        self.recipe.tags.add(Tag.objects.create(creator=self.user, name='Sweet'),
+                             Tag.objects.create(creator=self.user, name='Breakfast'))
+        self.recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='Flour'))
+        self.bare = create_recipe(user=self.user, title='Water')
+
+    def test_export_ndjson(self):
+        """ Test Every Recipe Is One JSON Line With Sorted Tag And Ingredient Names """
+        res = self.client.get(EXPORT_URL)
+
+        rows = [json.loads(line) for line in b''.join(res.streaming_content).splitlines()]
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['id'] for row in rows], [self.recipe.id, self.bare.id])
+        self.assertEqual(rows[0]['tag_names'], ['Breakfast', 'Sweet'])
+        self.assertEqual(rows[0]['ingredient_names'], ['Flour'])
+        self.assertEqual(rows[1]['tag_names'], [])
+
+    def test_export_csv_gzip(self):
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv', 'compression': 'gzip'})
+
+        content = gzip.decompress(b''.join(res.streaming_content)).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertIn('recipes.csv.gz', res['Content-Disposition'])
+        self.assertEqual(rows[0]['title'], 'Pancakes')
+        self.assertEqual(json.loads(rows[0]['tag_names']), ['Breakfast', 'Sweet'])
+
+    def test_export_requires_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command_writes_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as output:
+            call_command('export_recipes', output=output.name, chunk_size=1, stderr=io.StringIO())
+
+            lines = open(output.name, 'rb').read().splitlines()
+        self.assertEqual(len(lines), 2)
+
+
+def import_row(**params):
+    """ Create And Return One NDJSON Import Line """
+    row = {
+        'title': 'Imported recipe',
+        'preparation_time_minutes': 10,
+        'price': '4.50',
+        'tag_names': ['Imported'],
+        'ingredient_names': ['Rice', 'Salt'],
+    }
+    row.update(params)
+    return json.dumps(row)
+
+
+class ImportRecipeTests(TestCase):
+    """ Test Bulk Importing Recipes """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, lines):
+        content = '\n'.join(lines).encode('utf-8')
+        return self.client.post(IMPORT_URL, {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def test_import_ndjson_reports_row_errors(self):
+        """ Test Valid Rows Are Created And Invalid Ones Reported By Line """
+        existing_tag = Tag.objects.create(creator=self.user, name='Imported')
+        res = self.upload('recipes.ndjson', [
+            import_row(title='First'),
+            import_row(price='not a price'),
+            '{broken',
+            import_row(title='Second', tag_names=['Imported', 'New tag']),
+        ])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((res.data['created'], res.data['failed']), (2, 2))
+        self.assertEqual([error['line'] for error in res.data['errors']], [2, 3])
+        second = Recipe.objects.get(title='Second')
+        self.assertEqual(sorted(second.tags.values_list('name', flat=True)), ['Imported', 'New tag'])
+        self.assertIn(existing_tag, second.tags.all())
+        self.assertEqual(Ingredient.objects.filter(user=self.user, name='Rice').count(), 1)
+
+    def test_imported_recipes_are_listed_and_searchable(self):
+        self.upload('recipes.ndjson', [import_row(title='Jollof rice')])
+
+        res = self.client.get(RECIPES_URL, {'recipe': 'jollof'})
+
+        self.assertEqual([r['title'] for r in res.data['results']], ['Jollof rice'])
+        self.assertEqual(res.data['results'][0]['tags'], [{'id': Tag.objects.get(name='Imported').id, 'name': 'Imported'}])
+
+    def test_import_query_count_does_not_grow_with_rows(self):
+        """ Test A Chunk Costs The Same Statements For 2 And 20 Rows """
+        def count_queries(rows):
+            lines = [import_row(tag_names=[f'Tag {index}'], ingredient_names=[f'Item {index}']) for index in rows]
+            with CaptureQueriesContext(connection) as context:
+                bulk_import.RecipeImport(self.user).run(io.StringIO('\n'.join(lines)))
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(range(2)), count_queries(range(10, 30)))
+
+    def test_import_csv_from_export(self):
+        """ Test A CSV Export Can Be Imported Back """
+        recipe = create_recipe(user=self.user, title='Round trip')
+        recipe.tags.add(Tag.objects.create(creator=self.user, name='Loop'))
+        self.user.is_staff = True
+        self.user.save()
+        exported = b''.join(self.client.get(EXPORT_URL, {'export_format': 'csv'}).streaming_content)
+
+        res = self.client.post(IMPORT_URL, {'file': SimpleUploadedFile('recipes.csv', exported)}, format='multipart')
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(Recipe.objects.filter(title='Round trip', tags__name='Loop').count(), 2)
+
+    def test_import_command_gzip(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson.gz') as source:
+            source.write(gzip.compress(import_row(title='From disk').encode('utf-8')))
+            source.flush()
+            call_command('import_recipes', source.name, user=self.user.email, stdout=io.StringIO())
+
+        self.assertTrue(Recipe.objects.filter(title='From disk', user=self.user).exists())
+
+
+def batch_item(**params):
+    """ Return A Sample Recipe Payload For The Batch Endpoint """
+    item = {
+        'title': 'Batch recipe',
+        'description': 'Batch recipe description',
+        'preparation_time_minutes': 10,
+        'price': '4.50',
+        'tags': [{'name': 'Batch'}],
+        'ingredients': [{'name': 'Flour'}],
+    }
+    item.update(params)
+    return item
+
+
+class BatchRecipeTests(TestCase):
+    """ Test Creating Recipes In Batches """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def test_batch_creates_recipes_with_shared_tags(self):
+        Tag.objects.create(creator=self.user, name='Batch')
+
+        res = self.client.post(BATCH_URL, [
+            batch_item(title='Pancakes', ingredients=[{'name': 'Flour'}, {'name': 'Milk'}]),
+            batch_item(title='Jollof rice', tags=[{'name': 'Batch'}, {'name': 'Dinner'}]),
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((res.data['created'], res.data['failed']), (2, 0))
+        recipe = Recipe.objects.get(title='Jollof rice', user=self.user)
+        self.assertEqual(res.data['results'][1]['recipe']['id'], recipe.id)
+        self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['Batch', 'Dinner'])
+        self.assertEqual(Tag.objects.filter(name='Batch').count(), 1)
+        self.assertEqual(Ingredient.objects.filter(user=self.user, name='Flour').count(), 1)
+        search = self.client.get(RECIPES_URL, {'recipe': 'jollof'})
+        self.assertEqual([r['id'] for r in search.data['results']], [recipe.id])
+
+    def test_batch_query_count_does_not_grow_with_items(self):
+        def count_queries(size):
+            items = [
+                batch_item(tags=[{'name': f'Tag {size} {index}'}], ingredients=[{'name': f'Item {size} {index}'}])
+                for index in range(size)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(BATCH_URL, items, format='json')
+            self.assertEqual(res.data['created'], size)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+    def test_batch_reports_invalid_items(self):
+        res = self.client.post(BATCH_URL, [
+            batch_item(title='Valid'),
+            batch_item(price='not a price'),
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((res.data['created'], res.data['failed']), (1, 1))
+        self.assertTrue(res.data['results'][0]['created'])
+        self.assertIn('price', res.data['results'][1]['errors'])
+        self.assertTrue(Recipe.objects.filter(title='Valid').exists())
+
+    def test_atomic_batch_rejects_everything_on_one_error(self):
+        res = self.client.post(f'{BATCH_URL}?atomic=true', [
+            batch_item(title='Valid'),
+            batch_item(price='not a price'),
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['created'] for result in res.data['results']], [False, False])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_batch_must_be_a_non_empty_list(self):
+        self.assertEqual(self.client.post(BATCH_URL, [], format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(BATCH_URL, batch_item(), format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SimilarRecipeTests(TestCase):
+    """ Test Finding Recipes By Tag And Ingredient Overlap """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.index = SimilarRecipesIndex()
+        self.index.redis.delete(*self.index.redis.keys('similar:*') or ['similar:generation'])
+
+        self.vegan = Tag.objects.create(creator=self.user, name='Vegan')
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=name) for name in ('Rice', 'Pea', 'Garlic', 'Onion')
+        ]
+        self.curry = create_recipe(user=self.user, title='Pea curry')
+        self.curry.tags.add(self.vegan)
+        self.curry.ingredients.add(*self.ingredients)
+
+    def test_similar_recipes_unavailable_until_built(self):
+        """ Test A Request Never Builds The Index """
+        res = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(self.index.is_ready())
+
+    def test_similar_recipes_rebuild_swaps_generation(self):
+        """ Test Lookups Read The Old Generation Until The New One Is Published, Then Its Keys Are Dropped """
+        twin = create_recipe(user=self.user, title='Pea stew')
+        self.index.rebuild()
+        old_generation = self.index.get_generation()
+        # Not committed, so the index is not refreshed
+        twin.tags.add(self.vegan)
+        twin.ingredients.add(*self.ingredients)
+
+        with patch.object(SimilarRecipesIndex, 'publish_generation'):
+            self.index.rebuild()
+        self.assertEqual(self.index.get_generation(), old_generation)
+        self.assertEqual(self.client.get(similar_url(self.curry.id)).data, [])
+
+        self.index.rebuild()
+        self.assertEqual(self.index.redis.keys(f'similar:{old_generation}:*'), [])
+        res = self.client.get(similar_url(self.curry.id))
+        self.assertEqual([(r['id'], r['similarity']) for r in res.data], [(twin.id, 1.0)])
+
+    def test_similar_recipes_ranked_by_overlap(self):
+        """ Test A Recipe Sharing Almost Everything Ranks First And Unrelated Ones Are Left Out """
+        other_user = create_user(email='other@example.com', username='other', password='TestPass123')
+        close = create_recipe(user=other_user, title='Pea pilaf')
+        close.tags.add(self.vegan)
+        # Ingredients are compared by name, whoever owns them
+        close.ingredients.add(*[Ingredient.objects.create(user=other_user, name=name)
+                                for name in ('rice', 'Pea', 'Garlic', 'Onion', 'Cumin')])
+        unrelated = create_recipe(user=self.user, title='Brownie')
+        unrelated.ingredients.add(Ingredient.objects.create(user=self.user, name='Chocolate'))
+        self.index.rebuild()
+
+        res = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['id'], close.id)
+        self.assertGreater(res.data[0]['similarity'], 0.5)
+        self.assertNotIn(unrelated.id, [r['id'] for r in res.data])
+
+    def test_similar_recipes_refreshed_when_relations_change(self):
+        """ Test A Recipe Becomes A Neighbor Once Its Ingredients Change, Dropping The Cached List """
+        twin = create_recipe(user=self.user, title='Pea stew')
+        self.index.rebuild()
+        self.assertEqual(self.client.get(similar_url(self.curry.id)).data, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.tags.add(self.vegan)
+            twin.ingredients.add(*self.ingredients)
+
+        res = self.client.get(similar_url(self.curry.id))
+        self.assertEqual([(r['id'], r['similarity']) for r in res.data], [(twin.id, 1.0)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.delete()
+        self.assertEqual(self.client.get(similar_url(self.curry.id)).data, [])
+
+    def test_similar_recipes_not_found(self):
+        res = self.client.get(similar_url(self.curry.id + 1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TrendingRecipeTests(TestCase):
+    """ Test Recipe View Counting And The Trending Feed """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.views = RecipeViews()
+        self.views.redis.delete(*self.views.redis.keys('stats:*') + self.views.redis.keys('trending:*') or ['stats:'])
+
+    def test_viewing_recipe_writes_nothing_to_database(self):
+        """ Test Detail Views Are Only Counted In Redis Until The Flush Writes RecipeStats """
+        recipe = create_recipe(user=self.user)
+        other_user = create_user(email='other@example.com', username='other', password='TestPass123')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(detail_url(recipe.id))
+            self.client.get(detail_url(recipe.id))
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.client.force_authenticate(user=other_user)
+        self.client.get(detail_url(recipe.id))
+        self.client.get(detail_url(recipe.id + 1000))
+        self.assertFalse(RecipeStats.objects.exists())
+
+        self.assertEqual(self.views.flush(), 1)
+        stats = RecipeStats.objects.get(recipe=recipe)
+        self.assertEqual(stats.view_count, 3)
+        self.assertEqual(stats.weekly_view_count, 3)
+        self.assertEqual(stats.weekly_unique_viewers, 2)
+        self.assertIsNotNone(stats.last_viewed_at)
+
+    def test_flush_adds_to_stored_counts(self):
+        """ Test Each Flush Adds Only The Views Recorded Since The Last One, Skipping Deleted Recipes """
+        recipe = create_recipe(user=self.user)
+        deleted = create_recipe(user=self.user)
+        self.views.record(recipe.id, self.user.id)
+        self.views.flush()
+
+        self.views.record(recipe.id, self.user.id)
+        self.views.record(deleted.id, self.user.id)
+        deleted.delete()
+        self.assertEqual(self.views.flush(), 1)
+        self.assertEqual(self.views.flush(), 0)
+
+        stats = RecipeStats.objects.get(recipe=recipe)
+        self.assertEqual(stats.view_count, 2)
+        self.assertEqual(stats.weekly_unique_viewers, 1)
+        self.assertFalse(RecipeStats.objects.filter(recipe_id=deleted.id).exists())
+
+    def test_trending_ranks_recent_views_higher(self):
+        """ Test Views Decay: Many Views From A Week Ago Rank Below A Few Recent Ones """
+        popular_last_week = create_recipe(user=self.user, title='Old favourite')
+        popular_now = create_recipe(user=self.user, title='New favourite')
+        create_recipe(user=self.user, title='Never viewed')
+        now = time.time()
+        for _ in range(4):
+            self.views.record(popular_last_week.id, self.user.id, now=now - 7 * DAY)
+        for _ in range(2):
+            self.views.record(popular_now.id, self.user.id, now=now)
+
+        res = self.client.get(TRENDING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [popular_now.id, popular_last_week.id])
+        self.assertAlmostEqual(res.data[0]['trending_score'], 2, places=2)
+        self.assertLess(res.data[1]['trending_score'], 0.5)
+
+    def test_trending_survives_period_roll_over(self):
+        """ Test Scores Recorded In One Period Carry Into The Next, Decayed """
+        recipe = create_recipe(user=self.user)
+        now = get_period(time.time()) * PERIOD + DAY
+        self.views.record(recipe.id, self.user.id, now=now)
+
+        later = self.views.trending(limit=10, now=now + PERIOD)
+
+        self.assertEqual([recipe_id for recipe_id, _ in later], [recipe.id])
+        self.assertAlmostEqual(later[0][1], 2 ** -(PERIOD / HALF_LIFE))
+
+    def test_deleted_recipe_dropped_from_trending(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+        self.assertEqual(self.client.get(TRENDING_URL).data, [])
+
+
+class FastSerializationTests(TestCase):
+    """ Test RowSerializer Renders Byte For Byte What The DRF Serializers Do """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        tags = [Tag.objects.create(creator=self.user, name=name) for name in ('Zesty', 'Lunch', 'Dinner')]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for index in range(5):
+            recipe = create_recipe(
+                user=self.user,
+                title=f'Spicy dish {index}',
+                price=Decimal('1.5') * index,
+                difficulty_level=index % 3,
+            )
+            recipe.tags.set(tags[index % 3:])
+            recipe.ingredients.add(ingredient)
+        create_recipe(user=self.user, title='Untagged', description='', link='')
+
+    def assertRendersSame(self, serializer_class, queryset, fields=None):
+        instances = serializer_class.setup_eager_loading(queryset, fields=fields)
+        expected = JSONRenderer().render(serializer_class(instances, many=True, fields=fields).data)
+        row_serializer = RowSerializer(serializer_class, fields=fields)
+        rendered = JSONRenderer().render(row_serializer.render(row_serializer.values(instances)))
+        self.assertEqual(rendered, expected)
+
+    def test_recipes_render_same(self):
+        self.assertRendersSame(RecipeSerializer, Recipe.objects.order_by('-created_at', '-id'))
+        self.assertRendersSame(RecipeSerializer, Recipe.objects.order_by('price', 'id'))
+
+    def test_field_without_converter_refused_up_front(self):
+        """ Test A Field Rows Can Not Reproduce (The Image URL Needs The Request) Fails When Built """
+        with self.assertRaises(ImproperlyConfigured):
+            RowSerializer(RecipeDetailSerializer)
+
+    def test_sparse_fieldsets_render_same(self):
+        self.assertRendersSame(RecipeSerializer, Recipe.objects.order_by('id'), fields=['price', 'tags'])
+        self.assertRendersSame(RecipeSerializer, Recipe.objects.order_by('id'), fields=['title', 'created_at'])
+
+    def test_search_results_render_same(self):
+        query = SearchQuery('spicy', config='english')
+        self.assertRendersSame(
+            RecipeSearchSerializer,
+            db_queries.annotate_search_rank(Recipe.objects.filter(search_vector=query), query),
+        )
+
+    def test_live_list_renders_same(self):
+        """ Test The Recipe List Served From Rows Matches The Serializer Output """
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with patch('apps.recipes.views.api_settings.SERVE_RECIPES_FROM_READ_MODEL', False):
+            res = client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipes = RecipeSerializer.setup_eager_loading(Recipe.objects.order_by('-created_at', '-id'))
+        self.assertEqual(res.json()['results'], json.loads(JSONRenderer().render(
+            RecipeSerializer(recipes, many=True).data,
+        )))
+
+
+@patch('apps.recipes.views.api_settings.RECIPE_JSON_FROM_DATABASE', ['recipe-list', 'recipe-detail'])
+class DatabaseJSONTests(TestCase):
+    """ Test Recipe JSON Built By Postgres Matches The Serializers """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        tags = [Tag.objects.create(creator=self.user, name=name) for name in ('Zesty', 'Lunch', 'Dinner')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name) for name in ('Salt', 'Émincé')]
+        for index in range(3):
+            recipe = create_recipe(user=self.user, title=f'Spicy "dish" {index}', price=Decimal('7.5') * index)
+            recipe.tags.set(tags[index:])
+            recipe.ingredients.set(ingredients[:index])
+        self.recipe = create_recipe(user=self.user, title='Untagged')
+        Recipe.objects.filter(pk=self.recipe.pk).update(image='uploads/recipe/picture.jpg')
+
+    def test_list_matches_serializer(self):
+        res = self.client.get(RECIPES_URL, {'page_size': 2, 'facets': 'difficulty_level'})
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        body = json.loads(res.content)
+        recipes = RecipeSerializer.setup_eager_loading(Recipe.objects.order_by('-created_at', '-id'))
+        serialized = json.loads(JSONRenderer().render(RecipeSerializer(recipes, many=True).data))
+        self.assertEqual(list(body), ['next', 'previous', 'results', 'facets'])
+        self.assertEqual(body['results'], serialized[:2])
+        self.assertEqual(body['facets']['difficulty_level'][0]['count'], 4)
+
+        next_page = json.loads(self.client.get(body['next']).content)
+        self.assertEqual(next_page['results'], serialized[2:])
+        self.assertEqual(json.loads(self.client.get(RECIPES_URL, {'page_size': 2}).content)['results'], serialized[:2])
+
+    def test_streamed_and_sparse_list_match_serializer(self):
+        res = self.client.get(RECIPES_URL, {'stream': 'true', 'fields': 'id,tags,price'})
+
+        recipes = RecipeSerializer.setup_eager_loading(Recipe.objects.order_by('-created_at', '-id'))
+        serialized = RecipeSerializer(recipes, many=True, fields=['id', 'tags', 'price']).data
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), json.loads(JSONRenderer().render(serialized)))
+
+    def test_detail_matches_serializer(self):
+        for recipe in Recipe.objects.all():
+            res = self.client.get(detail_url(recipe.id))
+
+            expected = RecipeDetailSerializer(RecipeDetailSerializer.setup_eager_loading(
+                Recipe.objects.filter(pk=recipe.pk),
+            ).get()).data
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(res.content), json.loads(JSONRenderer().render(expected)))
+        self.assertTrue(json.loads(res.content)['image'].endswith('/media/uploads/recipe/picture.jpg'))
+
+    def test_detail_not_found(self):
+        res = self.client.get(detail_url(self.recipe.id + 1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RendererTests(TestCase):
+    """ Test The orjson And MessagePack Renderers And Parsers """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def test_orjson_renders_like_json_renderer(self):
+        data = {
+            'results': [{'id': 1, 'title': 'Crème brûlée \u2028 "quoted"', 'price': '12.50', 'rank': 0.5}],
+            'price': Decimal('5'),
+            'at': datetime(2023, 11, 13, 10, 0, 0, 123456, tzinfo=timezone.utc),
+            'label': gettext_lazy('Recipe'),
+            'ids': (1, 2),
+            'empty': None,
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, renderer_context={'indent': 4}),
+            JSONRenderer().render(data, renderer_context={'indent': 4}),
+        )
+
+    def test_list_in_messagepack(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(creator=self.user, name='Lunch'))
+
+        json_res = self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(json_res['Content-Type'], 'application/json')
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(res.content, raw=False), json.loads(json_res.content))
+
+    def test_create_recipe_from_messagepack(self):
+        payload = {
+            'title': 'Packed recipe',
+            'preparation_time_minutes': 30,
+            'price': '5.99',
+            'description': 'Sent as MessagePack',
+            'difficulty_level': 1,
+            'tags': [{'name': 'Dinner'}],
+        }
+
+        res = self.client.post(
+            RECIPE_CREATE_URL, msgpack.packb(payload), content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=msgpack.unpackb(res.content, raw=False)['id'])
+        self.assertEqual(recipe.price, Decimal('5.99'))
+        self.assertEqual([tag.name for tag in recipe.tags.all()], ['Dinner'])
+
+    def test_malformed_bodies_rejected(self):
+        res = self.client.post(RECIPE_CREATE_URL, b'{"title": ', content_type='application/json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('JSON parse error', res.json()['detail'])
+
+        res = self.client.post(RECIPE_CREATE_URL, b'\xc1', content_type='application/msgpack')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('MessagePack parse error', res.json()['detail'])
+
+
+class CompressionTests(TestCase):
+    """ Test Response Compression And The Precompressed Cache Variants """
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@example.com',
+            username='user',
+            password='TestPass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        for index in range(10):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+
+    def test_encoding_negotiated(self):
+        factory = RequestFactory()
+        cases = {
+            'gzip, deflate, br': 'br',
+            'gzip;q=1.0, br;q=0.5': 'gzip',
+            'br;q=0, gzip': 'gzip',
+            '*': 'br',
+            'identity': None,
+            '': None,
+        }
+        for accept_encoding, expected in cases.items():
+            request = factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertEqual(compression.get_encoding(request), expected, accept_encoding)
+
+    def test_list_compressed(self):
+        plain = self.client.get(RECIPES_URL, {'page_size': 10})
+        res = self.client.get(RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(brotli.decompress(res.content), plain.content)
+        self.assertEqual(res['ETag'], f'W/{plain["ETag"]}')
+
+        not_modified = self.client.get(
+            RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_small_response_not_compressed(self):
+        res = self.client.get(RECIPES_URL, {'page_size': 1}, HTTP_ACCEPT_ENCODING='br')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_cached_response_compressed_once(self):
+        with patch('apps.utils.compression.compress', wraps=compression.compress) as compress:
+            first = self.client.get(RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='gzip')
+            self.client.get(RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='br')
+            self.client.get(RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='br')
+
+        self.assertEqual(compress.call_count, 2)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(json.loads(gzip.decompress(second.content))['results'][0]['title'], 'Recipe 9')
+
+        create_recipe(user=self.user, title='Newest')
+        res = self.client.get(RECIPES_URL, {'page_size': 10}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(json.loads(gzip.decompress(res.content))['results'][0]['title'], 'Newest')
+
+    def test_stream_compressed(self):
+        res = self.client.get(RECIPES_URL, {'stream': 'true'}, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', res)
+        body = zlib.decompress(b''.join(res.streaming_content), compression.GZIP_WBITS)
+        self.assertEqual(len(json.loads(body)), 10)
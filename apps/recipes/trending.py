@@ -0,0 +1,209 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.db import connection
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from apps.recipes.models import Recipe, RecipeStats
+
+PENDING_VIEWS_KEY = 'stats:views:pending'
+PENDING_LAST_VIEWED_KEY = 'stats:last-viewed:pending'
+FLUSHING_VIEWS_KEY = 'stats:views:flushing'
+FLUSHING_LAST_VIEWED_KEY = 'stats:last-viewed:flushing'
+DAY_VIEWS_KEY = 'stats:views:day:{}'
+DAY_VIEWERS_KEY = 'stats:viewers:{}:{}'
+FLUSH_LOCK_KEY = 'stats:flush-lock'
+SCORES_KEY = 'trending:scores:{}'
+CARRY_KEY = 'trending:carry:{}'
+
+DAY = 24 * 60 * 60
+WEEK_DAYS = 7
+# Day buckets outlive the week they are summed over, so a late flush still finds them
+DAY_BUCKET_TIMEOUT = (WEEK_DAYS + 1) * DAY
+
+# Trending scores decay exponentially: a view counts half as much every HALF_LIFE, so one
+# from a week ago weighs about 1/11 of one from now. Instead of decaying every score over time,
+# each view adds 2 ** (age of the period / HALF_LIFE) ("forward decay"); scores live in one
+# sorted set per PERIOD, carried into the next one scaled down so the weights stay small.
+HALF_LIFE = 2 * DAY
+PERIOD = 28 * DAY
+CARRY_WEIGHT = 2 ** -(PERIOD / HALF_LIFE)
+# Only the head of the ranking is ever read; the long tail is trimmed on flush
+MAX_TRENDING = 1000
+
+
+def get_day(now: float) -> int:
+    return int(now // DAY)
+
+
+def get_period(now: float) -> int:
+    return int(now // PERIOD)
+
+
+def get_weight(now: float) -> float:
+    """ What A View At now Adds To The Current Period's Scores """
+    return 2 ** ((now - get_period(now) * PERIOD) / HALF_LIFE)
+
+
+class RecipeViews:
+    """ Recipe View Counters And The Trending Ranking, Written To Redis Only
+
+    A view is one MULTI: it bumps the recipe in `stats:views:pending` (the views not yet in
+    Postgres), in the day bucket `stats:views:day:<day>`, adds the viewer to the day's
+    HyperLogLog `stats:viewers:<recipe>:<day>`, and adds its decayed weight to the recipe's
+    trending score. `flush()` runs periodically and moves the pending counts into RecipeStats
+    with one upsert, so reading a recipe never writes to Postgres.
+    """
+
+    def __init__(self, connection=None):
+        self.redis = connection or get_redis_connection('default')
+
+    def record(self, recipe_id: int, viewer_id, now: float = None):
+        now = time.time() if now is None else now
+        day = get_day(now)
+        pipeline = self.redis.pipeline(transaction=True)
+        pipeline.hincrby(PENDING_VIEWS_KEY, recipe_id, 1)
+        pipeline.hset(PENDING_LAST_VIEWED_KEY, recipe_id, now)
+        pipeline.hincrby(DAY_VIEWS_KEY.format(day), recipe_id, 1)
+        pipeline.expire(DAY_VIEWS_KEY.format(day), DAY_BUCKET_TIMEOUT)
+        pipeline.pfadd(DAY_VIEWERS_KEY.format(recipe_id, day), viewer_id)
+        pipeline.expire(DAY_VIEWERS_KEY.format(recipe_id, day), DAY_BUCKET_TIMEOUT)
+        pipeline.zincrby(SCORES_KEY.format(get_period(now)), get_weight(now), recipe_id)
+        pipeline.execute()
+
+    def flush(self, now: float = None) -> int:
+        """ Add The Pending View Counts To RecipeStats; Returns The Number Of Recipes Flushed
+
+        The pending hashes are renamed before they are read, so views recorded meanwhile start
+        a new batch. A batch whose upsert failed is left in place and retried by the next flush.
+        """
+        now = time.time() if now is None else now
+        lock = self.redis.lock(FLUSH_LOCK_KEY, timeout=300, blocking_timeout=0)
+        if not lock.acquire():
+            # Another flush is running
+            return 0
+        try:
+            if not self.redis.exists(FLUSHING_VIEWS_KEY) and self.redis.exists(PENDING_VIEWS_KEY):
+                pipeline = self.redis.pipeline(transaction=True)
+                pipeline.rename(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+                pipeline.rename(PENDING_LAST_VIEWED_KEY, FLUSHING_LAST_VIEWED_KEY)
+                pipeline.execute()
+
+            views = {int(recipe_id): int(count) for recipe_id, count in self.redis.hgetall(FLUSHING_VIEWS_KEY).items()}
+            last_viewed = {
+                int(recipe_id): datetime.fromtimestamp(float(viewed_at), tz=timezone.utc)
+                for recipe_id, viewed_at in self.redis.hgetall(FLUSHING_LAST_VIEWED_KEY).items()
+            }
+            flushed = 0
+            if views:
+                recipe_ids = sorted(views)
+                weekly_views, weekly_viewers = self.get_weekly_counts(recipe_ids, now)
+                flushed = save_view_counts([
+                    (recipe_id, views[recipe_id], weekly_views[recipe_id], weekly_viewers[recipe_id], last_viewed[recipe_id])
+                    for recipe_id in recipe_ids
+                ])
+            self.redis.delete(FLUSHING_VIEWS_KEY, FLUSHING_LAST_VIEWED_KEY)
+            self.roll_over(now)
+            return flushed
+        finally:
+            lock.release()
+
+    def get_weekly_counts(self, recipe_ids, now: float) -> tuple:
+        """ Views (Summed Day Buckets) And Unique Viewers (Merged HyperLogLogs) Over The Last WEEK_DAYS """
+        days = range(get_day(now) - WEEK_DAYS + 1, get_day(now) + 1)
+        pipeline = self.redis.pipeline(transaction=False)
+        for day in days:
+            pipeline.hmget(DAY_VIEWS_KEY.format(day), recipe_ids)
+        for recipe_id in recipe_ids:
+            pipeline.pfcount(*[DAY_VIEWERS_KEY.format(recipe_id, day) for day in days])
+        results = pipeline.execute()
+
+        day_counts, viewer_counts = results[:len(days)], results[len(days):]
+        weekly_views = {
+            recipe_id: sum(int(counts[index] or 0) for counts in day_counts)
+            for index, recipe_id in enumerate(recipe_ids)
+        }
+        return weekly_views, dict(zip(recipe_ids, viewer_counts))
+
+    def roll_over(self, now: float):
+        """ Carry The Previous Period's Scores Into The Current One, Scaled To The Current Weights """
+        period = get_period(now)
+        try:
+            # Only one caller wins the rename, so scores are never carried twice
+            self.redis.rename(SCORES_KEY.format(period - 1), CARRY_KEY.format(period))
+        except ResponseError:
+            # No previous period, or it was already carried over
+            pass
+        if self.redis.exists(CARRY_KEY.format(period)):
+            pipeline = self.redis.pipeline(transaction=True)
+            pipeline.zunionstore(
+                SCORES_KEY.format(period), {SCORES_KEY.format(period): 1, CARRY_KEY.format(period): CARRY_WEIGHT},
+            )
+            pipeline.delete(CARRY_KEY.format(period))
+            pipeline.execute()
+        self.redis.zremrangebyrank(SCORES_KEY.format(period), 0, -MAX_TRENDING - 1)
+
+    def trending(self, limit: int, now: float = None) -> list:
+        """ (recipe_id, score) Pairs, Highest First; score Is The Decayed View Count As Of now """
+        now = time.time() if now is None else now
+        if self.redis.exists(SCORES_KEY.format(get_period(now) - 1)):
+            # A new period began since the last flush
+            self.roll_over(now)
+        scale = get_weight(now)
+        return [
+            (int(recipe_id), score / scale)
+            for recipe_id, score in self.redis.zrevrange(SCORES_KEY.format(get_period(now)), 0, limit - 1, withscores=True)
+        ]
+
+    def forget(self, recipe_ids, now: float = None):
+        """ Drop Deleted Recipes From The Ranking """
+        now = time.time() if now is None else now
+        pipeline = self.redis.pipeline(transaction=False)
+        for period in (get_period(now) - 1, get_period(now)):
+            pipeline.zrem(SCORES_KEY.format(period), *recipe_ids)
+        pipeline.execute()
+
+
+def save_view_counts(rows) -> int:
+    """ Upsert (recipe_id, views, weekly_views, weekly_viewers, last_viewed_at) Rows In One Statement
+
+    Views add to the stored count; recipes deleted since they were viewed are skipped.
+    """
+    recipe_ids, views, weekly_views, weekly_viewers, last_viewed = (list(column) for column in zip(*rows))
+    quote_name = connection.ops.quote_name
+    stats_table = quote_name(RecipeStats._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {stats_table} '
+            f'(recipe_id, view_count, weekly_view_count, weekly_unique_viewers, last_viewed_at, flushed_at) '
+            f'SELECT flushed.*, NOW() '
+            f'FROM unnest(%s::bigint[], %s::bigint[], %s::integer[], %s::integer[], %s::timestamptz[]) '
+            f'AS flushed (recipe_id, view_count, weekly_view_count, weekly_unique_viewers, last_viewed_at) '
+            f'JOIN {quote_name(Recipe._meta.db_table)} recipe ON recipe.id = flushed.recipe_id '
+            f'ON CONFLICT (recipe_id) DO UPDATE SET '
+            f'view_count = {stats_table}.view_count + EXCLUDED.view_count, '
+            f'weekly_view_count = EXCLUDED.weekly_view_count, '
+            f'weekly_unique_viewers = EXCLUDED.weekly_unique_viewers, '
+            f'last_viewed_at = GREATEST({stats_table}.last_viewed_at, EXCLUDED.last_viewed_at), '
+            f'flushed_at = EXCLUDED.flushed_at',
+            [recipe_ids, views, weekly_views, weekly_viewers, last_viewed],
+        )
+        return cursor.rowcount
+
+
+def record_view(recipe_id: int, viewer_id):
+    """ Count A View; Losing One To A Redis Outage Beats Failing The Request """
+    try:
+        RecipeViews().record(recipe_id, viewer_id)
+    except Exception as ex:
+        logging.error(f"Recipe view could not be recorded. \n{ex}")
+
+
+def forget_recipes(recipe_ids):
+    """ on_commit Callback: Drop Deleted Recipes From The Trending Ranking """
+    try:
+        RecipeViews().forget(recipe_ids)
+    except Exception as ex:
+        logging.error(f"Deleted recipes could not be dropped from the trending ranking. \n{ex}")
@@ -5,7 +5,13 @@ from apps.recipes.views import (
     GetAllRecipesView,
     DetailedRecipeView,
     CreateRecipeView,
+    BatchCreateRecipesView,
     SaveRecipeView,
+    PantryRecipesView,
+    SimilarRecipesView,
+    TrendingRecipesView,
+    ExportRecipesView,
+    ImportRecipesView,
 )
 from core import settings
 
@@ -13,8 +19,14 @@ app_name = 'recipes'
 
 urlpatterns = [
     path('all/', GetAllRecipesView.as_view(), name='recipe-list'),
+    path('export/', ExportRecipesView.as_view(), name='recipe-export'),
+    path('import/', ImportRecipesView.as_view(), name='recipe-import'),
+    path('pantry/', PantryRecipesView.as_view(), name='recipe-pantry'),
+    path('trending/', TrendingRecipesView.as_view(), name='recipe-trending'),
     path('item/<int:pk>/', DetailedRecipeView.as_view(), name='recipe-detail'),
+    path('item/<int:pk>/similar/', SimilarRecipesView.as_view(), name='recipe-similar'),
     path('create/', CreateRecipeView.as_view(), name='recipe-create'),
+    path('batch/', BatchCreateRecipesView.as_view(), name='recipe-batch'),
     path('item/download/<int:pk>/', SaveRecipeView.as_view(), name='recipe-download'),
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
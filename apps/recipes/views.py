@@ -1,69 +1,325 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
 import requests
-from apps.recipes.serializers import RecipeSerializer, RecipeDetailSerializer
-from apps.utils import db_queries
+from apps.recipes import bulk_import, export, facets, read_model, similar, trending
+from apps.recipes.filters import ORDERINGS, RecipeFilter, parse_id_list
+from apps.recipes.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    RecipeSearchSerializer,
+    PantryMatchSerializer,
+    SimilarRecipeSerializer,
+    TrendingRecipeSerializer,
+    RecipeImportUploadSerializer,
+)
+from apps.utils import conditional, db_queries, response_cache, sparse_fields, streaming
+from apps.utils.database_json import DOCUMENT, DatabaseJSONSerializer
+from apps.utils.fast_serialization import RowSerializer
 from apps.utils.generate_pdf import make_pdf_api_call
+from apps.utils.pagination import KeysetPagination, LimitMixin
 from core import settings as api_settings
 
 
 @extend_schema(tags=["Recipes"], parameters=[
     OpenApiParameter('tags', OpenApiTypes.STR),
+    OpenApiParameter('tags_match', OpenApiTypes.STR, enum=['any', 'all']),
     OpenApiParameter('ingredients', OpenApiTypes.STR),
+    OpenApiParameter('ingredients_match', OpenApiTypes.STR, enum=['any', 'all']),
+    OpenApiParameter('exclude_ingredients', OpenApiTypes.STR),
     OpenApiParameter('recipe', OpenApiTypes.STR),
+    OpenApiParameter('min_price', OpenApiTypes.DECIMAL),
+    OpenApiParameter('max_price', OpenApiTypes.DECIMAL),
+    OpenApiParameter('max_minutes', OpenApiTypes.INT),
+    OpenApiParameter('difficulty', OpenApiTypes.STR),
+    OpenApiParameter('ordering', OpenApiTypes.STR, enum=list(ORDERINGS)),
+    OpenApiParameter('cursor', OpenApiTypes.STR),
+    OpenApiParameter('page_size', OpenApiTypes.INT),
+    OpenApiParameter('stream', OpenApiTypes.BOOL),
+    OpenApiParameter('facets', OpenApiTypes.STR, description='Comma separated: tags, ingredients, '
+                     'difficulty_level, price, preparation_time_minutes, or all'),
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+    OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
 ])
 class GetAllRecipesView(APIView):
     """ View For Manage Recipe Api """
 
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthenticated,)
-
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self):
+        """ An Explicit `ordering` Wins; Otherwise Search Results Are Ranked, Everything Else Newest First """
+        if self.recipe_filter.ordering:
+            return self.recipe_filter.ordering
+        if self.recipe_filter.search:
+            return db_queries.SEARCH_ORDERING
+        return self.ordering
+
+    def get_validators(self, request, *args, **kwargs):
+        try:
+            RecipeFilter(request.query_params)
+        except ValidationError:
+            # No validators, so the handler reports the invalid params
+            return None
+        return db_queries.get_recipe_list_validators(request=request)
+
+    @conditional.conditional_get
+    @response_cache.cache_response('recipe-list', namespaces=(
+        response_cache.RECIPES, response_cache.TAGS, response_cache.INGREDIENTS,
+    ))
     def get(self, request, *args, **kwargs):
         """ Retrieve Recipes For Authenticated Users """
-
+        # Invalid params raise ValidationError, formatted by DRF's exception handler
+        self.recipe_filter = RecipeFilter(request.query_params)
+        facet_names = facets.parse_facets(request.query_params.get('facets'))
+        self.fields = sparse_fields.get_requested_fields(request, self.get_list_serializer_class())
         try:
-            tags = self.request.query_params.get('tags')
-            ingredients = self.request.query_params.get('ingredients')
-            recipe = self.request.query_params.get('recipe')
-
-            all_recipes = db_queries.get_all_recipes()
-
-            if tags:
-                all_recipes = db_queries.get_all_recipes_by_tags(tags_data=tags)
-            if ingredients:
-                all_recipes = db_queries.get_all_recipes_by_ingredients(ingredients_data=ingredients)
-            if recipe:
-                all_recipes = db_queries.get_all_recipes_by_name_search(recipe_data=recipe)
-
-            return Response(data=all_recipes, status=status.HTTP_200_OK)
+            if streaming.is_streaming_requested(request):
+                return streaming.streaming_json_response(
+                    self.iter_recipe_chunks(), encode=str if self.use_database_json() else streaming.encode_item,
+                )
+
+            paginator = self.pagination_class()
+            if self.use_database_json():
+                all_recipes = db_queries.get_filtered_recipes(recipe_filter=self.recipe_filter, fields=self.fields)
+                json_serializer = DatabaseJSONSerializer(self.get_list_serializer_class(), fields=self.fields)
+                page = paginator.paginate_queryset(
+                    json_serializer.values(all_recipes, extra_columns=paginator.get_cursor_columns(self)), request, view=self,
+                )
+                extra = {'facets': facets.get_facets(self.recipe_filter, facet_names)} if facet_names else {}
+                # Already encoded, so it is passed through rather than rendered
+                return paginator.get_encoded_paginated_response(json_serializer.render(page), **extra)
+            elif self.use_read_model():
+                all_recipes = db_queries.get_filtered_recipe_cards(recipe_filter=self.recipe_filter, fields=self.fields)
+                page = paginator.paginate_queryset(all_recipes, request, view=self)
+                response = paginator.get_paginated_response(read_model.get_documents(
+                    page, extra_fields=self.get_extra_fields(), fields=self.fields,
+                ))
+            else:
+                all_recipes = db_queries.get_filtered_recipes(recipe_filter=self.recipe_filter, fields=self.fields)
+                row_serializer = RowSerializer(self.get_list_serializer_class(), fields=self.fields)
+                page = paginator.paginate_queryset(
+                    row_serializer.values(all_recipes, extra_columns=paginator.get_cursor_columns(self)), request, view=self,
+                )
+                response = paginator.get_paginated_response(row_serializer.render(page))
+
+            if facet_names:
+                response.data['facets'] = facets.get_facets(self.recipe_filter, facet_names)
+            return response
+        except APIException:
+            # E.g. NotFound for an invalid cursor
+            raise
         except Exception as ex:
             return Response(
                 {'details': f'Error: {str(ex)}'}, status=status.HTTP_400_BAD_REQUEST
             )
 
+    def get_list_serializer_class(self):
+        return RecipeSearchSerializer if self.recipe_filter.search else RecipeSerializer
+
+    def use_database_json(self) -> bool:
+        return 'recipe-list' in api_settings.RECIPE_JSON_FROM_DATABASE
+
+    def use_read_model(self) -> bool:
+        """ Stored Cards Save Prefetching And Rendering Tags; A Sparse Fieldset Without Them Is
+        Cheaper As A Query Over Just Its Own Columns
+        """
+        if not api_settings.SERVE_RECIPES_FROM_READ_MODEL:
+            return False
+        return self.fields is None or any(name in RecipeSerializer.prefetch_related_fields for name in self.fields)
+
+    def get_extra_fields(self) -> tuple:
+        """ Search Annotations Added To The Stored Cards """
+        if not self.recipe_filter.search:
+            return ()
+        return tuple(name for name in ('rank', 'headline') if self.fields is None or name in self.fields)
+
+    def iter_recipe_chunks(self):
+        """ Every Matching Recipe, Unpaginated, A Chunk Of Rendered Cards At A Time """
+        if self.use_database_json():
+            all_recipes = db_queries.get_filtered_recipes(recipe_filter=self.recipe_filter, fields=self.fields)
+            json_serializer = DatabaseJSONSerializer(self.get_list_serializer_class(), fields=self.fields)
+            for chunk in streaming.iter_chunks(json_serializer.values(all_recipes)):
+                yield [row[DOCUMENT] for row in chunk]
+            return
+
+        if self.use_read_model():
+            all_recipes = db_queries.get_filtered_recipe_cards(recipe_filter=self.recipe_filter, fields=self.fields)
+            for chunk in streaming.iter_chunks(all_recipes):
+                yield read_model.get_documents(chunk, extra_fields=self.get_extra_fields(), fields=self.fields)
+            return
+
+        all_recipes = db_queries.get_filtered_recipes(recipe_filter=self.recipe_filter, fields=self.fields)
+        row_serializer = RowSerializer(self.get_list_serializer_class(), fields=self.fields)
+        for chunk in streaming.iter_chunks(row_serializer.values(all_recipes)):
+            yield row_serializer.render(chunk)
+
+
+@extend_schema(tags=["Recipes"], parameters=[
+    OpenApiParameter('ingredients', OpenApiTypes.STR, required=True),
+    OpenApiParameter('limit', OpenApiTypes.INT),
+])
+class PantryRecipesView(LimitMixin, APIView):
+    """ Recipes Ranked By How Many Of Their Ingredients The User Already Has """
+
+    serializer_class = PantryMatchSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        ingredient_ids = parse_id_list(request.query_params.get('ingredients'), 'ingredients')
+        if not ingredient_ids:
+            return Response({'ingredients': 'At Least One Ingredient Id Is Required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        recipes = db_queries.get_pantry_matches(ingredient_ids=ingredient_ids, limit=self.get_limit(request))
+        serializer = PantryMatchSerializer(instance=recipes, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=["Recipes"], parameters=[
+    OpenApiParameter('limit', OpenApiTypes.INT),
+])
+class SimilarRecipesView(LimitMixin, APIView):
+    """ Recipes Sharing The Most Tags And Ingredients With A Recipe, From The Similar Recipes Index """
+
+    serializer_class = SimilarRecipeSerializer
+    permission_classes = (IsAuthenticated,)
+    default_limit = 10
+    max_limit = similar.MAX_NEIGHBORS
+
+    def get(self, request, pk, *args, **kwargs):
+        if not db_queries.get_recipe_by_id(pk=pk):
+            return Response({'details': 'Recipe Not Found'}, status=status.HTTP_404_NOT_FOUND)
+
+        recipes = db_queries.get_similar_recipes(pk=pk, limit=self.get_limit(request))
+        if recipes is None:
+            return Response({'error': 'Similar Recipes Are Not Available Yet'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        serializer = SimilarRecipeSerializer(instance=recipes, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=["Recipes"], parameters=[
+    OpenApiParameter('limit', OpenApiTypes.INT),
+])
+class TrendingRecipesView(LimitMixin, APIView):
+    """ The Most Viewed Recipes Of The Past Days, Recent Views Weighing More """
+
+    serializer_class = TrendingRecipeSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        recipes = db_queries.get_trending_recipes(limit=self.get_limit(request))
+        serializer = TrendingRecipeSerializer(instance=recipes, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=["Recipes"], parameters=[
+    OpenApiParameter('export_format', OpenApiTypes.STR, enum=list(export.EXPORT_FORMATS)),
+    OpenApiParameter('compression', OpenApiTypes.STR, enum=list(export.COMPRESSIONS)),
+], responses={(200, content_type): OpenApiTypes.BINARY for content_type in export.CONTENT_TYPES.values()})
+class ExportRecipesView(APIView):
+    """ Staff Only Download Of The Whole Catalog, Streamed From A Server-Side Cursor """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', export.NDJSON)
+        compression = request.query_params.get('compression') or None
+        if export_format not in export.EXPORT_FORMATS:
+            return Response({'export_format': f'Expected One Of {", ".join(export.EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if compression is not None and compression not in export.COMPRESSIONS:
+            return Response({'compression': f'Expected One Of {", ".join(export.COMPRESSIONS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export.export_recipes(export_format=export_format, compression=compression),
+            content_type=export.get_content_type(export_format, compression),
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export.get_file_name(export_format, compression)}"'
+        return response
+
 
 @extend_schema(tags=["Recipes"])
+class ImportRecipesView(APIView):
+    """ Bulk Create Recipes For The User From An NDJSON Or CSV Upload, Reporting Per-Row Errors """
+
+    serializer_class = RecipeImportUploadSerializer
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = RecipeImportUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uploaded_file = serializer.validated_data['file']
+        import_format = serializer.validated_data.get('import_format') or bulk_import.guess_format(uploaded_file.name)
+
+        stream = bulk_import.open_text(uploaded_file.file, uploaded_file.name)
+        report = bulk_import.RecipeImport(request.user).run(stream, import_format)
+        if report['failed'] and not report['created']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(tags=["Recipes"], parameters=[
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+    OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
+])
 class DetailedRecipeView(APIView):
     serializer_class = RecipeDetailSerializer
     permission_classes = (IsAuthenticated,)
 
+    def get_validators(self, request, pk, *args, **kwargs):
+        try:
+            fields = sparse_fields.get_requested_fields(request, RecipeDetailSerializer)
+        except ValidationError:
+            return None
+        return db_queries.get_recipe_validators(pk=pk, request=request, fields=fields)
+
+    @conditional.conditional_get
     def get(self, request, pk, *args, **kwargs):
+        fields = sparse_fields.get_requested_fields(request, RecipeDetailSerializer)
         try:
-            recipe = db_queries.get_recipe_by_id(pk=pk)
+            if 'recipe-detail' in api_settings.RECIPE_JSON_FROM_DATABASE:
+                recipe_json = db_queries.get_recipe_detail_json(pk=pk, fields=fields)
+                if recipe_json is None:
+                    return Response({'details': 'Recipe Not Found'}, status=status.HTTP_404_NOT_FOUND)
+                return HttpResponse(recipe_json.encode('utf-8'), content_type='application/json')
+
+            if api_settings.SERVE_RECIPES_FROM_READ_MODEL:
+                recipe_data = read_model.get_detail(pk=pk)
+                if recipe_data is None:
+                    return Response({'details': 'Recipe Not Found'}, status=status.HTTP_404_NOT_FOUND)
+                if fields is not None:
+                    # One stored row either way; trimming it only shrinks the response
+                    recipe_data = {name: recipe_data[name] for name in fields}
+                return Response(recipe_data, status=status.HTTP_200_OK)
+
+            recipe = db_queries.get_recipe_detail_by_id(pk=pk, fields=fields)
             if not recipe:
                 return Response({'details': 'Recipe Not Found'}, status=status.HTTP_404_NOT_FOUND)
-            serializer = RecipeDetailSerializer(recipe)
+            serializer = RecipeDetailSerializer(recipe, fields=fields)
         except Exception as ex:
             return Response(
                 {'details': f'Error: {str(ex)}'}, status=status.HTTP_400_BAD_REQUEST
             )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Views are counted in Redis and flushed to RecipeStats later; a 304 is a view too
+        if request.method == 'GET' and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            trending.record_view(kwargs['pk'], request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
     def update_recipe(self, request, pk, partial=False):
         recipe = db_queries.get_recipe_by_id(pk=pk)
         is_owner = db_queries.get_recipe_owner(request=request, recipe_pk=pk)
@@ -118,20 +374,82 @@ class CreateRecipeView(APIView):
         return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
 
 
-@extend_schema(tags=["Profile"])
+@extend_schema(tags=["Recipes"], request=RecipeSerializer(many=True), parameters=[
+    OpenApiParameter('atomic', OpenApiTypes.BOOL),
+])
+class BatchCreateRecipesView(APIView):
+    """ Create Many Recipes In One Request And One Transaction, With A Result Per Item
+
+    By default the valid items are created and the invalid ones reported; with `atomic=true`
+    a single invalid item rejects the whole batch.
+    """
+
+    serializer_class = RecipeSerializer
+    permission_classes = (IsAuthenticated,)
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        atomic = request.query_params.get('atomic', '').lower() in ('1', 'true')
+        serializer = RecipeSerializer(data=request.data, many=True, allow_empty=False, max_length=self.max_batch_size)
+        if serializer.is_valid():
+            serializer.save(user=request.user)
+            return Response(self.build_report(serializer.data, [{}] * len(request.data)), status=status.HTTP_201_CREATED)
+        if not isinstance(serializer.errors, list):
+            # Not a list, empty or too long: there are no items to report on
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        item_errors = serializer.errors
+        valid_items = [item for item, errors in zip(request.data, item_errors) if not errors]
+        if atomic or not valid_items:
+            return Response(self.build_report([], item_errors), status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = RecipeSerializer(data=valid_items, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(self.build_report(serializer.data, item_errors), status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def build_report(created_recipes, item_errors) -> dict:
+        """ Results In Request Order: The Created Recipe, Or The Item's Errors ({} When It Was Valid) """
+        created_recipes = iter(created_recipes)
+        results = []
+        for index, errors in enumerate(item_errors):
+            recipe = None if errors else next(created_recipes, None)
+            if recipe is None:
+                results.append({'index': index, 'created': False, 'errors': errors})
+            else:
+                results.append({'index': index, 'created': True, 'recipe': recipe})
+        created = sum(result['created'] for result in results)
+        return {'created': created, 'failed': len(results) - created, 'results': results}
+
+
+@extend_schema(tags=["Profile"], parameters=[
+    OpenApiParameter('cursor', OpenApiTypes.STR),
+    OpenApiParameter('page_size', OpenApiTypes.INT),
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+    OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
+])
 class MyRecipesView(APIView):
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', '-id')
 
     def get(self, request, *args, **kwargs):
-        my_recipe_objects = db_queries.get_my_recipes(request=request)
-        recipes_data = my_recipe_objects.data
+        fields = sparse_fields.get_requested_fields(request, RecipeSerializer)
+        my_recipe_objects = db_queries.get_my_recipes(request=request, fields=fields)
+        paginator = self.pagination_class()
+        row_serializer = RowSerializer(RecipeSerializer, fields=fields)
+        page = paginator.paginate_queryset(
+            row_serializer.values(my_recipe_objects, extra_columns=paginator.get_cursor_columns(self)), request, view=self,
+        )
+        recipes_data = row_serializer.render(page)
         if recipes_data == 0:
             return Response(
                 {'details': 'You Do Not Have Any Recipes Created'},
                 status=status.HTTP_204_NO_CONTENT
             )
-        return Response(data=recipes_data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(recipes_data)
 
 
 @extend_schema(tags=["Recipes"])
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0005_rename_user_tag_creator_tag_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-created_at', '-id'], name='tag_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['creator', '-created_at', '-id'], name='tag_creator_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0007_tag_tag_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['updated_at'], name='tag_updated_at_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from core import settings
 
@@ -12,5 +13,13 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='tag_created_id_idx'),
+            models.Index(fields=['creator', '-created_at', '-id'], name='tag_creator_created_id_idx'),
+            models.Index(fields=['updated_at'], name='tag_updated_at_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='tag_name_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.name
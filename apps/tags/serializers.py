@@ -1,9 +1,10 @@
-from django.db import IntegrityError
 from rest_framework import serializers
 from apps.tags.models import Tag
+from apps.utils import response_cache
+from apps.utils.eager_loading import EagerLoadingMixin
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """ Serializer For Tags """
     name = serializers.CharField(validators=[])
     id = serializers.IntegerField(read_only=True)
@@ -14,13 +15,19 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def create(self, validated_data):
-        tag_name = validated_data['name']
+        """ Create The Tag Or Return The Existing One With That Name
 
-        try:
-            return super().create(validated_data)
-        except IntegrityError:
-            existing_tag = Tag.objects.get(name=tag_name)
-            return existing_tag
+        INSERT ... ON CONFLICT DO NOTHING never aborts the surrounding transaction, even when a
+        concurrent request creates the same name first.
+        """
+        Tag.objects.bulk_create([Tag(**validated_data)], ignore_conflicts=True)
+        response_cache.invalidate(response_cache.TAGS)
+        return Tag.objects.get(name=validated_data['name'])
+
+
+class TagBulkDeleteSerializer(serializers.Serializer):
+    """ Serializer For Deleting Tags By Id """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
 
 
 class TagDetailSerializer(TagSerializer):
@@ -1,14 +1,23 @@
+import json
+
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from apps.users.tests import create_user
+from apps.recipes.models import Recipe
 from apps.tags.models import Tag
 from apps.tags.serializers import TagSerializer
+from apps.utils.fast_serialization import RowSerializer
 
 TAGS_URL = reverse('tags:tag-list')
+TAG_CREATE_URL = reverse('tags:tag-create')
+TAGS_BULK_URL = reverse('tags:tag-bulk')
+RECIPES_URL = reverse('recipes:recipe-list')
 
 
 def detail_url(tag_id):
@@ -40,6 +49,7 @@ class PrivateTagTests(TestCase):
         self.user = user
         self.client = APIClient()
         self.client.force_authenticate(self.user)
+        cache.clear()
 
     def test_create_tag(self):
         tag = Tag.objects.create(creator=self.user, name='tag1')
@@ -56,7 +66,7 @@ class PrivateTagTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_detail_tag(self):
         """ test Viewing Tag Details """
@@ -83,3 +93,104 @@ class PrivateTagTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         tags = Tag.objects.filter(pk=tag.id)
         self.assertFalse(tags.exists())
+
+    def test_retrieve_tags_single_query(self):
+        """ Test Listing Tags Runs One Query Including The Cursor Columns """
+        for index in range(3):
+            Tag.objects.create(creator=self.user, name=f'Tag {index}')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertIsNotNone(res.data['next'])
+
+    def test_retrieve_tags_sparse_fieldset(self):
+        """ Test omit= Leaves Fields Out Of Tag Lists And Details """
+        tag = Tag.objects.create(creator=self.user, name='Vegan', description='No animal products')
+
+        res = self.client.get(TAGS_URL, {'omit': 'name'})
+        detail = self.client.get(detail_url(tag.id), {'fields': 'description'})
+
+        self.assertEqual(res.data['results'], [{'id': tag.id}])
+        self.assertEqual(detail.data, {'description': 'No animal products'})
+
+    def test_tags_list_cache_invalidated_on_create(self):
+        """ Test A New Tag Shows Up Even Though The List Was Cached """
+        Tag.objects.create(creator=self.user, name='Vegan')
+        self.assertEqual(self.client.get(TAGS_URL)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(TAGS_URL)['X-Cache'], 'HIT')
+
+        Tag.objects.create(creator=self.user, name='Dessert')
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_detail_tag_not_modified_since(self):
+        """ Test If-Modified-Since Gets 304 Until The Tag Changes """
+        tag = Tag.objects.create(creator=self.user, name='Dinner')
+        last_modified = self.client.get(detail_url(tag_id=tag.id))['Last-Modified']
+
+        res = self.client.get(detail_url(tag_id=tag.id), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tags_streamed_as_one_array(self):
+        for index in range(3):
+            Tag.objects.create(creator=self.user, name=f'Tag {index}')
+
+        res = self.client.get(TAGS_URL, {'stream': 'true'})
+
+        tags = Tag.objects.all().order_by('-created_at', '-id')
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), TagSerializer(tags, many=True).data)
+
+    def test_tag_rows_render_same_as_serializer(self):
+        """ Test The Rows Behind The Tag List Render Byte For Byte Like TagSerializer """
+        for index in range(3):
+            Tag.objects.create(creator=self.user, name=f'Tag {index}')
+        tags = Tag.objects.order_by('-created_at', '-id')
+        row_serializer = RowSerializer(TagSerializer)
+
+        self.assertEqual(
+            JSONRenderer().render(row_serializer.render(row_serializer.values(tags))),
+            JSONRenderer().render(TagSerializer(tags, many=True).data),
+        )
+
+    def test_create_existing_tag_name_returns_existing_tag(self):
+        """ Test Creating A Taken Name Returns The Existing Tag Without A Duplicate """
+        tag = Tag.objects.create(creator=self.user, name='Vegan')
+
+        res = self.client.post(TAG_CREATE_URL, {'name': 'Vegan'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'id': tag.id, 'name': 'Vegan'})
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 1)
+
+    def test_bulk_create_tags_without_duplicates(self):
+        """ Test Repeated And Existing Names Resolve To One Tag Each """
+        vegan = Tag.objects.create(creator=self.user, name='Vegan')
+
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}, {'name': 'Dessert'}]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        dessert = Tag.objects.get(name='Dessert')
+        self.assertEqual(res.data, [{'id': vegan.id, 'name': 'Vegan'}, {'id': dessert.id, 'name': 'Dessert'}])
+
+    def test_bulk_delete_only_own_tags(self):
+        """ Test Bulk Delete Skips Other Users' Tags And Re-Indexes The Recipes That Used Them """
+        other_user = create_user(email='other@example.com', username='other', password='Testpass123')
+        own = Tag.objects.create(creator=self.user, name='Smoky')
+        foreign = Tag.objects.create(creator=other_user, name='Spicy')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Grilled fish', preparation_time_minutes=5, price='2.00', description='Fish',
+        )
+        recipe.tags.add(own, foreign)
+        self.assertEqual(self.client.get(RECIPES_URL, {'recipe': 'smoky'}).data['results'][0]['id'], recipe.id)
+
+        res = self.client.delete(TAGS_BULK_URL, {'ids': [own.id, foreign.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': [own.id]})
+        self.assertEqual(list(recipe.tags.all()), [foreign])
+        self.assertEqual(self.client.get(RECIPES_URL, {'recipe': 'smoky'}).data['results'], [])
@@ -3,7 +3,8 @@ from django.urls import path
 from apps.tags.views import (
     CreateTagView,
     GetAllTagsView,
-    DetailedTagView
+    DetailedTagView,
+    BulkTagsView,
 )
 
 app_name = 'tags'
@@ -12,4 +13,5 @@ urlpatterns = [
     path('all/', GetAllTagsView.as_view(), name='tag-list'),
     path('item/<int:pk>/', DetailedTagView.as_view(), name='tag-detail'),
     path('create/', CreateTagView.as_view(), name='tag-create'),
+    path('bulk/', BulkTagsView.as_view(), name='tag-bulk'),
 ]
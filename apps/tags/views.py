@@ -1,47 +1,86 @@
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 
-from apps.tags.serializers import TagSerializer, TagDetailSerializer
-from apps.utils import db_queries
+from apps.tags.serializers import TagSerializer, TagDetailSerializer, TagBulkDeleteSerializer
+from apps.utils import conditional, db_queries, response_cache, sparse_fields, streaming
+from apps.utils.fast_serialization import RowSerializer
+from apps.utils.pagination import KeysetPagination
 
 
-@extend_schema(tags=["Tags"])
+@extend_schema(tags=["Tags"], parameters=[
+    OpenApiParameter('cursor', OpenApiTypes.STR),
+    OpenApiParameter('page_size', OpenApiTypes.INT),
+    OpenApiParameter('stream', OpenApiTypes.BOOL),
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+    OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
+])
 class GetAllTagsView(APIView):
     """ View For Manage Tag Api """
 
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', '-id')
+
+    def get_validators(self, request, *args, **kwargs):
+        return db_queries.get_tag_list_validators(request=request)
 
+    @conditional.conditional_get
+    @response_cache.cache_response('tag-list', namespaces=(response_cache.TAGS,))
     def get(self, request, *args, **kwargs):
         """ Retrieve Tags For Authenticated Users """
 
         try:
-            all_tags = db_queries.get_all_tags()
-            tags_data = all_tags.data
-            return Response(data=tags_data, status=status.HTTP_200_OK)
+            fields = sparse_fields.get_requested_fields(request, TagSerializer)
+            all_tags = db_queries.get_all_tags(fields=fields)
+            row_serializer = RowSerializer(TagSerializer, fields=fields)
+            if streaming.is_streaming_requested(request):
+                return streaming.streaming_json_response(
+                    row_serializer.render(chunk) for chunk in streaming.iter_chunks(row_serializer.values(all_tags))
+                )
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(
+                row_serializer.values(all_tags, extra_columns=paginator.get_cursor_columns(self)), request, view=self,
+            )
+            tags_data = row_serializer.render(page)
+            return paginator.get_paginated_response(tags_data)
         except Exception as ex:
             return Response(
                 {'details': f'Error: {str(ex)}'}, status=status.HTTP_400_BAD_REQUEST
             )
 
 
-@extend_schema(tags=["Tags"])
+@extend_schema(tags=["Tags"], parameters=[
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+    OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
+])
 class DetailedTagView(APIView):
     """ Detail View For Tags To View Them  Update And Delete """
 
     serializer_class = TagDetailSerializer
     permission_classes = (IsAuthenticated,)
 
+    def get_validators(self, request, pk, *args, **kwargs):
+        try:
+            fields = sparse_fields.get_requested_fields(request, TagDetailSerializer)
+        except ValidationError:
+            return None
+        return db_queries.get_tag_validators(pk=pk, request=request, fields=fields)
+
+    @conditional.conditional_get
     def get(self, request, pk, *args, **kwargs):
+        fields = sparse_fields.get_requested_fields(request, TagDetailSerializer)
         try:
-            tag = db_queries.get_tag_by_id(pk=pk)
+            tag = db_queries.get_tag_by_id(pk=pk, fields=fields)
             if not tag:
                 return Response({'details': 'Tag Not Found'}, status=status.HTTP_404_NOT_FOUND)
-            serializer = TagDetailSerializer(tag)
+            serializer = TagDetailSerializer(tag, fields=fields)
         except Exception as ex:
             return Response(
                 {'details': f'Error: {str(ex)}'}, status=status.HTTP_400_BAD_REQUEST
@@ -109,17 +148,56 @@ class CreateTagView(APIView):
         return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
 
 
-@extend_schema(tags=["Profile"])
+@extend_schema(tags=["Tags"])
+class BulkTagsView(APIView):
+    """ Create Or Delete Many Tags In One Request """
+
+    serializer_class = TagSerializer
+    permission_classes = (IsAuthenticated,)
+    max_bulk_size = 1000
+
+    @extend_schema(request=TagSerializer(many=True), responses=TagSerializer(many=True))
+    def post(self, request, *args, **kwargs):
+        """ Tags For Every Name, Created When Missing; Repeated And Existing Names Are Not Duplicated """
+        serializer = TagSerializer(data=request.data, many=True, allow_empty=False, max_length=self.max_bulk_size)
+        serializer.is_valid(raise_exception=True)
+        names = list(dict.fromkeys(tag['name'] for tag in serializer.validated_data))
+        tag_ids = db_queries.resolve_tag_ids(names, creator=request.user)
+        return Response([{'id': tag_ids[name], 'name': name} for name in names], status=status.HTTP_201_CREATED)
+
+    @extend_schema(request=TagBulkDeleteSerializer)
+    def delete(self, request, *args, **kwargs):
+        """ Delete The User's Tags Among `ids`; Ids Of Other Users' Tags Are Left Alone """
+        serializer = TagBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted_ids = db_queries.bulk_delete_tags(serializer.validated_data['ids'], creator=request.user)
+        return Response({'deleted': deleted_ids}, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=["Profile"], parameters=[
+    OpenApiParameter('cursor', OpenApiTypes.STR),
+    OpenApiParameter('page_size', OpenApiTypes.INT),
+    OpenApiParameter('fields', OpenApiTypes.STR, description='Comma separated fields to render'),
+    OpenApiParameter('omit', OpenApiTypes.STR, description='Comma separated fields to leave out'),
+])
 class MyTagsView(APIView):
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', '-id')
 
     def get(self, request, *args, **kwargs):
-        my_tags_objects = db_queries.get_my_tags(request=request)
-        tags_data = my_tags_objects.data
+        fields = sparse_fields.get_requested_fields(request, TagSerializer)
+        my_tags_objects = db_queries.get_my_tags(request=request, fields=fields)
+        paginator = self.pagination_class()
+        row_serializer = RowSerializer(TagSerializer, fields=fields)
+        page = paginator.paginate_queryset(
+            row_serializer.values(my_tags_objects, extra_columns=paginator.get_cursor_columns(self)), request, view=self,
+        )
+        tags_data = row_serializer.render(page)
         if tags_data == 0:
             return Response(
                 {'details': 'You Do Not Have Any Tags Created'},
                 status=status.HTTP_204_NO_CONTENT
             )
-        return Response(data=tags_data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(tags_data)
@@ -0,0 +1,75 @@
+import functools
+import hashlib
+from collections import namedtuple
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from apps.utils import response_cache
+
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+
+def build_validators(parts, last_modified) -> Validators:
+    """ Strong ETag Over The Given Parts Plus A Last-Modified Unix Time (0 When Unknown) """
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return Validators(etag=quote_etag(digest), last_modified=int(last_modified) or None)
+
+
+def get_list_validators(request, namespaces) -> Validators:
+    """ Validators For A List From The Versions Of The Namespaces It Renders, Without A Query
+
+    Every write bumps its namespace (see response_cache.invalidate), so the versions change
+    whenever any row the list could render does, and the last change time is Last-Modified.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    return build_validators(
+        [params, request.accepted_media_type, *response_cache.get_versions(namespaces)],
+        response_cache.get_changed_at(namespaces),
+    )
+
+
+def get_detail_validators(queryset, request, namespaces=(), variant=()):
+    """ Validators For One Object From Its (id, updated_at), Or None When It Does Not Exist
+
+    `variant` is whatever else picks the representation (e.g. a sparse fieldset), so each
+    representation gets its own ETag, as does each negotiated media type.
+    """
+    row = queryset.values_list('pk', 'updated_at').first()
+    if row is None:
+        return None
+    pk, updated_at = row
+    return build_validators(
+        [pk, updated_at.timestamp(), request.accepted_media_type, *response_cache.get_versions(namespaces), *variant],
+        max(updated_at.timestamp(), response_cache.get_changed_at(namespaces)),
+    )
+
+
+def conditional_get(handler):
+    """ Answer If-None-Match / If-Modified-Since With 304 Before The Handler Queries Or Serializes
+
+    The view provides `get_validators(request, *args, **kwargs)`; returning None skips the
+    check (e.g. for a missing object or invalid params, so the handler reports the error).
+    """
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        validators = view.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return handler(view, request, *args, **kwargs)
+
+        response = get_conditional_response(
+            request, etag=validators.etag, last_modified=validators.last_modified,
+        )
+        if response is None:
+            response = handler(view, request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            # The validators are per negotiated media type
+            patch_vary_headers(response, ('Accept',))
+            response['ETag'] = validators.etag
+            if validators.last_modified:
+                response['Last-Modified'] = http_date(validators.last_modified)
+        return response
+
+    return wrapper
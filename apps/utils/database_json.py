@@ -0,0 +1,117 @@
+from django.contrib.postgres.aggregates.mixins import OrderableAggMixin
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db.models import Aggregate, F, Func, OuterRef, Subquery, TextField, Value
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+DOCUMENT = 'json_document'
+# DRF's ISO 8601 in UTC; isoformat() leaves the fraction out when it is zero
+ISO_8601_TEMPLATE = (
+    "REGEXP_REPLACE(TO_CHAR(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US\"Z\"'), "
+    "'\\.000000Z$', 'Z')"
+)
+
+
+class JSONBuildObject(Func):
+    function = 'JSON_BUILD_OBJECT'
+    output_field = TextField()
+
+
+class JSONAgg(OrderableAggMixin, Aggregate):
+    function = 'JSON_AGG'
+    template = '%(function)s(%(expressions)s %(ordering)s)'
+    output_field = TextField()
+
+
+def get_decimal_expression(field, column):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        raise ImproperlyConfigured(f'{field.field_name!r} is not rendered as a fixed point string')
+    return Func(column, Value(field.decimal_places), template='ROUND(%(expressions)s)::text', output_field=TextField())
+
+
+def get_datetime_expression(field, column):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or str(field_timezone) != 'UTC':
+        raise ImproperlyConfigured(f'{field.field_name!r} is not rendered as ISO 8601 in UTC')
+    return Func(column, template=ISO_8601_TEMPLATE, output_field=TextField())
+
+
+def get_file_expression(field, column):
+    """ The File's Storage URL, NULL For No File; Names Are Not URL-Quoted, Like Generated Upload Names Need Not Be """
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL) or field.context.get('request'):
+        raise ImproperlyConfigured(f'{field.field_name!r} is not rendered as a relative URL')
+    return Func(
+        Value(default_storage.base_url), Func(column, Value(''), function='NULLIF'),
+        template='(%(expressions)s)', arg_joiner=' || ', output_field=TextField(),
+    )
+
+
+def get_expression(field, column):
+    """ SQL Giving What field.to_representation() Does For The Column, As A JSON Value """
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return column
+    if isinstance(field, serializers.ChoiceField):
+        # Choice values render as themselves
+        return column
+    if isinstance(field, serializers.DecimalField):
+        return get_decimal_expression(field, column)
+    if isinstance(field, serializers.DateTimeField):
+        return get_datetime_expression(field, column)
+    if isinstance(field, serializers.FileField):
+        return get_file_expression(field, column)
+    if isinstance(field, (serializers.IntegerField, serializers.FloatField, serializers.CharField)):
+        return column
+    raise ImproperlyConfigured(f'{type(field).__name__} {field.field_name!r} has no SQL expression')
+
+
+class DatabaseJSONSerializer:
+    """ Read-Only Rendering Of A Serializer's Output By Postgres Itself
+
+    The fields compile into one `json_build_object(...)` per row, with each nested many-to-many
+    serializer a `json_agg` subquery over the through table, so a row arrives as finished JSON
+    text: no model instances, no Python-side encoding. The values are the serializer's (ISO 8601
+    datetimes, fixed point decimals, related lists in id order) but the text is Postgres's own,
+    with spaces after the separators. A field it can not reproduce raises ImproperlyConfigured
+    up front. Build one per request: datetimes are only supported in UTC.
+    """
+
+    def __init__(self, serializer_class, fields=None, prefix=''):
+        serializer = serializer_class(fields=fields)
+        model = serializer_class.Meta.model
+        arguments = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                value = self.get_related_expression(model._meta.get_field(field.source), type(field.child), prefix)
+            elif field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(f'{name!r} does not read a column')
+            else:
+                value = get_expression(field, F(f'{prefix}{field.source}'))
+            arguments.extend([Value(name), value])
+        self.expression = JSONBuildObject(*arguments)
+
+    @staticmethod
+    def get_related_expression(relation, child_class, prefix):
+        """ The Related Objects As A JSON Array In Related Id Order, Like The Eager Loading Prefetch """
+        through = relation.remote_field.through
+        source, target = relation.m2m_field_name(), relation.m2m_reverse_field_name()
+        child = DatabaseJSONSerializer(child_class, prefix=f'{target}__')
+        related = through.objects.filter(**{source: OuterRef(f'{prefix}pk')}).order_by().values(source).annotate(
+            items=JSONAgg(child.expression, ordering=target),
+        ).values('items')
+        return Func(Subquery(related), template="COALESCE(%(expressions)s, '[]'::json)", output_field=TextField())
+
+    def values(self, queryset, extra_columns=()):
+        """ Rows Of The JSON Text Under DOCUMENT Plus extra_columns (E.g. The Cursor Columns) """
+        document = Func(self.expression, template='(%(expressions)s)::text', output_field=TextField())
+        return queryset.prefetch_related(None).values(*extra_columns, **{DOCUMENT: document})
+
+    @staticmethod
+    def render(rows) -> str:
+        """ The Rows' Documents As One JSON Array """
+        return f"[{','.join(row[DOCUMENT] for row in rows)}]"
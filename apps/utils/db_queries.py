@@ -1,10 +1,33 @@
-from apps.recipes.serializers import RecipeSerializer
+from django.contrib.postgres.aggregates import ArrayAgg, StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, QuerySet, Subquery, Value, When
+from django.db.models.functions import Cast, Concat, Length
+
+from apps.recipes.filters import RecipeFilter, SEARCH_CONFIG
+from apps.recipes import read_model
+from apps.recipes.pantry import PantryIndex, sync_pantry_index
+from apps.recipes.similar import SimilarRecipesIndex, sync_similar_index
+from apps.recipes.trending import RecipeViews
+from apps.recipes.serializers import RecipeSerializer, RecipeDetailSerializer, RecipeSearchSerializer
 from apps.tags.models import Tag
-from apps.tags.serializers import TagSerializer
+from apps.tags.serializers import TagSerializer, TagDetailSerializer
 from apps.users.models import CustomUser
 from apps.recipes.models import Recipe
 from apps.ingredients.models import Ingredient
-from apps.ingredients.serializers import IngredientSerializer
+from apps.utils import conditional, response_cache
+from apps.utils.database_json import DOCUMENT, DatabaseJSONSerializer
+from apps.utils.lookups import ILike
+
+SEARCH_ORDERING = ('-rank', '-id')
+# pg_trgm can only serve unanchored ILIKE patterns of at least one full trigram
+TRIGRAM_MIN_LENGTH = 3
 
 
 def check_user_exists(uid=None, email=None, username=None) -> bool:
@@ -34,34 +57,285 @@ def get_user(uid: int = None, email: str = None, username: str = None) -> Custom
 
 
 def get_all_recipes():
-    recipes = Recipe.objects.all().order_by('-created_at')
-    recipes_data = RecipeSerializer(instance=recipes, many=True)
-    return recipes_data
+    recipes = Recipe.objects.all().order_by('-created_at', '-id')
+    return RecipeSerializer.setup_eager_loading(recipes)
+
+
+def get_filtered_recipes(recipe_filter: RecipeFilter, fields=None) -> QuerySet:
+    """ Apply Every Requested Criterion In One Query; Searches Are Ranked, The Rest Newest First
+
+    `fields` is a sparse fieldset: only the columns and relations it renders are loaded.
+    """
+    recipes = recipe_filter.filter_queryset(Recipe.objects.all())
+    if recipe_filter.search:
+        recipes = annotate_search_rank(
+            recipes, recipe_filter.get_search_query(), headline=fields is None or 'headline' in fields,
+        )
+        return RecipeSearchSerializer.setup_eager_loading(
+            recipes.order_by(*recipe_filter.ordering or SEARCH_ORDERING), fields=fields,
+        )
+    return RecipeSerializer.setup_eager_loading(
+        recipes.order_by(*recipe_filter.ordering or ('-created_at', '-id')), fields=fields,
+    )
+
+
+def get_filtered_recipe_cards(recipe_filter: RecipeFilter, fields=None) -> QuerySet:
+    """ Same Rows As get_filtered_recipes, Joined To Their Stored Cards Instead Of Tags """
+    recipes = recipe_filter.filter_queryset(Recipe.objects.all())
+    if recipe_filter.search:
+        recipes = annotate_search_rank(
+            recipes, recipe_filter.get_search_query(), headline=fields is None or 'headline' in fields,
+        )
+    else:
+        recipes = recipes.order_by('-created_at', '-id')
+    if recipe_filter.ordering:
+        recipes = recipes.order_by(*recipe_filter.ordering)
+    return recipes.select_related('read_model').only('id', 'created_at', 'read_model__card')
+
+
+def annotate_search_rank(recipes, query: SearchQuery, headline: bool = True) -> QuerySet:
+    """ Rank Matches; headline (Re-Parsing Every Matching Description) Only When It Is Rendered """
+    # ts_rank is a float4; widen it so cursor values round-trip exactly
+    recipes = recipes.annotate(rank=Cast(SearchRank(F('search_vector'), query), output_field=FloatField()))
+    if not headline:
+        return recipes.order_by(*SEARCH_ORDERING)
+    recipes = recipes.annotate(
+        headline=SearchHeadline(
+            Concat('title', Value('. '), 'description'),
+            query,
+            config=SEARCH_CONFIG,
+            start_sel='<mark>',
+            stop_sel='</mark>',
+            max_words=35,
+            min_words=15,
+        ),
+    ).order_by(*SEARCH_ORDERING)
+    return recipes
+
+
+def build_recipe_search_vector():
+    """ Weighted tsvector For A Recipe Row: Title (A), Tags (B), Ingredients (C), Description (D) """
+    tag_names = Recipe.tags.through.objects.filter(
+        recipe_id=OuterRef('pk'),
+    ).values('recipe_id').annotate(names=StringAgg('tag__name', ' ')).values('names')
+    ingredient_names = Recipe.ingredients.through.objects.filter(
+        recipe_id=OuterRef('pk'),
+    ).values('recipe_id').annotate(names=StringAgg('ingredient__name', ' ')).values('names')
+
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(tag_names), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(ingredient_names), weight='C', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_recipe_search_vectors(recipe_ids) -> int:
+    """ Recompute search_vector In One UPDATE For The Given Recipes """
+    return Recipe.objects.filter(pk__in=recipe_ids).update(search_vector=build_recipe_search_vector())
+
+
+def get_recipe_export_rows(columns) -> QuerySet:
+    """ Every Recipe In Id Order As Tuples, Tag And Ingredient Names Aggregated With array_agg """
+    tag_names = Recipe.tags.through.objects.filter(
+        recipe_id=OuterRef('pk'),
+    ).values('recipe_id').annotate(names=ArrayAgg('tag__name', ordering='tag__name')).values('names')
+    ingredient_names = Recipe.ingredients.through.objects.filter(
+        recipe_id=OuterRef('pk'),
+    ).values('recipe_id').annotate(names=ArrayAgg('ingredient__name', ordering='ingredient__name')).values('names')
+
+    return Recipe.objects.annotate(
+        tag_names=Subquery(tag_names),
+        ingredient_names=Subquery(ingredient_names),
+    ).order_by('id').values_list(*columns)
+
+
+def get_all_tags(fields=None):
+    tags = Tag.objects.all().order_by('-created_at', '-id')
+    return TagSerializer.setup_eager_loading(tags, fields=fields)
+
+
+def _filter_suggestions(queryset, field: str, term: str) -> QuerySet:
+    """ Matches From A pg_trgm GIN Index: Prefix Hits First, Then Closest Infix Hits """
+    escaped = connection.ops.prep_for_like_query(term)
+    prefix = ILike(F(field), Value(f'{escaped}%'))
+    matches = ILike(F(field), Value(f'%{escaped}%')) if len(term) >= TRIGRAM_MIN_LENGTH else prefix
+    return queryset.filter(matches).annotate(
+        is_prefix=Case(When(prefix, then=Value(True)), default=Value(False)),
+        similarity=TrigramWordSimilarity(term, field),
+    ).order_by('-is_prefix', '-similarity', Length(field), field, 'id')
+
+
+def _get_suggestions(queryset, field: str, term: str, limit: int) -> list:
+    return list(_filter_suggestions(queryset, field, term).values('id', field)[:limit])
+
+
+def get_recipe_suggestions(term: str, limit: int) -> list:
+    return _get_suggestions(Recipe.objects.all(), 'title', term, limit)
+
+
+def get_tag_suggestions(term: str, limit: int) -> list:
+    return _get_suggestions(Tag.objects.all(), 'name', term, limit)
+
+
+def get_ingredient_suggestions(user, term: str, limit: int) -> list:
+    return _get_suggestions(Ingredient.objects.filter(user=user), 'name', term, limit)
+
+
+def _score_pantry_in_database(ingredient_ids: list, limit: int) -> list:
+    """ PantryIndex.score() As A GROUP BY Over The Through Table, For While The Index Is Not Built """
+    through = Recipe.ingredients.through
+    scores = through.objects.filter(
+        recipe_id__in=through.objects.filter(ingredient_id__in=ingredient_ids).values('recipe_id'),
+    ).values('recipe_id').annotate(
+        size=Count('*'),
+        matched=Count('ingredient_id', filter=Q(ingredient_id__in=ingredient_ids)),
+    ).annotate(
+        missing=F('size') - F('matched'),
+        coverage=Cast('matched', FloatField()) / F('size'),
+    ).order_by('-coverage', 'missing', '-recipe_id')[:limit]
+    return [tuple(row) for row in scores.values_list('recipe_id', 'matched', 'missing', 'coverage')]
 
 
-def get_all_recipes_by_tags(tags_data):
-    tags = [int(str_id) for str_id in tags_data.split(',')]
-    recipes = Recipe.objects.filter(tags__id__in=tags).order_by('-created_at')
-    recipes_data = RecipeSerializer(instance=recipes, many=True).data  # Extract data
-    return recipes_data
+def load_ranked(ids, **annotations) -> list:
+    """ The Recipes With These Ids In This Order, Each Given Its Value Of Every Annotation
 
+    An annotation is a list aligned with `ids`. Recipes deleted since the ranking was read are
+    left out.
+    """
+    recipes = RecipeSerializer.setup_eager_loading(Recipe.objects.filter(pk__in=ids))
+    recipes_by_id = {recipe.pk: recipe for recipe in recipes}
 
-def get_all_recipes_by_ingredients(ingredients_data):
-    ingredients = [int(str_id) for str_id in ingredients_data.split(',')]
-    recipes = Recipe.objects.filter(ingredients__id__in=ingredients).order_by('-created_at')
-    recipes_data = RecipeSerializer(instance=recipes, many=True).data  # Extract data
-    return recipes_data
+    ranked = []
+    for index, recipe_id in enumerate(ids):
+        recipe = recipes_by_id.get(recipe_id)
+        if recipe is None:
+            continue
+        for name, values in annotations.items():
+            setattr(recipe, name, values[index])
+        ranked.append(recipe)
+    return ranked
 
-def get_all_recipes_by_name_search(recipe_data):
-    keywords = [data for data in recipe_data.split(' ')]
-    recipes = Recipe.objects.filter(title__contains=keywords).order_by('-created_at')
-    recipes_data = RecipeSerializer(instance=recipes, many=True).data  # Extract data
-    return recipes_data
 
-def get_all_tags():
-    tags = Tag.objects.all().order_by('-created_at')
-    tags_data = TagSerializer(instance=tags, many=True)
-    return tags_data
+def get_pantry_matches(ingredient_ids: list, limit: int) -> list:
+    """ Recipes Ranked By How Much Of Them The Given Ingredients Cover, Scored From The Pantry Index """
+    scores = PantryIndex().score(ingredient_ids, limit=limit)
+    if scores is None:
+        # Built by manage.py build_pantry_index, never on the request path
+        scores = _score_pantry_in_database(ingredient_ids, limit)
+    return load_ranked(
+        [score[0] for score in scores],
+        matched_count=[score[1] for score in scores],
+        missing_count=[score[2] for score in scores],
+        coverage=[score[3] for score in scores],
+    )
+
+
+def get_similar_recipes(pk: int, limit: int):
+    """ Recipes Sharing The Most Tags And Ingredients With Recipe pk, Read From The Similar Recipes Index
+
+    None while the index is not built (manage.py build_similar_recipes_index).
+    """
+    neighbors = SimilarRecipesIndex().neighbors(pk, limit=limit)
+    if neighbors is None:
+        return None
+    return load_ranked(
+        [recipe_id for recipe_id, _ in neighbors], similarity=[similarity for _, similarity in neighbors],
+    )
+
+
+def get_trending_recipes(limit: int) -> list:
+    """ The Most Viewed Recipes Of The Past Days, Read From The Trending Ranking In Redis """
+    ranking = RecipeViews().trending(limit=limit)
+    return load_ranked([recipe_id for recipe_id, _ in ranking], trending_score=[score for _, score in ranking])
+
+
+def resolve_tag_ids(names, creator) -> dict:
+    """ Map Tag Names To Ids, Creating The Missing Ones: One Lookup, One Insert, One Re-Read
+
+    ON CONFLICT DO NOTHING on the unique name lets concurrent writers create the same tag safely.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - tag_ids.keys()
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name, creator=creator) for name in missing], ignore_conflicts=True)
+        tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+        response_cache.invalidate(response_cache.TAGS)
+    return tag_ids
+
+
+def resolve_ingredient_ids(names, user) -> dict:
+    """ Map The User's Ingredient Names To Ids, Creating The Missing Ones In One Insert """
+    names = set(names)
+    if not names:
+        return {}
+    ingredient_ids = {}
+    # Oldest first, so a name that already exists twice keeps resolving to the same row
+    for name, ingredient_id in Ingredient.objects.filter(user=user, name__in=names).order_by('-id').values_list(
+        'name', 'id',
+    ):
+        ingredient_ids[name] = ingredient_id
+    missing = names - ingredient_ids.keys()
+    if missing:
+        created = Ingredient.objects.bulk_create([Ingredient(name=name, user=user) for name in missing])
+        ingredient_ids.update((ingredient.name, ingredient.pk) for ingredient in created)
+        response_cache.invalidate(response_cache.INGREDIENTS)
+    return ingredient_ids
+
+
+def _delete_owned(model, owner_field: str, owner, ids, through, through_field: str) -> tuple:
+    """ Delete The Owner's Rows Among ids And Their Recipe Links In One Statement
+
+    The ownership check is part of the DELETE, so ids of rows owned by someone else are skipped.
+    Returns (deleted ids, ids of the recipes that lost a link).
+    """
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH deleted AS ('
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE id = ANY(%s) AND {quote_name(model._meta.get_field(owner_field).column)} = %s RETURNING id'
+            f'), unlinked AS ('
+            f'DELETE FROM {quote_name(through._meta.db_table)} '
+            f'WHERE {quote_name(through._meta.get_field(through_field).column)} IN (SELECT id FROM deleted) '
+            f'RETURNING recipe_id'
+            f') SELECT ARRAY(SELECT id FROM deleted ORDER BY id), ARRAY(SELECT DISTINCT recipe_id FROM unlinked)',
+            [list(ids), owner.pk],
+        )
+        return cursor.fetchone()
+
+
+def _refresh_unlinked_recipes(recipe_ids):
+    """ Bulk Deletes Skip The Model Signals: Re-Derive What They Would For The Affected Recipes """
+    if recipe_ids:
+        update_recipe_search_vectors(recipe_ids)
+        read_model.refresh(recipe_ids)
+        response_cache.invalidate(response_cache.RECIPES)
+        transaction.on_commit(lambda: sync_similar_index(recipe_ids))
+
+
+def bulk_delete_tags(ids, creator) -> list:
+    """ Delete The Creator's Tags Among ids; Returns The Ids That Were Deleted """
+    with transaction.atomic():
+        deleted_ids, recipe_ids = _delete_owned(Tag, 'creator', creator, ids, Recipe.tags.through, 'tag')
+        if deleted_ids:
+            response_cache.invalidate(response_cache.TAGS)
+        _refresh_unlinked_recipes(recipe_ids)
+    return deleted_ids
+
+
+def bulk_delete_ingredients(ids, user) -> list:
+    """ Delete The User's Ingredients Among ids; Returns The Ids That Were Deleted """
+    with transaction.atomic():
+        deleted_ids, recipe_ids = _delete_owned(Ingredient, 'user', user, ids, Recipe.ingredients.through, 'ingredient')
+        if deleted_ids:
+            response_cache.invalidate(response_cache.INGREDIENTS)
+            transaction.on_commit(lambda: sync_pantry_index('forget_ingredients', deleted_ids, recipe_ids))
+        _refresh_unlinked_recipes(recipe_ids)
+    return deleted_ids
 
 
 def get_recipe_by_id(pk: int) -> Recipe:
@@ -69,8 +343,48 @@ def get_recipe_by_id(pk: int) -> Recipe:
     return recipe
 
 
-def get_tag_by_id(pk: int) -> Tag:
-    tag = Tag.objects.filter(pk=pk).first()
+def get_recipe_detail_by_id(pk: int, fields=None) -> Recipe:
+    """ Read-Only Lookup With Everything RecipeDetailSerializer Renders Loaded Up Front """
+    recipes = RecipeDetailSerializer.setup_eager_loading(Recipe.objects.filter(pk=pk), fields=fields)
+    return recipes.first()
+
+
+def get_recipe_detail_json(pk: int, fields=None) -> str:
+    """ The Recipe As JSON Text Built By Postgres, None When It Does Not Exist """
+    json_serializer = DatabaseJSONSerializer(RecipeDetailSerializer, fields=fields)
+    row = json_serializer.values(Recipe.objects.filter(pk=pk)).first()
+    return row[DOCUMENT] if row else None
+
+
+def get_recipe_list_validators(request) -> conditional.Validators:
+    return conditional.get_list_validators(request, namespaces=(
+        response_cache.RECIPES, response_cache.TAGS, response_cache.INGREDIENTS,
+    ))
+
+
+def get_recipe_validators(pk: int, request, fields=None) -> conditional.Validators:
+    """ Tags And Ingredients Are Rendered Too, So Their Renames Change The Validators """
+    return conditional.get_detail_validators(Recipe.objects.filter(pk=pk), request, namespaces=(
+        response_cache.TAGS, response_cache.INGREDIENTS,
+    ), variant=() if fields is None else [fields])
+
+
+def get_tag_list_validators(request) -> conditional.Validators:
+    return conditional.get_list_validators(request, namespaces=(response_cache.TAGS,))
+
+
+def get_tag_validators(pk: int, request, fields=None) -> conditional.Validators:
+    return conditional.get_detail_validators(
+        Tag.objects.filter(pk=pk), request, variant=() if fields is None else [fields],
+    )
+
+
+def get_tag_by_id(pk: int, fields=None) -> Tag:
+    """ With A Sparse Fieldset Only Its Columns Are Read: The Tag Must Not Be Saved Then """
+    tags = Tag.objects.filter(pk=pk)
+    if fields is not None:
+        tags = TagDetailSerializer.setup_eager_loading(tags, fields=fields)
+    tag = tags.first()
     return tag
 
 
@@ -88,16 +402,14 @@ def get_tag_owner(request, tag_pk) -> bool:
     return True
 
 
-def get_my_recipes(request) -> RecipeSerializer:
-    my_recipes = Recipe.objects.filter(user=request.user).order_by('-created_at')
-    recipes_data = RecipeSerializer(instance=my_recipes, many=True)
-    return recipes_data
+def get_my_recipes(request, fields=None) -> QuerySet:
+    my_recipes = Recipe.objects.filter(user=request.user).order_by('-created_at', '-id')
+    return RecipeSerializer.setup_eager_loading(my_recipes, fields=fields)
 
 
-def get_my_tags(request) -> TagSerializer:
-    my_tags = Tag.objects.filter(creator=request.user).order_by('-created_at')
-    tags_data = TagSerializer(instance=my_tags, many=True)
-    return tags_data
+def get_my_tags(request, fields=None) -> QuerySet:
+    my_tags = Tag.objects.filter(creator=request.user).order_by('-created_at', '-id')
+    return TagSerializer.setup_eager_loading(my_tags, fields=fields)
 
 
 def get_my_ingredients() -> Ingredient:
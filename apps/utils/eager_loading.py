@@ -0,0 +1,104 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class EagerLoadingMixin:
+    """ Lets A ModelSerializer Declare The Relations It Reads
+
+    `select_related_fields` / `prefetch_related_fields` name the relations the serializer
+    renders; `setup_eager_loading()` applies them (narrowing nested prefetches through the
+    nested serializer) plus an `only()` over the readable model columns, so serializing N
+    objects costs one query per relation instead of one per object.
+
+    A serializer built with `fields=` keeps only those of its fields (a sparse fieldset);
+    `setup_eager_loading(queryset, fields=...)` then skips the relations and columns that
+    the dropped fields would have read.
+    """
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, only=True, fields=None):
+        """ Apply The Declared Relations (And Column Restriction For Read Paths) To A Queryset """
+        serializer = cls(fields=fields)
+
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls._get_prefetches(serializer))
+        # Restricting columns under select_related would need the joined columns spelled out too
+        if only and not cls.select_related_fields:
+            columns = cls._get_only_columns(serializer, queryset)
+            if columns:
+                queryset = queryset.only(*columns)
+
+        return queryset
+
+    @classmethod
+    def _get_prefetches(cls, serializer):
+        prefetches = []
+        for relation in cls.prefetch_related_fields:
+            if relation not in serializer.fields:
+                # Left out of the sparse fieldset
+                continue
+            field = serializer.fields[relation]
+            child = getattr(field, 'child', None)
+            if isinstance(child, EagerLoadingMixin):
+                related_model = child.Meta.model
+                prefetches.append(Prefetch(
+                    field.source,
+                    # A fixed order, so renders (and the row serializers) agree on it
+                    queryset=type(child).setup_eager_loading(related_model.objects.order_by('pk')),
+                ))
+            else:
+                prefetches.append(relation)
+        return prefetches
+
+    @classmethod
+    def _get_only_columns(cls, serializer, queryset):
+        """ Readable Model Columns, Or None When A Field Reads Something only() Can Not Predict """
+        field_columns = cls._get_field_columns(serializer, queryset)
+        ordering_columns = cls._get_ordering_columns(queryset)
+        if field_columns is None or ordering_columns is None:
+            return None
+        return sorted({queryset.model._meta.pk.name} | field_columns | ordering_columns)
+
+    @staticmethod
+    def _get_field_columns(serializer, queryset):
+        """ The Columns The Serializer's Fields Read, Relations Aside """
+        columns = set()
+        for field in serializer.fields.values():
+            if field.write_only or field.source in queryset.query.annotations:
+                continue
+            if field.source == '*' or '.' in field.source or isinstance(field, serializers.SerializerMethodField):
+                return None
+            try:
+                model_field = queryset.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                continue
+            columns.add(model_field.name)
+        return columns
+
+    @staticmethod
+    def _get_ordering_columns(queryset):
+        """ The Paginator Reads The Ordering Values Of A Page's Edge Rows, Rendered Or Not """
+        columns = set()
+        for name in queryset.query.order_by:
+            name = name.lstrip('-') if isinstance(name, str) else None
+            if not name or name == 'pk' or name in queryset.query.annotations:
+                continue
+            try:
+                columns.add(queryset.model._meta.get_field(name).name)
+            except FieldDoesNotExist:
+                return None
+        return columns
@@ -0,0 +1,132 @@
+import decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+
+def get_decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return '{:f}'.format(value.quantize(quantum, rounding=rounding, context=context))
+    return convert
+
+
+def get_datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        # Columns of a USE_TZ project are always aware
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def get_choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        return value if value == '' else choices.get(str(value), value)
+    return convert
+
+
+def get_converter(field):
+    """ A Function Returning What field.to_representation() Does For A Non-None Column Value """
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # values() already gives the related id, which is what the field renders
+        return None
+    if isinstance(field, serializers.ChoiceField):
+        return get_choice_converter(field)
+    if isinstance(field, serializers.DecimalField):
+        return get_decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return get_datetime_converter(field)
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.FloatField):
+        return float
+    if isinstance(field, serializers.CharField):
+        return str
+    raise ImproperlyConfigured(f'{type(field).__name__} {field.field_name!r} has no row converter')
+
+
+class RowSerializer:
+    """ Read-Only Rendering Of A Serializer's Output Straight From values() Rows
+
+    Every rendered field becomes a column plus a converter precompiled from the DRF field
+    (Decimal -> str, datetime -> ISO 8601, ...), and every nested many-to-many serializer one
+    query over the through table, so rendering a row is a dict build: no model instances, no
+    per-field get_attribute() / to_representation() dispatch. The output is the same as the
+    serializer's; a field it can not reproduce raises ImproperlyConfigured up front.
+    Build one per request: datetimes render in the time zone current when it is built.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        serializer = serializer_class(fields=fields)
+        self.model = serializer_class.Meta.model
+        self.columns = []
+        self.converters = []
+        self.relations = []
+        # Rendered keys in field order; related lists are filled in after the columns
+        self.template = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            self.template[name] = None
+            if isinstance(field, serializers.ListSerializer):
+                self.relations.append((name, self.model._meta.get_field(field.source), RowSerializer(type(field.child))))
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(f'{name!r} does not read a column')
+            self.columns.append(field.source)
+            self.converters.append((name, field.source, get_converter(field)))
+        if self.relations and self.model._meta.pk.name not in self.columns:
+            self.columns.append(self.model._meta.pk.name)
+
+    def values(self, queryset, extra_columns=()):
+        """ The Queryset As Rows Of The Rendered Columns Plus extra_columns (E.g. The Cursor Columns) """
+        columns = list(dict.fromkeys([*self.columns, *extra_columns]))
+        return queryset.prefetch_related(None).values(*columns)
+
+    def render(self, rows) -> list:
+        rows = list(rows)
+        converters, template = self.converters, self.template
+        rendered = []
+        for row in rows:
+            item = template.copy()
+            for name, column, convert in converters:
+                value = row[column]
+                item[name] = value if value is None or convert is None else convert(value)
+            rendered.append(item)
+
+        for name, relation, child in self.relations:
+            related = self.load_related(relation, child, [row[self.model._meta.pk.name] for row in rows])
+            for row, item in zip(rows, rendered):
+                item[name] = related.get(row[self.model._meta.pk.name], [])
+        return rendered
+
+    @staticmethod
+    def load_related(relation, child, ids) -> dict:
+        """ Rendered Related Objects Per Id, In Related Id Order Like The Eager Loading Prefetch """
+        through = relation.remote_field.through
+        source, target = relation.m2m_field_name(), relation.m2m_reverse_field_name()
+        rows = list(through.objects.filter(**{f'{source}__in': ids}).order_by(target).values_list(
+            source, *(f'{target}__{column}' for column in child.columns),
+        ))
+        items = child.render(dict(zip(child.columns, row[1:])) for row in rows)
+        related = {}
+        for row, item in zip(rows, items):
+            related.setdefault(row[0], []).append(item)
+        return related
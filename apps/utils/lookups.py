@@ -0,0 +1,17 @@
+from django.db.models import Lookup
+
+
+class ILike(Lookup):
+    """ Plain `lhs ILIKE rhs`, With The Pattern's Wildcards Left To The Caller
+
+    Django's icontains / istartswith compile to `UPPER(lhs::text) LIKE UPPER(...)` on Postgres,
+    which a gin_trgm_ops index on the bare column can not serve; ILIKE can.
+    """
+
+    lookup_name = 'ilike'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
@@ -0,0 +1,200 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import HttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class LimitMixin:
+    """ A `limit` Query Param For Views Returning One Ranked List, Clamped To [1, max_limit] """
+
+    limit_query_param = 'limit'
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+
+class KeysetPagination(BasePagination):
+    """ Opaque Cursor Pagination Using The Seek Method Over A Unique Ordering
+
+    The cursor holds the ordering values of the last (or first) row of a page, and the next
+    page is fetched with a `WHERE (created_at, id) < (...)` style predicate instead of OFFSET,
+    so every page costs one index range scan regardless of how deep the client pages.
+    The ordering must end with a unique column (`id`) to act as a tiebreaker.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = None  # falls back to REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid Cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = [invert_field(field) for field in self.ordering] if reverse else list(self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+        loaded_fields, is_deferred = queryset.query.deferred_loading
+        if loaded_fields and not is_deferred:
+            # The queryset was narrowed with only(); keep the cursor columns loaded
+            cursor_columns = [field.lstrip('-') for field in ordering]
+            queryset = queryset.only(*loaded_fields, *(
+                name for name in cursor_columns if name not in queryset.query.annotations
+            ))
+        if position is not None:
+            queryset = queryset.filter(seek_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        default = self.page_size or api_settings.PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default
+        if requested <= 0:
+            return default
+        return min(requested, self.max_page_size)
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_ordering'):
+            return tuple(view.get_ordering())
+        return tuple(getattr(view, 'ordering', None) or self.ordering)
+
+    def get_cursor_columns(self, view) -> list:
+        """ What Each Row Must Carry To Encode A Cursor, E.g. In A values() Queryset """
+        return [field.lstrip('-') for field in self.get_ordering(view)]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_encoded_paginated_response(self, results: str, **extra) -> HttpResponse:
+        """ The Envelope Of get_paginated_response Around Results Already Encoded As A JSON Array """
+        def encode(value):
+            return json.dumps(value, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+        envelope = [
+            ('next', encode(self.get_next_link())),
+            ('previous', encode(self.get_previous_link())),
+            ('results', results),
+            *((key, encode(value)) for key, value in extra.items()),
+        ]
+        content = '{' + ','.join(f'{encode(key)}:{value}' for key, value in envelope) + '}'
+        return HttpResponse(content.encode('utf-8'), content_type='application/json')
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, item, reverse):
+        position = [field_value(item, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps({'p': position, 'r': int(reverse)}, default=str, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            raw_position, reverse = payload['p'], bool(payload['r'])
+            if len(raw_position) != len(self.ordering):
+                raise ValueError('Cursor does not match ordering')
+            position = [
+                decode_value(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, raw_position)
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+
+def invert_field(field: str) -> str:
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def decode_value(model, name, value):
+    """ Restore A Cursor Value Through Its Model Field; Annotations Keep Their JSON Type """
+    try:
+        return model._meta.get_field(name).to_python(value)
+    except FieldDoesNotExist:
+        return value
+
+
+def field_value(item, name):
+    """ Read An Ordering Value From A Model Instance Or A values() Row """
+    if isinstance(item, dict):
+        return item[name]
+    return getattr(item, name)
+
+
+def seek_filter(ordering, position) -> Q:
+    """ Build `(a, b) < (x, y)` As `a <= x AND (a < x OR (a = x AND b < y))` With Per-Field Direction """
+    seek = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clause = Q(**{f'{name}__{lookup}': position[index]})
+        for previous_field, previous_value in zip(ordering[:index], position[:index]):
+            clause &= Q(**{previous_field.lstrip('-'): previous_value})
+        seek |= clause
+
+    leading = ordering[0].lstrip('-')
+    leading_lookup = 'lte' if ordering[0].startswith('-') else 'gte'
+    # The redundant leading bound lets Postgres turn the OR chain into an index range scan
+    return Q(**{f'{leading}__{leading_lookup}': position[0]}) & seek
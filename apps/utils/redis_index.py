@@ -0,0 +1,48 @@
+from django_redis import get_redis_connection
+
+DELETE_BATCH_SIZE = 10000
+
+
+class GenerationalIndex:
+    """ A Redis Index Rebuilt Off To The Side And Swapped In With One SET
+
+    Every key of the index sits under `<prefix>:<generation>:`, and `<prefix>:generation` names
+    the generation readers use. A rebuild fills a fresh generation while the current one keeps
+    serving, publishes it, then drops the keys of every other generation. Rebuilds belong in a
+    management command: nothing on the request path builds the index.
+    """
+
+    prefix = None
+
+    def __init__(self, connection=None):
+        self.redis = connection or get_redis_connection('default')
+
+    @property
+    def generation_key(self) -> str:
+        return f'{self.prefix}:generation'
+
+    def get_generation(self):
+        """ The Published Generation, Or None While The Index Is Not Built """
+        generation = self.redis.get(self.generation_key)
+        return generation.decode() if generation is not None else None
+
+    def is_ready(self) -> bool:
+        return self.get_generation() is not None
+
+    def invalidate(self):
+        """ Stop Serving The Index, E.g. After A Failed Incremental Update, Until It Is Rebuilt """
+        self.redis.delete(self.generation_key)
+
+    def start_generation(self) -> str:
+        return str(self.redis.incr(f'{self.prefix}:generations'))
+
+    def publish_generation(self, generation: str):
+        """ Point Readers At generation, Then Delete The Keys Of Every Other Generation """
+        self.redis.set(self.generation_key, generation)
+        current = f'{self.prefix}:{generation}:'
+        stale_keys = [
+            key for key in self.redis.scan_iter(f'{self.prefix}:*:*', count=DELETE_BATCH_SIZE)
+            if not key.decode().startswith(current)
+        ]
+        for start in range(0, len(stale_keys), DELETE_BATCH_SIZE):
+            self.redis.delete(*stale_keys[start:start + DELETE_BATCH_SIZE])
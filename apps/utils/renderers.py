@@ -0,0 +1,45 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+MESSAGEPACK_MEDIA_TYPE = 'application/msgpack'
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+# What DRF's JSONEncoder turns other types into (Decimal, datetime, lazy strings, generators, ...)
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """ JSONRenderer Encoding Through orjson
+
+    Serializer output is dicts, lists, strings and numbers, which orjson encodes in C; anything
+    else (Decimal and datetime values outside serializer fields, lazy strings, ...) goes through
+    DRF's encoder, so e.g. datetimes keep its millisecond precision and `Z` suffix. The output is
+    JSONRenderer's byte for byte except for floats orjson writes in another notation of the same
+    value (`1e-7` for `1e-07`). Indented output is left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # orjson only writes compact UTF-8
+        if self.get_indent(accepted_media_type, renderer_context or {}) or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        # Like JSONRenderer: these are valid JSON but not valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """ MessagePack For Clients Sending `Accept: application/msgpack`; Decodes To What The JSON Would """
+
+    media_type = MESSAGEPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -0,0 +1,147 @@
+import functools
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django_redis import get_redis_connection
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.utils import compression
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+VERSION_KEY = 'response-cache:version:{}'
+CHANGED_AT_KEY = 'response-cache:changed-at:{}'
+RESPONSE_KEY = 'response-cache:{}:{}:{}'
+STATS_KEY = 'response-cache:stats'
+RESPONSE_TIMEOUT = 600
+
+
+def get_versions(namespaces) -> list:
+    """ Current Version Of Each Namespace; A Missing One Starts From A Timestamp So It Never Reuses Old Keys """
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_changed_at(namespaces) -> float:
+    """ Unix Time Of The Latest Change In Any Of The Namespaces, 0 If None Was Recorded """
+    changes = cache.get_many([CHANGED_AT_KEY.format(namespace) for namespace in namespaces])
+    return max(changes.values(), default=0)
+
+
+def bump_version(namespace: str):
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    cache.set(CHANGED_AT_KEY.format(namespace), time.time(), timeout=None)
+
+
+def invalidate(*namespaces):
+    """ Retire Every Cached Response Built From These Namespaces
+
+    Bumped right away so later reads in this process miss, and again on commit so a response
+    a concurrent request built from the pre-commit rows is stored under a version nobody reads.
+    Writes that skip model signals (bulk_create, queryset.update) must call this themselves.
+    """
+    for namespace in namespaces:
+        bump_version(namespace)
+    transaction.on_commit(lambda: [bump_version(namespace) for namespace in namespaces])
+
+
+def build_response_key(name: str, namespaces, request) -> str:
+    """ Key On The View, Namespace Versions, And Absolute Path Plus Sorted Query Params """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = f'{request.build_absolute_uri(request.path)}?{params}'
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    return RESPONSE_KEY.format(name, versions, hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def get_or_build(name: str, namespaces, signature, build, timeout: int = RESPONSE_TIMEOUT):
+    """ Cache Data Derived From The Namespaces Under A Key Made From A Signature Of Its Inputs """
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    key = RESPONSE_KEY.format(name, versions, hashlib.sha1(repr(signature).encode('utf-8')).hexdigest())
+    data = cache.get(key)
+    record(name, hit=data is not None)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=timeout)
+    return data
+
+
+def record(name: str, hit: bool):
+    get_redis_connection('default').hincrby(STATS_KEY, f'{name}:{"hits" if hit else "misses"}', 1)
+
+
+def get_stats() -> dict:
+    """ Hits, Misses And Hit Rate Per Cached View """
+    raw = get_redis_connection('default').hgetall(STATS_KEY)
+    counters = {}
+    for field, value in raw.items():
+        name, counter = field.decode().rsplit(':', 1)
+        counters.setdefault(name, {'hits': 0, 'misses': 0})[counter] = int(value)
+    for counters_by_view in counters.values():
+        total = counters_by_view['hits'] + counters_by_view['misses']
+        counters_by_view['hit_rate'] = counters_by_view['hits'] / total if total else 0.0
+    return counters
+
+
+def cache_response(name: str, namespaces, timeout: int = RESPONSE_TIMEOUT):
+    """ Cache A GET Handler's 200 Response Data Under Versioned Namespaces
+
+    The serialized data is stored (not the rendered bytes), so one entry serves every
+    renderer; a plain HttpResponse of JSON a view encoded itself is stored as its bytes.
+    The compression middleware stores each compressed variant it produces next to the entry,
+    and a hit with a stored variant is served as those bytes, neither rendered nor compressed.
+    The `X-Cache` header tells whether the response came from the cache.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = build_response_key(name, namespaces, request)
+            variant_key = compression.get_variant_key(key, request)
+            cached = cache.get_many([key, variant_key] if variant_key else [key])
+            if variant_key in cached:
+                record(name, hit=True)
+                response = compression.build_precompressed_response(cached[variant_key])
+                response['X-Cache'] = 'HIT'
+                return response
+
+            data = cached.get(key)
+            if data is not None:
+                record(name, hit=True)
+                if isinstance(data, bytes):
+                    response = HttpResponse(data, content_type='application/json')
+                else:
+                    response = Response(data, status=status.HTTP_200_OK)
+                response.compressed_variant_key = variant_key
+                response['X-Cache'] = 'HIT'
+                return response
+
+            record(name, hit=False)
+            response = handler(view, request, *args, **kwargs)
+            # Streamed responses are never buffered into the cache
+            if response.status_code == status.HTTP_200_OK and isinstance(response, Response):
+                cache.set(key, response.data, timeout=timeout)
+                response.compressed_variant_key = variant_key
+            elif response.status_code == status.HTTP_200_OK and not response.streaming:
+                cache.set(key, response.content, timeout=timeout)
+                response.compressed_variant_key = variant_key
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,37 @@
+import functools
+
+from rest_framework.exceptions import ValidationError
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+
+
+@functools.lru_cache(maxsize=None)
+def get_readable_fields(serializer_class) -> tuple:
+    """ Names Of The Fields A Serializer Renders, In Rendering Order """
+    return tuple(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+def parse_field_names(value: str) -> list:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_requested_fields(request, serializer_class):
+    """ The Serializer's Fields Picked By `?fields=` Minus Those In `?omit=`, Or None When Neither Is Given
+
+    The result is what a serializer and setup_eager_loading() take as `fields=`.
+    """
+    fields_value = request.query_params.get(FIELDS_QUERY_PARAM, '')
+    omit_value = request.query_params.get(OMIT_QUERY_PARAM, '')
+    if not fields_value and not omit_value:
+        return None
+
+    readable = get_readable_fields(serializer_class)
+    for param, value in ((FIELDS_QUERY_PARAM, fields_value), (OMIT_QUERY_PARAM, omit_value)):
+        unknown = [name for name in parse_field_names(value) if name not in readable]
+        if unknown:
+            raise ValidationError({param: f'Unknown Fields {", ".join(unknown)}; Expected Any Of {", ".join(readable)}'})
+
+    selected = set(parse_field_names(fields_value)) if fields_value else set(readable)
+    omitted = set(parse_field_names(omit_value))
+    return [name for name in readable if name in selected and name not in omitted]
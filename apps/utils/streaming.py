@@ -0,0 +1,51 @@
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_QUERY_PARAM = 'stream'
+STREAM_CHUNK_SIZE = 500
+
+
+def is_streaming_requested(request) -> bool:
+    return request.query_params.get(STREAM_QUERY_PARAM, '').lower() in ('1', 'true')
+
+
+def iter_chunks(queryset, chunk_size: int = STREAM_CHUNK_SIZE):
+    """ Lists Of Up To chunk_size Rows Read Through A Server-Side Cursor
+
+    prefetch_related() still applies: Django runs the prefetch queries once per chunk.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_item(item) -> str:
+    return json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def iter_json_array(chunks, encode=encode_item):
+    """ Encode An Iterable Of Item Lists As One JSON Array, A Chunk At A Time
+
+    The opening bracket is sent before the first row is read, and only one chunk of
+    items is held in memory at any point. Items already encoded as JSON text pass
+    through with encode=str.
+    """
+    yield b'['
+    separator = ''
+    for items in chunks:
+        if not items:
+            continue
+        encoded = ','.join(encode(item) for item in items)
+        yield f'{separator}{encoded}'.encode('utf-8')
+        separator = ','
+    yield b']'
+
+
+def streaming_json_response(chunks, encode=encode_item) -> StreamingHttpResponse:
+    return StreamingHttpResponse(iter_json_array(chunks, encode=encode), content_type='application/json')
@@ -24,6 +24,7 @@ PROJECT_APPS = [
     'apps.recipes.apps.RecipesConfig',
     'apps.tags.apps.TagsConfig',
     'apps.ingredients.apps.IngredientsConfig',
+    'apps.autocomplete.apps.AutocompleteConfig',
 ]
 
 THIRD_PARTY_APPS = [
@@ -46,10 +47,12 @@ INSTALLED_APPS = [
                      'django.contrib.sessions',
                      'django.contrib.messages',
                      'django.contrib.staticfiles',
+                     'django.contrib.postgres',
                  ] + PROJECT_APPS + THIRD_PARTY_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.utils.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -162,6 +165,19 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.utils.renderers.ORJSONRenderer',
+        'apps.utils.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.utils.parsers.ORJSONParser',
+        'apps.utils.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'apps.utils.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('PAGE_SIZE', 20)),
 }
 
 SITE_ID = 1
@@ -179,6 +195,27 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
 
+# Serve recipe lists and details from the pre-serialized documents in RecipeReadModel
+SERVE_RECIPES_FROM_READ_MODEL = os.environ.get('SERVE_RECIPES_FROM_READ_MODEL', 'True') == 'True'
+# Responses of these types and at least COMPRESSION_MIN_SIZE bytes are sent brotli or gzip compressed
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_CONTENT_TYPES = [
+    'application/json',
+    'application/msgpack',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/vnd.oai.openapi',
+    'image/svg+xml',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/plain',
+]
+# Endpoints (recipe-list, recipe-detail) whose JSON Postgres builds instead; takes precedence over the read model
+RECIPE_JSON_FROM_DATABASE = [
+    name.strip() for name in os.environ.get('RECIPE_JSON_FROM_DATABASE', '').split(',') if name.strip()
+]
+
 PDFENDPOINT_API_KEY = os.environ.get('PDFENDPOINT_API_KEY')
 PDFENDPOINT_URL = os.environ.get('PDFENDPOINT_URL')
 PDFENDPOINT_HEALTH_CHECK = os.environ.get('PDFENDPOINT_HEALTH_CHECK')
@@ -22,6 +22,7 @@ urlpatterns = [
     path('user/', include('apps.users.urls')),
     path('recipes/', include('apps.recipes.urls')),
     path('tags/', include('apps.tags.urls')),
+    path('autocomplete/', include('apps.autocomplete.urls')),
     path('', include('apps.ingredients.urls'))
 ]
 